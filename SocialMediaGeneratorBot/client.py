@@ -1,3 +1,5 @@
+import uuid
+
 import requests
 
 
@@ -6,10 +8,12 @@ class API_Client:
         self.base_url = base_url
         self.jwt_token = None
 
-    def _get_headers(self):
+    def _get_headers(self, idempotency_key=None):
         headers = {"Content-Type": "application/json"}
         if self.jwt_token:
             headers["Authorization"] = f"Bearer {self.jwt_token}"
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
         return headers
 
     def _login(self, user):
@@ -25,7 +29,9 @@ class API_Client:
 
     def post(self, endpoint, payload=None, user=None):
         url = f"{self.base_url}/{endpoint}"
-        headers = self._get_headers()
+        # The retry below sends the same key, so the server does not redo a request that already succeeded
+        idempotency_key = str(uuid.uuid4())
+        headers = self._get_headers(idempotency_key)
         response = None
 
         try:
@@ -36,7 +42,7 @@ class API_Client:
                 login_response = self._login(user)
                 if login_response:
                     # Retry the request with the updated token
-                    headers = self._get_headers()
+                    headers = self._get_headers(idempotency_key)
                     response = requests.post(url, json=payload, headers=headers)
                 else:
                     # Return the response to handle it in the calling code
@@ -3,18 +3,21 @@ import os
 from flask import Flask
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_restx import Api
 from flask_sqlalchemy import SQLAlchemy
 
+from app import admission, cache, compression, singleflight
 from app.config import config
-from app.extensions import authorizations
+from app.db_engine import configure_engine_options, init_engine_events
+from app.db_session import RoutingSession
+from app.startup import StartupTimer
+from app.extensions import BatchJWTManager, authorizations
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate(db)
 bcrypt = Bcrypt()
-jwt = JWTManager()
+jwt = BatchJWTManager()
 cors = CORS()
 
 api = Api(
@@ -26,9 +29,10 @@ api = Api(
 )
 
 
-def create_app() -> Flask:
+def create_app(config_overrides=None) -> Flask:
     """
     Creates an application instance to run
+    :param config_overrides: optional dict applied on top of the config class
     :return: A Flask object
     """
     #
@@ -38,33 +42,60 @@ def create_app() -> Flask:
         :returns: flask.Flask object
 
         """
+    timer = StartupTimer()
     app = Flask(__name__)
     config_name = os.environ.get("FLASK_ENV", "development")
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     config[config_name].init_app(app)
-    print("API configuration:", app.config["ENV"])
+    timer.mark("config")
 
-    from app.models import like, post, user  # pragma: no cover
+    from app.models import (  # noqa: F401  # pragma: no cover
+        idempotency_key,
+        like,
+        like_rollup,
+        post,
+        post_change,
+        post_fingerprint,
+        user,
+    )
 
+    timer.mark("models")
+
+    configure_engine_options(app)
     db.init_app(app)
+    with app.app_context():
+        init_engine_events(app, db.engines.values())
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     api.init_app(app, validate=True)
     jwt.init_app(app)
     cors.init_app(app)
+    compression.init_app(app)
+    admission.init_app(app)
+    singleflight.init_app(app)
+    cache.init_app(app)
+    timer.mark("extensions")
+
+    from app import api_spec, changes, content_storage, events, fingerprints, idempotency, like_ingest, rollups, startup
 
-    from app.auth.auth_resourse_v1 import auth_namespace
-    from app.resurses.analitics_resourse_v1 import analytics_namespace
-    from app.resurses.like_resourse_v1 import like_namespace
-    from app.resurses.post_resourse_v1 import post_namespace
-    from app.resurses.user_resourse_v1 import user_namespace
+    changes.init_app(app)
+    content_storage.init_app(app)
+    fingerprints.init_app(app)
+    idempotency.init_app(app)
+    events.init_app(app)
+    rollups.init_app(app)
+    like_ingest.init_app(app)
 
-    api.add_namespace(auth_namespace, path="/api/auth")
-    api.add_namespace(user_namespace, path="/api/user")
-    api.add_namespace(post_namespace, path="/api/post")
-    api.add_namespace(like_namespace, path="/api/post")
-    api.add_namespace(analytics_namespace, path="/api/analytics")
+    startup.register_namespaces(app)
+    timer.mark("namespaces")
+    api_spec.init_app(app)
+    timer.mark("api_spec")
 
     from app.auth.helper import user_lookup_callback
 
+    app.cli.add_command(startup.startup_profile_command)
+    app.extensions["startup"] = timer
+    app.logger.info("Created %s app in %.1f ms", app.config["ENV"], timer.total_ms)
     return app
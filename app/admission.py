@@ -0,0 +1,150 @@
+import threading
+import time
+
+from flask import current_app, request
+from werkzeug.exceptions import ServiceUnavailable
+
+
+class AdmissionLimiter:
+    """
+    Caps the requests of one endpoint class running at once in this worker process.
+
+    Up to ``queue`` further requests wait at most ``timeout`` seconds for a slot;
+    anything beyond that is shed straight away.
+    """
+
+    def __init__(self, name, concurrency, queue, timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        """
+        Waits for a slot
+        :return: True when admitted, False when the request should be shed
+        """
+        if self._slots.acquire(blocking=False):
+            return self._admit(0.0)
+
+        with self._lock:
+            if self.waiting >= self.queue:
+                self.shed_queue_full += 1
+                return False
+            self.waiting += 1
+
+        started = time.monotonic()
+        admitted = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not admitted:
+                self.shed_timeout += 1
+                return False
+        return self._admit(time.monotonic() - started)
+
+    def _admit(self, waited):
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+            self.max_wait = max(self.max_wait, waited)
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "endpoint_class": self.name,
+                "concurrency": self.concurrency,
+                "queue": self.queue,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+def endpoint_class(path, method):
+    """
+    Sorts a request into the class whose limiter admits it
+    :return: "auth", "analytics", "batch", "read", "write" or None for unlimited routes
+    """
+    if not path.startswith("/api/") or path.startswith("/api/metrics"):
+        return None
+    if path.startswith("/api/stream"):
+        # Streams last for minutes; EVENT_STREAM_MAX_SUBSCRIBERS caps them instead
+        return None
+    if path.startswith("/api/batch"):
+        # Sub-requests are admitted by their own class; a separate class keeps a batch from
+        # waiting on a slot it holds itself
+        return "batch"
+    if path.startswith("/api/auth"):
+        return "auth"
+    if path.startswith("/api/analytics"):
+        return "analytics"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+def admit_request():
+    """
+    Takes a slot of the current request's endpoint class, raising 503 when none frees up.
+    Requests dispatched inside this process, like batched sub-requests, call it themselves
+    and must call release_request afterwards.
+    """
+    if not current_app.config["ADMISSION_ENABLED"]:
+        return
+    limiters = current_app.extensions["admission"]
+    limiter = limiters.get(endpoint_class(request.path, request.method))
+    if limiter is None:
+        return
+
+    if not limiter.acquire():
+        raise ServiceUnavailable(
+            description=f"Too many {limiter.name} requests, retry later.",
+            retry_after=current_app.config["ADMISSION_RETRY_AFTER"],
+        )
+    # Kept on the request rather than g, which in-process sub-requests share with their parent
+    request.environ["app.admission_limiter"] = limiter
+
+
+def release_request(exc=None):
+    limiter = request.environ.pop("app.admission_limiter", None)
+    if limiter is not None:
+        limiter.release()
+
+
+def admission_stats(app):
+    """
+    Reports admission counters of this worker process
+    :param app: Flask application
+    :return: list of dicts, one per endpoint class
+    """
+    return [limiter.stats() for limiter in app.extensions["admission"].values()]
+
+
+def init_app(app):
+    """
+    Registers admission control built from ADMISSION_LIMITS
+    :param app: Flask application
+    """
+    app.extensions["admission"] = {
+        name: AdmissionLimiter(name, **limits) for name, limits in app.config["ADMISSION_LIMITS"].items()
+    }
+    if app.config["ADMISSION_ENABLED"]:
+        app.before_request(admit_request)
+        app.teardown_request(release_request)
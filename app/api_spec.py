@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import click
+from flask import Response, current_app, has_request_context, request
+
+from app import api
+from app.startup import register_deferred_namespaces
+
+
+class RenderedSpec:
+    """The OpenAPI document serialized once, with its gzip encoding and validator"""
+
+    def __init__(self, body):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9)
+        self.etag = hashlib.sha1(body).hexdigest()
+
+
+def render_spec():
+    """
+    Serializes the OpenAPI document of every registered namespace
+    :return: JSON document as bytes
+    """
+    # flask-restx memoizes the schema on the shared Api, possibly before deferred namespaces were added
+    api._schema = None
+    return json.dumps(api.__schema__, separators=(",", ":")).encode()
+
+
+def get_spec(app):
+    """
+    Returns the spec of the app, rendering it on first use
+    :param app: Flask application
+    :return: RenderedSpec
+    """
+    state = app.extensions["api_spec"]
+    if state["spec"] is None:
+        register_deferred_namespaces(app)
+        with state["lock"]:
+            if state["spec"] is None:
+                if has_request_context():
+                    state["spec"] = RenderedSpec(render_spec())
+                else:
+                    with app.test_request_context():
+                        state["spec"] = RenderedSpec(render_spec())
+    return state["spec"]
+
+
+def serve_spec():
+    spec = get_spec(current_app)
+    headers = {"ETag": f'W/"{spec.etag}"', "Vary": "Accept-Encoding", "Cache-Control": "public, no-cache"}
+
+    if request.if_none_match.contains_weak(spec.etag):
+        return Response(status=304, headers=headers)
+
+    if request.accept_encodings.quality("gzip") > 0:
+        return Response(spec.gzipped, mimetype="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(spec.body, mimetype="application/json", headers=headers)
+
+
+@click.command("export-spec")
+@click.argument("path", type=click.Path(dir_okay=False), required=False)
+def export_spec_command(path):
+    """Write the OpenAPI document to PATH (defaults to SWAGGER_SPEC_PATH)."""
+    path = path or current_app.config.get("SWAGGER_SPEC_PATH")
+    if not path:
+        raise click.UsageError("Pass a PATH or set SWAGGER_SPEC_PATH.")
+
+    register_deferred_namespaces(current_app)
+    with current_app.test_request_context():
+        body = render_spec()
+    with open(path, "wb") as spec_file:
+        spec_file.write(body)
+    click.echo(f"Wrote {len(body)} bytes to {path}")
+
+
+def init_app(app):
+    """
+    Serves /swagger.json from a spec rendered once per process.
+
+    Must run after every namespace is registered. When SWAGGER_SPEC_PATH points
+    to a file written by ``flask export-spec`` the spec is loaded from it instead
+    of being rendered.
+    :param app: Flask application
+    """
+    app.extensions["api_spec"] = {"spec": None, "lock": threading.Lock()}
+
+    path = app.config.get("SWAGGER_SPEC_PATH")
+    if path and os.path.exists(path):
+        with open(path, "rb") as spec_file:
+            app.extensions["api_spec"]["spec"] = RenderedSpec(spec_file.read())
+    elif app.config.get("SWAGGER_SPEC_PRERENDER"):
+        get_spec(app)
+
+    app.view_functions["specs"] = serve_spec
+    app.cli.add_command(export_spec_command)
@@ -7,6 +7,7 @@ from flask_jwt_extended import (
 )
 from flask_restx import Namespace, Resource, abort
 from marshmallow import ValidationError
+from sqlalchemy import insert
 from werkzeug.exceptions import HTTPException
 
 from app import db
@@ -17,6 +18,7 @@ from app.auth.auth_schema import (
     user_input_model,
     user_model,
 )
+from app.idempotency import idempotent
 from app.models.user import User
 
 auth_namespace = Namespace("auth", description="Auth operations")
@@ -28,8 +30,10 @@ class UserRegister(Resource):
     @auth_namespace.marshal_with(user_model, as_list=False, code=201, mask=None)
     @auth_namespace.doc(
         responses={201: "Success", 404: "Invalid credentials"},
-        description="Endpoint to register a new user.",
+        description="Endpoint to register a new user. Retries with the same Idempotency-Key header get the "
+        "original response.",
     )
+    @idempotent
     def post(self):
         """Register user"""
         try:
@@ -37,19 +41,27 @@ class UserRegister(Resource):
             data = auth_namespace.payload
             user_data = UserInputSchema().load(data)
 
-            # Extract user data from the validated payload and create a new user instance
-            new_user = User(
-                username=user_data["username"],
-                email=user_data["email"],
-                password=user_data["password"],
-            )
-
-            # Add the new user to the database and commit the transaction
-            db.session.add(new_user)
+            # Insert the new user and read the generated values back in the same statement
+            new_user = db.session.execute(
+                insert(User)
+                .values(
+                    username=user_data["username"],
+                    email=user_data["email"],
+                    password_hash=User.hash_password(user_data["password"]),
+                )
+                .returning(
+                    User.id,
+                    User.username,
+                    User.email,
+                    User.member_since,
+                    User.last_login,
+                    User.last_api_request,
+                )
+            ).one()
             db.session.commit()
 
             # Return the new user data with a 201 status code
-            return new_user, 201
+            return new_user._asdict(), 201
 
         except ValidationError as e:
             # Handle payload validation errors and return a 400 status code with error messages
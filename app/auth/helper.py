@@ -1,3 +1,5 @@
+from flask import g
+
 from app import db, jwt
 from app.models.user import User
 
@@ -6,8 +8,23 @@ from app.models.user import User
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
     identity = jwt_data["sub"]
+    batch_user = g.get("batch_user")
+    if batch_user is not None and batch_user[0] == identity:
+        # Sub-requests of a batch reuse the user the batch request itself looked up
+        return batch_user[1]
     user = User.query.filter_by(public_id=identity).one_or_none()
     if user:
+        # Map the public identity to the internal id once per request,
+        # before the commit below expires the instance
+        g.current_user_id = user.id
         user.update_last_api_request()
         db.session.commit()
     return user
+
+
+def get_current_user_id():
+    """
+    Returns the internal integer id of the authenticated user
+    :return: users.id resolved by the JWT user lookup for this request
+    """
+    return g.get("current_user_id")
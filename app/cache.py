@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g
+from flask_restx.utils import unpack
+from sqlalchemy import event
+
+from app.db_session import RoutingSession, sees_uncommitted_writes
+from app.singleflight import request_key
+
+
+class CacheBackend:
+    """
+    Key/value store for JSON-serializable values, plus a generation counter per tag.
+
+    Cached keys embed the generations of their tags, so bumping a tag's generation
+    invalidates every entry built from it without enumerating them.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def generations(self, tags):
+        """
+        :param tags: iterable of tag names
+        :return: dict of tag to its current generation
+        """
+        raise NotImplementedError
+
+    def bump(self, tags):
+        raise NotImplementedError
+
+    def last_bumped(self, tags):
+        """
+        :param tags: iterable of tag names
+        :return: time.time() of the latest bump of any of the tags, or None
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generations(self, tags):
+        return {tag: 0 for tag in tags}
+
+    def bump(self, tags):
+        pass
+
+    def last_bumped(self, tags):
+        return None
+
+    def clear(self):
+        pass
+
+
+class SimpleCache(CacheBackend):
+    """Dictionary private to this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+        self._bumped = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return json.loads(entry[0])
+
+    def set(self, key, value, ttl):
+        self._entries[key] = (json.dumps(value), time.time() + ttl)
+
+    def generations(self, tags):
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        now = time.time()
+        with self._lock:
+            for tag in tags:
+                self._bumped[tag] = now
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def last_bumped(self, tags):
+        return max((self._bumped[tag] for tag in tags if tag in self._bumped), default=None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._bumped.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    SQLite file shared by every worker on the host.
+
+    An entry computed by one worker is a hit for all others, and a generation
+    bumped by one worker invalidates the entry for all others.
+    """
+
+    # Sets between sweeps of expired entries
+    PURGE_EVERY = 500
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS generations (tag TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS bumped (tag TEXT PRIMARY KEY, at REAL NOT NULL)")
+
+    def _connect(self):
+        # One connection per thread and process; a connection must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, json.dumps(value), now + ttl))
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+
+    def generations(self, tags):
+        tags = list(tags)
+        placeholders = ", ".join("?" * len(tags))
+        rows = self._connect().execute(f"SELECT tag, value FROM generations WHERE tag IN ({placeholders})", tags)
+        found = dict(rows.fetchall())
+        return {tag: found.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        conn = self._connect()
+        # The time goes first, so a worker seeing the new generation also sees when it changed
+        conn.executemany("INSERT OR REPLACE INTO bumped VALUES (?, ?)", [(tag, time.time()) for tag in tags])
+        conn.executemany(
+            "INSERT INTO generations VALUES (?, 1) ON CONFLICT(tag) DO UPDATE SET value = value + 1",
+            [(tag,) for tag in tags],
+        )
+
+    def last_bumped(self, tags):
+        tags = list(tags)
+        placeholders = ", ".join("?" * len(tags))
+        return self._connect().execute(f"SELECT max(at) FROM bumped WHERE tag IN ({placeholders})", tags).fetchone()[0]
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM generations")
+        conn.execute("DELETE FROM bumped")
+
+
+def create_backend(config):
+    """
+    Builds the backend named by CACHE_BACKEND
+    :param config: Flask config
+    :return: CacheBackend
+    """
+    name = config["CACHE_BACKEND"]
+    if name == "sqlite":
+        return SQLiteCache(config["CACHE_PATH"])
+    if name == "simple":
+        return SimpleCache()
+    if name == "null":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r}")
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": current_app.config["CACHE_BACKEND"],
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _call_fresh(f, backend, tags, *args, **kwargs):
+    # Runs a view on a cache miss, off the replicas if one of its tags was bumped too recently
+    if not g.get("db_read_replica", False) or not current_app.config.get("SQLALCHEMY_READ_REPLICAS"):
+        return f(*args, **kwargs)
+    bumped = backend.last_bumped(tags)
+    if bumped is None or time.time() - bumped >= current_app.config["SQLALCHEMY_READ_REPLICA_MAX_LAG"]:
+        return f(*args, **kwargs)
+    g.db_read_replica = False
+    try:
+        return f(*args, **kwargs)
+    finally:
+        g.db_read_replica = True
+
+
+def cached(tags, ttl=None, per_user=False):
+    """
+    Caches what a view returns in the configured backend.
+
+    Entries are keyed like single-flight requests and are dropped when a committed
+    write touches one of the tags. Put it below ``conditional`` so 304s still apply.
+    The view must return JSON-serializable data. Requests whose session sees uncommitted
+    writes bypass the cache, so entries never hold data that may still roll back. A miss
+    within SQLALCHEMY_READ_REPLICA_MAX_LAG of a bump of the tags reads from the primary,
+    so a replica that has not caught up cannot fill the new generation with stale data.
+    :param tags: table names the response is built from
+    :param ttl: seconds an entry lives, CACHE_DEFAULT_TTL when None
+    :param per_user: keep separate entries per authenticated user, for views whose output depends on who asks
+    :return: decorator
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if sees_uncommitted_writes():
+                return f(*args, **kwargs)
+            backend = current_app.extensions["cache"]
+            stats = current_app.extensions["cache_stats"]
+            generations = backend.generations(tags)
+            identity = json.dumps([request_key(per_user), sorted(generations.items())], default=str)
+            key = f"view:{hashlib.sha1(identity.encode()).hexdigest()}"
+
+            entry = backend.get(key)
+            stats.record(hit=entry is not None)
+            if entry is not None:
+                return entry[0], entry[1], entry[2]
+
+            data, code, headers = unpack(_call_fresh(f, backend, tags, *args, **kwargs))
+            if 200 <= code < 300:
+                backend.set(key, [data, code, dict(headers)], ttl or current_app.config["CACHE_DEFAULT_TTL"])
+            return data, code, headers
+
+        return wrapper
+
+    return decorator
+
+
+def _changed_tables(session):
+    ignored = current_app.config["CACHE_IGNORED_COLUMNS"]
+    tables = set()
+    for instance in session.new | session.dirty | session.deleted:
+        state = sa.inspect(instance)
+        for table in state.mapper.tables:
+            if instance in session.dirty and table.name in ignored:
+                changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+                if changed <= set(ignored[table.name]):
+                    continue
+            tables.add(table.name)
+    return tables
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_flushed_tags(session, flush_context):
+    if "cache" in current_app.extensions:
+        session.info.setdefault("cache_tags", set()).update(_changed_tables(session))
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _collect_executed_tags(orm_execute_state):
+    statement = orm_execute_state.statement
+    if isinstance(statement, sa.sql.dml.UpdateBase):
+        orm_execute_state.session.info.setdefault("cache_tags", set()).add(statement.table.name)
+
+
+def publish_invalidations(session):
+    """
+    Bumps the tags of the tables a committed session wrote to
+    :param session: SQLAlchemy session
+    """
+    tags = session.info.pop("cache_tags", None)
+    if tags and "cache" in current_app.extensions:
+        current_app.extensions["cache"].bump(sorted(tags))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _publish_invalidations(session):
+    # A session committing into an outer transaction leaves publishing to the transaction's owner
+    if not session.info.get("outer_transaction"):
+        publish_invalidations(session)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("cache_tags", None)
+
+
+def init_app(app):
+    """
+    Creates the cache backend named by CACHE_BACKEND
+    :param app: Flask application
+    """
+    app.extensions["cache"] = create_backend(app.config)
+    app.extensions["cache_stats"] = CacheStats()
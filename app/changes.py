@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from app import db
+from app.models.post_change import PostChange
+
+CREATED, UPDATED, DELETED = "created", "updated", "deleted"
+
+# Advisory lock serializing writers of the feed on PostgreSQL
+POST_CHANGES_LOCK = 0x706F7374
+
+
+def _dialect_name(connection):
+    bind = connection if isinstance(connection, Connection) else connection.get_bind()
+    return bind.dialect.name
+
+
+def record_post_changes(connection, post_ids, operation):
+    """
+    Appends entries to the post change feed inside the caller's transaction.
+
+    Readers move their token past every id they see, so ids must become visible in order.
+    On PostgreSQL the writer holds an advisory lock from taking its ids until it commits,
+    so post and like writes commit one at a time: call it just before committing. A writer
+    waits at most CHANGE_FEED_LOCK_TIMEOUT for the lock and then fails. SQLite lets one
+    transaction write at a time anyway.
+    :param connection: connection or session of the writing transaction
+    :param post_ids: ids of the changed posts
+    :param operation: CREATED, UPDATED or DELETED
+    """
+    now = datetime.utcnow()
+    rows = [{"post_id": post_id, "operation": operation, "changed_at": now} for post_id in dict.fromkeys(post_ids)]
+    if not rows:
+        return
+    if _dialect_name(connection) == "postgresql":
+        _lock_post_changes(connection)
+    connection.execute(insert(PostChange), rows)
+
+
+def _lock_post_changes(connection):
+    if connection.execute(select(func.pg_try_advisory_xact_lock(POST_CHANGES_LOCK))).scalar():
+        return
+    # Another writer has not committed yet; wait for it, but not for longer than the timeout
+    timeout = f"{int(current_app.config['CHANGE_FEED_LOCK_TIMEOUT'] * 1000)}ms"
+    previous = connection.execute(select(func.current_setting("lock_timeout"))).scalar()
+    connection.execute(select(func.set_config("lock_timeout", timeout, True)))
+    connection.execute(select(func.pg_advisory_xact_lock(POST_CHANGES_LOCK)))
+    connection.execute(select(func.set_config("lock_timeout", previous, True)))
+
+
+def read_post_changes(since, limit):
+    """
+    Reads the feed after a change token, keeping the latest entry of each post
+    :param since: token returned by an earlier read, 0 for everything
+    :param limit: number of entries to scan at most
+    :return: tuple of (list of (token, post_id, operation), next token, whether more entries follow)
+    """
+    rows = db.session.execute(
+        select(PostChange.id, PostChange.post_id, PostChange.operation)
+        .where(PostChange.id > since)
+        .order_by(PostChange.id)
+        .limit(limit + 1)
+    ).all()
+    page, more = rows[:limit], len(rows) > limit
+
+    latest = {}
+    for token, post_id, operation in page:
+        latest.pop(post_id, None)
+        latest[post_id] = (token, post_id, operation)
+    next_token = page[-1].id if page else since
+    return list(latest.values()), next_token, more
+
+
+def changes_expired(since):
+    """
+    :param since: token of a reader
+    :return: True if entries after the token may have been pruned
+    """
+    if not since:
+        return False
+    oldest = db.session.execute(select(func.min(PostChange.id))).scalar()
+    return oldest is not None and since < oldest - 1
+
+
+@click.command("prune-post-changes")
+def prune_post_changes_command():
+    """Delete post change feed entries older than CHANGE_FEED_RETENTION."""
+    cutoff = datetime.utcnow() - current_app.config["CHANGE_FEED_RETENTION"]
+    with db.engine.begin() as connection:
+        # The newest entry always stays, so readers can still tell their token was pruned
+        newest = connection.execute(select(func.max(PostChange.id))).scalar()
+        deleted = connection.execute(
+            delete(PostChange).where(PostChange.changed_at < cutoff, PostChange.id < newest)
+        ).rowcount
+    click.echo(f"Pruned {deleted} post changes")
+
+
+def init_app(app):
+    app.cli.add_command(prune_post_changes_command)
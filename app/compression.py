@@ -0,0 +1,90 @@
+import zlib
+
+from flask import current_app, request
+
+# zlib window bits selecting the container format of each content coding
+ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def negotiate_encoding(accept_encodings):
+    """
+    Picks the content coding preferred by the client
+    :param accept_encodings: werkzeug Accept parsed from Accept-Encoding
+    :return: "gzip", "deflate" or None for identity
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    """
+    Compresses a response iterable chunk by chunk
+    :param chunks: iterable of str or bytes
+    :return: generator of compressed bytes, flushed after every chunk
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            # A sync flush hands each chunk to the client without waiting for the next one
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    config = current_app.config
+    if (
+        not config["COMPRESS_ENABLED"]
+        or request.method == "HEAD"
+        or not 200 <= response.status_code < 300
+        or response.status_code in (204, 206)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in config["COMPRESS_MIMETYPES"]
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress(data, encoding, level))
+
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes are a representation of their own, so a strong validator of the
+    # identity body gets the coding appended; a weak one holds for both
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def init_app(app):
+    """
+    Registers response compression on the app
+    :param app: Flask application providing the COMPRESS_* settings
+    """
+    app.after_request(compress_response)
@@ -0,0 +1,74 @@
+from collections import namedtuple
+from functools import wraps
+
+from flask import request
+from flask_restx.utils import unpack
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+from app import api
+from app.compression import ENCODINGS
+
+# Cheap version data describing the current state of a resource; a strong ETag promises
+# byte-identical bodies, which If-Match requires
+Validators = namedtuple("Validators", ["etag", "last_modified", "max_age", "strong"], defaults=(None, None, False))
+
+
+class NotModified(HTTPException):
+    code = 304
+    description = "Not Modified"
+
+    def __init__(self, headers):
+        super().__init__()
+        self.headers = headers
+
+
+@api.errorhandler(NotModified)
+def handle_not_modified(error):
+    return {}, 304, error.headers
+
+
+def _validator_headers(validators):
+    headers = {"ETag": quote_etag(validators.etag, weak=not validators.strong)}
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = http_date(validators.last_modified)
+    if validators.max_age:
+        headers["Cache-Control"] = f"public, max-age={validators.max_age}"
+    else:
+        headers["Cache-Control"] = "private, no-cache"
+    return headers
+
+
+def _representation_etags(validators):
+    # Compression appends the content coding to a strong ETag, see app.compression
+    if validators.strong:
+        return [validators.etag, *(f"{validators.etag}-{encoding}" for encoding in ENCODINGS)]
+    return [validators.etag]
+
+
+def conditional(version):
+    """
+    Answers If-None-Match / If-Modified-Since with 304 before the view runs
+    :param version: callable taking the view's URL arguments and returning Validators,
+        or None to skip validation (e.g. for a missing resource)
+    :return: decorator adding ETag, Last-Modified and Cache-Control to responses
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            validators = version(**kwargs)
+            if validators is None:
+                return f(*args, **kwargs)
+
+            headers = _validator_headers(validators)
+            for etag in _representation_etags(validators):
+                if not is_resource_modified(request.environ, etag=etag, last_modified=validators.last_modified):
+                    raise NotModified({**headers, "ETag": quote_etag(etag, weak=not validators.strong)})
+
+            data, code, view_headers = unpack(f(*args, **kwargs))
+            return data, code, {**headers, **view_headers}
+
+        return wrapper
+
+    return decorator
@@ -10,6 +10,17 @@ if os.path.exists(dotenv_path):
     load_dotenv(dotenv_path)
 
 
+def replica_binds(urls):
+    """
+    Builds SQLALCHEMY_BINDS entries for read replicas
+    :param urls: comma separated database URLs, or None
+    :return: dict of bind key to database URL
+    """
+    if not urls:
+        return {}
+    return {f"replica_{number}": url.strip() for number, url in enumerate(urls.split(","), start=1) if url.strip()}
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "my_precious_secret_key")
     SECURITY_PASSWORD_SALT = os.environ.get("SECURITY_PASSWORD_SALT") or "hard to guess string"
@@ -20,6 +31,162 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     CORS_ORIGINS = ["http://localhost:5000", "http:127.0.0.1:5000", "http:0.0.0.0"]
 
+    # Rows fetched from the database per chunk of the NDJSON post export
+    POST_EXPORT_CHUNK_SIZE = 500
+    # Seconds shared caches may keep like statistics of ranges that ended before today
+    ANALYTICS_PAST_RANGE_MAX_AGE = 3600
+    # Largest "limit" accepted by the top-posts and top-authors analytics
+    ANALYTICS_TOP_LIMIT_MAX = 100
+    # A like counts half as much towards the trending feed after each half-life
+    TRENDING_HALF_LIFE = timedelta(hours=24)
+    # Posts whose score falls below this (relative to a like made now) leave the feed on rebase
+    TRENDING_MIN_SCORE = 0.001
+    # Half-lives after the epoch at which recording a like rebases the scores in the background,
+    # keeping the weight of a new like below 2 ** TRENDING_REBASE_AFTER
+    TRENDING_REBASE_AFTER = 16
+    TRENDING_PAGE_SIZE_MAX = 100
+    # Largest number of ids one GET /api/post?ids= or /api/user?ids= request may ask for
+    BATCH_IDS_MAX = 100
+    # Largest number of sub-requests one POST /api/batch may carry
+    BATCH_REQUESTS_MAX = 20
+
+    # Store post content above POST_CONTENT_COMPRESS_MIN_SIZE bytes zlib-compressed in a binary column.
+    # Run `flask compress-post-content` before turning it on, and with --decompress after turning it off
+    POST_CONTENT_COMPRESSION = os.environ.get("POST_CONTENT_COMPRESSION", "").lower() in ("1", "true")
+    POST_CONTENT_COMPRESS_MIN_SIZE = 1024
+    POST_CONTENT_COMPRESS_LEVEL = 6
+
+    # POST /api/post rejects content repeating an earlier post of the same author with 409.
+    # Near-duplicates are SimHash signatures at most this many bits apart; the four index
+    # bands find every signature within 3 bits, so values above 3 miss some near-duplicates
+    POST_DUPLICATE_CHECK_ENABLED = True
+    POST_DUPLICATE_MAX_DISTANCE = 3
+
+    # Response compression negotiated through Accept-Encoding
+    COMPRESS_ENABLED = True
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_MIMETYPES = [
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "text/css",
+        "text/html",
+    ]
+
+    # Serve /swagger.json from a file written by `flask export-spec` at build time
+    SWAGGER_SPEC_PATH = os.environ.get("SWAGGER_SPEC_PATH")
+    # Render the spec while the app is created instead of on the first request
+    SWAGGER_SPEC_PRERENDER = False
+    # Namespaces from app.startup.NAMESPACES imported and registered just before the first request
+    DEFERRED_NAMESPACES = []
+
+    # Bind keys from SQLALCHEMY_BINDS that serve reads of read-only requests
+    SQLALCHEMY_BINDS = {}
+    SQLALCHEMY_READ_REPLICAS = []
+    # Seconds a replica may trail the primary; a cache miss this soon after a write to one of
+    # the view's tables reads from the primary, so a stale result is not cached as current
+    SQLALCHEMY_READ_REPLICA_MAX_LAG = 5
+
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Seconds a single statement may run before the database cancels it
+    SQLALCHEMY_STATEMENT_TIMEOUT = 30
+    # Applied to every new SQLite connection; WAL lets readers run during writes
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+    }
+
+    # Per-process concurrency limits by endpoint class; excess requests wait up to
+    # "timeout" seconds in a queue of "queue" places, then get 503 with Retry-After
+    ADMISSION_ENABLED = True
+    ADMISSION_LIMITS = {
+        "auth": {"concurrency": 4, "queue": 8, "timeout": 1.0},
+        "read": {"concurrency": 16, "queue": 32, "timeout": 0.5},
+        "write": {"concurrency": 8, "queue": 32, "timeout": 1.0},
+        "analytics": {"concurrency": 2, "queue": 4, "timeout": 0.25},
+        # Sub-requests of a batch also take a slot of their own class
+        "batch": {"concurrency": 2, "queue": 4, "timeout": 1.0},
+    }
+    ADMISSION_RETRY_AFTER = 1
+
+    # Concurrent identical requests to @single_flight views share one computation;
+    # a waiting request runs the view itself after SINGLE_FLIGHT_TIMEOUT seconds
+    SINGLE_FLIGHT_ENABLED = True
+    SINGLE_FLIGHT_TIMEOUT = 10
+
+    # Response cache of @cached views: "sqlite" is one file shared by all workers on the host,
+    # "simple" is private to each process and "null" disables caching
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")
+    CACHE_PATH = os.environ.get("CACHE_PATH") or os.path.join(parent_dir, "cache.sqlite")
+    CACHE_DEFAULT_TTL = 300
+    # Columns whose updates leave cached responses valid, by table
+    CACHE_IGNORED_COLUMNS = {"users": ["last_login", "last_api_request"]}
+
+    # Queue likes and insert them in batches from a background thread, answering 202.
+    # Durability "memory" acknowledges once queued; "commit" waits for the batch to commit
+    LIKE_INGEST_ENABLED = os.environ.get("LIKE_INGEST_ENABLED", "").lower() in ("1", "true")
+    LIKE_INGEST_DURABILITY = os.environ.get("LIKE_INGEST_DURABILITY", "memory")
+    LIKE_INGEST_QUEUE_SIZE = 10000
+    LIKE_INGEST_BATCH_SIZE = 500
+    # Seconds the flusher keeps collecting likes after the first one of a batch
+    LIKE_INGEST_FLUSH_INTERVAL = 0.05
+    LIKE_INGEST_COMMIT_TIMEOUT = 2
+
+    # POST requests carrying an Idempotency-Key header have their response stored for this
+    # long and replayed to retries instead of running again
+    IDEMPOTENCY_ENABLED = True
+    IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+    # A key still in progress after this long is taken over by the next retry; it matches
+    # SERVER_TIMEOUT, after which the worker that claimed it has been killed
+    IDEMPOTENCY_LEASE = timedelta(seconds=30)
+
+    # `flask prune-post-changes` deletes change feed entries older than this
+    CHANGE_FEED_RETENTION = timedelta(days=30)
+    CHANGE_FEED_PAGE_SIZE_MAX = 500
+    # On PostgreSQL post and like writers take the feed lock in turn, each holding it until
+    # it commits; a writer waiting longer than this fails instead of queueing up
+    CHANGE_FEED_LOCK_TIMEOUT = 2
+
+    # Server-Sent Events of GET /api/stream, fanned out within each worker process.
+    # Each stream holds a thread of its worker; the cap keeps SERVER_THREADS - EVENT_STREAM_MAX_SUBSCRIBERS
+    # threads free for other requests
+    EVENT_STREAM_MAX_SUBSCRIBERS = 16
+    # Events buffered per stream; a stream falling further behind is closed and resumes on reconnect
+    EVENT_STREAM_BUFFER = 100
+    # Events kept to resume reconnecting streams from their Last-Event-ID
+    EVENT_STREAM_HISTORY = 1000
+    # Seconds between keep-alive comments on an idle stream
+    EVENT_STREAM_HEARTBEAT = 15
+    EVENT_STREAM_RETRY_MS = 3000
+
+    # Multi-process serving through gunicorn.conf.py
+    SERVER_BIND = os.environ.get("SERVER_BIND", "0.0.0.0:5000")
+    SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 2))
+    # Threaded workers heartbeat from their main loop, so a long-lived stream is not mistaken
+    # for a hung worker the way it is under the sync worker
+    SERVER_WORKER_CLASS = "gthread"
+    # A thread for every request admission may run or queue, one per stream and a few for unlimited
+    # routes. With fewer threads the excess waits in the listen backlog, out of reach of admission
+    # control; recompute it in subclasses that change ADMISSION_LIMITS
+    SERVER_THREADS = (
+        sum(limits["concurrency"] + limits["queue"] for limits in ADMISSION_LIMITS.values())
+        + EVENT_STREAM_MAX_SUBSCRIBERS
+        + 8
+    )
+    # Seconds a silent worker may run before it is killed and replaced
+    SERVER_TIMEOUT = 30
+    # Seconds workers get to finish in-flight requests after SIGTERM
+    SERVER_GRACEFUL_TIMEOUT = 30
+    SERVER_KEEPALIVE = 2
+    # Requests a worker serves before it is recycled; 0 disables recycling
+    SERVER_MAX_REQUESTS = 0
+    SERVER_MAX_REQUESTS_JITTER = 0
+    # Import the app in the master so workers share its memory copy-on-write
+    SERVER_PRELOAD_APP = True
+
     @staticmethod
     def init_app(app):
         pass
@@ -32,6 +199,15 @@ class DevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get("DEV_DATABASE_URL") or "sqlite:///" + os.path.join(parent_dir, "data-dev.sqlite")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get("DEV_READ_REPLICA_URLS"))
+    SQLALCHEMY_READ_REPLICAS = list(SQLALCHEMY_BINDS)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
 
 
 class TestingConfig(Config):
@@ -43,6 +219,13 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL") or "sqlite:///:memory:"
     PRESERVE_CONTEXT_ON_EXCEPTION = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # The in-memory database runs on a single shared connection, so no pool sizing
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_STATEMENT_TIMEOUT = 10
+    # Minimum bcrypt cost; hashing at the default cost dominates fixtures that create users
+    BCRYPT_LOG_ROUNDS = 4
+    # A shared file would outlive the per-test databases
+    CACHE_BACKEND = "simple"
 
 
 class ProductionConfig(Config):
@@ -55,6 +238,20 @@ class ProductionConfig(Config):
     )
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SWAGGER_SPEC_PRERENDER = True
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get("PROD_READ_REPLICA_URLS"))
+    SQLALCHEMY_READ_REPLICAS = list(SQLALCHEMY_BINDS)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 5,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+    SQLALCHEMY_STATEMENT_TIMEOUT = 5
+    SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 2 * (os.cpu_count() or 1) + 1))
+    SERVER_MAX_REQUESTS = 2000
+    SERVER_MAX_REQUESTS_JITTER = 200
 
 
 config = {
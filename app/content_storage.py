@@ -0,0 +1,96 @@
+import click
+from flask import current_app
+from sqlalchemy import Integer, LargeBinary, Text, and_, bindparam, column, func, inspect, select, table, text
+
+from app import db
+from app.models.types import COMPRESSED_MARKER, compress_text, decompress_text
+
+# posts as stored, read without the CompressedText conversion
+posts = table("posts", column("id", Integer), column("content", LargeBinary))
+
+
+def _is_text_column(connection):
+    columns = {col["name"]: col["type"] for col in inspect(connection).get_columns("posts")}
+    return isinstance(columns["content"], Text)
+
+
+def _rewrite_content(convert, where, value_type, batch_size):
+    """
+    Rewrites posts.content in keyset batches, one transaction each
+    :param convert: function of the stored value (str or bytes) returning the new value
+    :param where: filter selecting the rows to rewrite
+    :param value_type: SQL type the new values are bound as
+    :param batch_size: rows per transaction
+    :return: number of rows rewritten
+    """
+    update = (
+        posts.update()
+        .where(posts.c.id == bindparam("post_id"))
+        .values(content=bindparam("data", type_=value_type))
+    )
+    last_id, total = 0, 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(
+                select(posts.c.id, posts.c.content)
+                .where(posts.c.id > last_id, where)
+                .order_by(posts.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            connection.execute(update, [{"post_id": post_id, "data": convert(content)} for post_id, content in rows])
+        last_id, total = rows[-1].id, total + len(rows)
+
+
+@click.command("compress-post-content")
+@click.option("--batch-size", default=500, show_default=True, help="Posts rewritten per transaction.")
+@click.option("--decompress", is_flag=True, help="Store post content as plain text again.")
+def compress_post_content_command(batch_size, decompress):
+    """Convert posts.content to compressed binary storage, or back to text."""
+    postgresql = db.engine.dialect.name == "postgresql"
+    if decompress:
+        if postgresql:
+            total = _rewrite_content(
+                lambda value: decompress_text(bytes(value)).encode("utf-8"),
+                func.substr(posts.c.content, 1, 1) == COMPRESSED_MARKER,
+                LargeBinary(),
+                batch_size,
+            )
+            with db.engine.begin() as connection:
+                if not _is_text_column(connection):
+                    connection.execute(
+                        text("ALTER TABLE posts ALTER COLUMN content TYPE text USING convert_from(content, 'UTF8')")
+                    )
+        else:
+            # SQLite keeps the type of each value rather than of the column
+            total = _rewrite_content(
+                lambda value: decompress_text(bytes(value)),
+                func.typeof(posts.c.content) == "blob",
+                Text(),
+                batch_size,
+            )
+        click.echo(f"Decompressed {total} posts; run the app with POST_CONTENT_COMPRESSION off")
+        return
+
+    if postgresql:
+        with db.engine.begin() as connection:
+            if _is_text_column(connection):
+                # Rewrites the table under an exclusive lock
+                connection.execute(
+                    text("ALTER TABLE posts ALTER COLUMN content TYPE bytea USING convert_to(content, 'UTF8')")
+                )
+    # Smaller values stay as they are; reads accept text and bytes alike
+    config = current_app.config
+    min_size, level = config["POST_CONTENT_COMPRESS_MIN_SIZE"], config["POST_CONTENT_COMPRESS_LEVEL"]
+    total = _rewrite_content(
+        lambda value: compress_text(value if isinstance(value, str) else bytes(value).decode("utf-8"), min_size, level),
+        and_(func.length(posts.c.content) >= min_size, func.substr(posts.c.content, 1, 1) != COMPRESSED_MARKER),
+        LargeBinary(),
+        batch_size,
+    )
+    click.echo(f"Compressed {total} posts; run the app with POST_CONTENT_COMPRESSION on")
+
+
+def init_app(app):
+    app.cli.add_command(compress_post_content_command)
@@ -0,0 +1,140 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# INSERT constructs supporting ON CONFLICT, by dialect name
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def configure_engine_options(app):
+    """
+    Completes SQLALCHEMY_ENGINE_OPTIONS before the engines are created
+    :param app: Flask application whose config is updated in place
+    """
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    timeout = app.config.get("SQLALCHEMY_STATEMENT_TIMEOUT")
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+
+    if "pool_size" in options:
+        options.setdefault("poolclass", TimedQueuePool)
+
+    if timeout and url.get_backend_name() == "postgresql":
+        connect_args = dict(options.get("connect_args") or {})
+        connect_args.setdefault("options", f"-c statement_timeout={int(timeout * 1000)}")
+        options["connect_args"] = connect_args
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def init_engine_events(app, engines):
+    """
+    Registers connection-level tuning on every engine of the app
+    :param app: Flask application providing SQLITE_PRAGMAS and SQLALCHEMY_STATEMENT_TIMEOUT
+    :param engines: iterable of SQLAlchemy engines
+    """
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    timeout = app.config.get("SQLALCHEMY_STATEMENT_TIMEOUT")
+
+    for engine in engines:
+        if engine.dialect.name != "sqlite":
+            continue
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+            if timeout:
+                # SQLite has no statement timeout, so interrupt long statements
+                # from the progress handler once their deadline has passed
+                deadline = connection_record.info["statement_deadline"] = [None]
+
+                def _interrupt():
+                    return deadline[0] is not None and time.monotonic() > deadline[0]
+
+                dbapi_connection.set_progress_handler(_interrupt, 1000)
+
+        if timeout:
+
+            @event.listens_for(engine, "before_cursor_execute")
+            def _start_deadline(conn, cursor, statement, parameters, context, executemany):
+                deadline = conn.info.get("statement_deadline")
+                if deadline is not None:
+                    deadline[0] = time.monotonic() + timeout
+
+            @event.listens_for(engine, "after_cursor_execute")
+            def _clear_deadline(conn, cursor, statement, parameters, context, executemany):
+                deadline = conn.info.get("statement_deadline")
+                if deadline is not None:
+                    deadline[0] = None
+
+
+def dispose_engines(engines, close=False):
+    """
+    Drops the pooled connections of every engine
+    :param engines: iterable of SQLAlchemy engines
+    :param close: close the connections too; leave False in a forked child so the
+        parent's sockets are not shut down underneath it
+    """
+    for engine in engines:
+        engine.dispose(close=close)
+
+
+def pool_stats(engines):
+    """
+    Reports pool usage for each engine
+    :param engines: dict of bind key to SQLAlchemy engine
+    :return: list of dicts, one per bind
+    """
+    stats = []
+    for key, engine in engines.items():
+        pool = engine.pool
+        checkouts = getattr(pool, "checkouts", 0)
+        stats.append(
+            {
+                "bind": key or "default",
+                "pool": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "checkouts": checkouts,
+                "timeouts": getattr(pool, "timeouts", 0),
+                "avg_wait_ms": round(getattr(pool, "total_wait", 0.0) * 1000 / checkouts, 3) if checkouts else 0.0,
+                "max_wait_ms": round(getattr(pool, "max_wait", 0.0) * 1000, 3),
+            }
+        )
+    return stats
@@ -0,0 +1,104 @@
+import random
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.util import find_tables
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of read-only requests to a replica bind.
+
+    A request opts in with the ``use_read_replica`` decorator. Everything else
+    (writes, flushes, requests without the decorator) uses the primary, and so
+    does any read of a table this session has already written to, which keeps
+    read-your-writes consistency after a commit.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(self.bind, sa.engine.Connection):
+            # A session joined to an outer transaction runs everything on its connection
+            return self.bind
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self._routes_to_replica(mapper, clause):
+            return primary
+        if primary is not self._db.engines.get(None):
+            # Models with their own bind key are never replicated
+            return primary
+
+        replica = self.info.get("read_replica")
+        if replica is None:
+            # Stick to one replica per session so a request sees a single snapshot
+            replica = random.choice(current_app.config["SQLALCHEMY_READ_REPLICAS"])
+            self.info["read_replica"] = replica
+        return self._db.engines[replica]
+
+    def _routes_to_replica(self, mapper, clause):
+        if not has_app_context() or not g.get("db_read_replica", False):
+            return False
+        if not current_app.config.get("SQLALCHEMY_READ_REPLICAS"):
+            return False
+        if self._flushing or isinstance(clause, sa.sql.dml.UpdateBase):
+            return False
+
+        written = self.info.get("written_tables")
+        if not written:
+            return True
+        tables = set()
+        if mapper is not None:
+            tables.update(table.name for table in sa.inspect(mapper).tables)
+        if clause is not None:
+            tables.update(table.name for table in find_tables(clause, include_joins=True, include_aliases=True))
+        return not tables & written
+
+
+def _mark_written(session, tables):
+    session.info.setdefault("written_tables", set()).update(tables)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    tables = set()
+    for instance in session.new | session.dirty | session.deleted:
+        tables.update(table.name for table in sa.inspect(instance).mapper.tables)
+    _mark_written(session, tables)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_executed_tables(orm_execute_state):
+    statement = orm_execute_state.statement
+    if isinstance(statement, sa.sql.dml.UpdateBase):
+        _mark_written(orm_execute_state.session, {statement.table.name})
+
+
+def sees_uncommitted_writes():
+    """
+    Tells whether the session of the current request may read data that is not committed:
+    it runs inside an outer transaction, such as an atomic batch, or has written since its
+    last commit. Results read through it must not be shared with other requests.
+    :return: bool
+    """
+    session = current_app.extensions["sqlalchemy"].session
+    return bool(session.info.get("outer_transaction") or session.info.get("cache_tags"))
+
+
+def use_read_replica(f):
+    """
+    Route the reads made by a view to a read replica when replicas are configured
+    :param f: view function that performs no writes
+    :return: wrapped view function
+    """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        previous = g.get("db_read_replica", False)
+        g.db_read_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_replica = previous
+
+    return wrapper
@@ -0,0 +1,174 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+from app.db_session import RoutingSession
+
+
+class Subscription:
+    """Bounded buffer of the events not yet sent to one stream"""
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        # Set when the buffer overflowed; the stream ends and the client resumes from history
+        self.overflowed = False
+
+    def get(self, timeout):
+        """
+        :param timeout: seconds to wait for an event
+        :return: event tuple, or None if none arrived in time
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    """
+    Fans events out to the streams of this worker process.
+
+    Event ids are "<boot>-<sequence>": the boot part changes whenever the process starts
+    or forks, so a Last-Event-ID from another worker or an earlier run is recognised as unknown.
+    The last ``history`` events are kept to resume streams that reconnect.
+    """
+
+    def __init__(self, history, buffer_size, max_subscribers):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._start_process()
+
+    def _start_process(self):
+        # A preloaded app is created before the workers fork; each worker needs its own ids
+        self._pid = os.getpid()
+        self.boot = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._history.clear()
+        self._subscribers = set()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def _ensure_process(self):
+        if self._pid != os.getpid():
+            self._start_process()
+
+    def publish(self, event_type, data):
+        """
+        Sends an event to every subscriber, dropping those whose buffer is full
+        :param event_type: SSE event name, e.g. "post-created"
+        :param data: JSON-serializable payload
+        """
+        with self._lock:
+            self._ensure_process()
+            item = (f"{self.boot}-{next(self._sequence)}", event_type, data)
+            self._history.append(item)
+            self.published += 1
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(item)
+                except queue.Full:
+                    subscription.overflowed = True
+                    self._subscribers.discard(subscription)
+                    self.dropped_subscribers += 1
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a stream, replaying the events it missed after last_event_id
+        :param last_event_id: id of the last event the client received
+        :return: tuple of (Subscription or None when at capacity, True if the missed events
+            are no longer known and the client must refetch)
+        """
+        with self._lock:
+            self._ensure_process()
+            if len(self._subscribers) >= self.max_subscribers:
+                return None, False
+            missed, lost = self._missed(last_event_id)
+            subscription = Subscription(max(self.buffer_size, len(missed)))
+            for item in missed:
+                subscription.queue.put_nowait(item)
+            self._subscribers.add(subscription)
+        return subscription, lost
+
+    def _missed(self, last_event_id):
+        if not last_event_id:
+            return [], False
+        boot, _, sequence = last_event_id.partition("-")
+        if boot != self.boot or not sequence.isdigit():
+            return [], True
+        sequence = int(sequence)
+        missed = [item for item in self._history if int(item[0].split("-")[1]) > sequence]
+        oldest = int(self._history[0][0].split("-")[1]) if self._history else sequence + 1
+        return missed, oldest > sequence + 1
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            self._ensure_process()
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped_subscribers": self.dropped_subscribers,
+            }
+
+
+def format_event(item):
+    event_id, event_type, data = item
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def emit(event_type, data):
+    """
+    Queues an event on the current session; it is published once the session commits
+    and dropped if it rolls back
+    :param event_type: SSE event name
+    :param data: JSON-serializable payload
+    """
+    db.session.info.setdefault("pending_events", []).append((event_type, data))
+
+
+def publish_pending(session):
+    """
+    Publishes the events emitted in a committed session
+    :param session: SQLAlchemy session
+    """
+    events = session.info.pop("pending_events", None)
+    broker = current_app.extensions.get("events")
+    if events and broker is not None:
+        for event_type, data in events:
+            broker.publish(event_type, data)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _publish_committed_events(session):
+    if not session.info.get("outer_transaction"):
+        publish_pending(session)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_events(session):
+    session.info.pop("pending_events", None)
+
+
+def init_app(app):
+    """
+    Creates the event broker behind GET /api/stream
+    :param app: Flask application
+    """
+    app.extensions["events"] = EventBroker(
+        history=app.config["EVENT_STREAM_HISTORY"],
+        buffer_size=app.config["EVENT_STREAM_BUFFER"],
+        max_subscribers=app.config["EVENT_STREAM_MAX_SUBSCRIBERS"],
+    )
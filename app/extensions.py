@@ -1,3 +1,6 @@
+from flask import g
+from flask_jwt_extended import JWTManager
+
 authorizations = {
     "jsonWebToken": {
         "type": "apiKey",
@@ -6,3 +9,20 @@ authorizations = {
         "description": "API key in the Authorization header. Example: Bearer <API_KEY>",
     }
 }
+
+
+class BatchJWTManager(JWTManager):
+    """
+    JWTManager letting the sub-requests of a batch reuse the token the batch request verified.
+
+    Every view protected by jwt_required decodes and verifies the Authorization header;
+    sub-requests carry the batch's own header, whose claims the batch keeps in g.batch_token.
+    """
+
+    # flask-jwt-extended routes every decode through this method; tests/test_resources/test_batch.py
+    # checks that a batch still decodes its token once
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        verified = g.get("batch_token")
+        if verified is not None and verified[0] == encoded_token and csrf_value is None:
+            return verified[1]
+        return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
@@ -0,0 +1,185 @@
+import hashlib
+import re
+from collections import Counter
+
+import click
+from flask import current_app
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select, update
+
+from app import db
+from app.models.post import Post
+from app.models.post_fingerprint import PostSimhashBand
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+WORD = re.compile(r"\w+")
+
+
+def _signed(value):
+    # BIGINT columns are signed, so the top bit maps to a negative number
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def content_hash(content):
+    """
+    Hashes content with case and whitespace normalized, so trivially altered copies match
+    :param content: post content
+    :return: first 64 bits of its SHA-256 as a signed int
+    """
+    normalized = " ".join(content.casefold().split())
+    digest = hashlib.sha256(normalized.encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def simhash(content):
+    """
+    Computes the SimHash of the words and word pairs of content; similar texts get
+    signatures that differ in few bits
+    :param content: post content
+    :return: signed 64-bit int, 0 for content without words
+    """
+    words = WORD.findall(content.casefold())
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    digests = [hashlib.blake2b(feature.encode(), digest_size=SIMHASH_BITS // 8).digest() for feature in features]
+
+    # A bit is set when most feature hashes have it set. Counting the byte values seen at
+    # each position first keeps the per-bit work independent of the content length
+    ones = [0] * SIMHASH_BITS
+    for position, column in enumerate(zip(*digests)):
+        low_bit = SIMHASH_BITS - 8 * (position + 1)
+        for byte, count in Counter(column).items():
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ones[low_bit + bit] += count
+    signature = sum(1 << bit for bit, count in enumerate(ones) if 2 * count > len(digests))
+    return _signed(signature)
+
+
+def simhash_bands(signature):
+    """
+    :param signature: signed SimHash
+    :return: list of the SIMHASH_BANDS unsigned BAND_BITS-bit slices of the signature
+    """
+    unsigned = signature % (1 << SIMHASH_BITS)
+    mask = (1 << BAND_BITS) - 1
+    return [unsigned >> (band * BAND_BITS) & mask for band in range(SIMHASH_BANDS)]
+
+
+def hamming_distance(first, second):
+    return bin((first ^ second) % (1 << SIMHASH_BITS)).count("1")
+
+
+def post_fingerprint(content):
+    """
+    :param content: post content
+    :return: dict of the content_hash and simhash column values
+    """
+    return {"content_hash": content_hash(content), "simhash": simhash(content)}
+
+
+def find_duplicate_post(author_id, fingerprint):
+    """
+    Looks for an earlier post of the author with the same or nearly the same content.
+
+    One query reads the posts sharing a SimHash band with the new content through the
+    (author_id, band, value) index; an exact copy shares all of them. Near-duplicates count
+    when their signatures differ in at most POST_DUPLICATE_MAX_DISTANCE bits.
+    :param author_id: internal id of the author
+    :param fingerprint: dict returned by post_fingerprint
+    :return: tuple of (post id, True for an exact copy), or None
+    """
+    signature = fingerprint["simhash"]
+    # One equality on the full index key per band; SQLite seeks a row-value IN by author_id only
+    band_matches = [
+        and_(PostSimhashBand.author_id == author_id, PostSimhashBand.band == band, PostSimhashBand.value == value)
+        for band, value in enumerate(simhash_bands(signature))
+    ]
+    candidates = db.session.execute(
+        select(Post.id, Post.content_hash, Post.simhash)
+        .join(PostSimhashBand, PostSimhashBand.post_id == Post.id)
+        .where(or_(*band_matches))
+        .distinct()
+    ).all()
+
+    max_distance = current_app.config["POST_DUPLICATE_MAX_DISTANCE"]
+    near = None
+    for post_id, candidate_hash, candidate_signature in candidates:
+        if candidate_hash == fingerprint["content_hash"]:
+            return post_id, True
+        # Content without words all shares the signature 0; only exact copies count there
+        if signature and hamming_distance(signature, candidate_signature) <= max_distance:
+            near = near or (post_id, False)
+    return near
+
+
+def record_simhash_bands(connection, post_id, author_id, signature, replace=False):
+    """
+    Writes the SimHash bands of a post inside the caller's transaction
+    :param connection: connection or session of the writing transaction
+    :param post_id: id of the post
+    :param author_id: internal id of the post's author
+    :param signature: simhash of the post's content
+    :param replace: delete the bands of the previous content first
+    """
+    if replace:
+        connection.execute(delete(PostSimhashBand).where(PostSimhashBand.post_id == post_id))
+    connection.execute(
+        insert(PostSimhashBand),
+        [
+            {"post_id": post_id, "band": band, "value": value, "author_id": author_id}
+            for band, value in enumerate(simhash_bands(signature))
+        ],
+    )
+
+
+@event.listens_for(Post, "before_insert")
+@event.listens_for(Post, "before_update")
+def _fingerprint_content(mapper, connection, target):
+    if inspect(target).attrs.content.history.has_changes():
+        for column, value in post_fingerprint(target.content).items():
+            setattr(target, column, value)
+
+
+@event.listens_for(Post, "after_insert")
+def _record_inserted_bands(mapper, connection, target):
+    record_simhash_bands(connection, target.id, target.author_id, target.simhash)
+
+
+@event.listens_for(Post, "after_update")
+def _record_updated_bands(mapper, connection, target):
+    if inspect(target).attrs.simhash.history.has_changes():
+        record_simhash_bands(connection, target.id, target.author_id, target.simhash, replace=True)
+
+
+@click.command("rebuild-post-fingerprints")
+@click.option("--batch-size", default=500, show_default=True, help="Posts fingerprinted per transaction.")
+def rebuild_fingerprints_command(batch_size):
+    """Recompute content fingerprints and SimHash bands of every post."""
+    last_id, total = 0, 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(
+                select(Post.id, Post.author_id, Post.content)
+                .where(Post.id > last_id)
+                .order_by(Post.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for post_id, author_id, content in rows:
+                fingerprint = post_fingerprint(content)
+                # Fingerprints are derived data; keep updated_at so clients see no change
+                connection.execute(
+                    update(Post.__table__)
+                    .where(Post.id == post_id)
+                    .values(updated_at=Post.updated_at, **fingerprint)
+                )
+                record_simhash_bands(connection, post_id, author_id, fingerprint["simhash"], replace=True)
+        last_id, total = rows[-1].id, total + len(rows)
+    click.echo(f"Fingerprinted {total} posts")
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_fingerprints_command)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+from datetime import date, datetime
+from functools import wraps
+
+import click
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from flask_restx import abort
+from flask_restx.utils import unpack
+from sqlalchemy import delete, exc, insert, select, update
+
+from app import db
+from app.db_engine import DIALECT_INSERTS
+from app.models.idempotency_key import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+KEY_MAX_LENGTH = 255
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _scope():
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        # No token was verified for this request
+        identity = None
+    # Anonymous clients get a key space per address, so they cannot replay or block each other's keys;
+    # behind a proxy, remote_addr must be set to the client's address (e.g. by ProxyFix)
+    return identity or f"ip:{request.remote_addr}"
+
+
+def request_fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def reserve_key(scope, key, fingerprint):
+    """
+    Claims a key for the current request in its own transaction, visible to every worker.
+
+    A claim still in progress after IDEMPOTENCY_LEASE is taken over: its worker was
+    killed or lost the connection before it could store a response or release the key.
+    :return: tuple of (claim time when claimed, else None; IdempotencyKey row of the
+        earlier request when not claimed, else None)
+    """
+    now = datetime.utcnow()
+    table = IdempotencyKey.__table__
+    values = {
+        "scope": scope,
+        "key": key,
+        "request_hash": fingerprint,
+        "created_at": now,
+        "expires_at": now + current_app.config["IDEMPOTENCY_KEY_TTL"],
+    }
+    where = (table.c.scope == scope, table.c.key == key)
+    with db.engine.begin() as connection:
+        connection.execute(delete(table).where(*where, table.c.expires_at < now))
+        dialect_insert = DIALECT_INSERTS.get(connection.dialect.name)
+        if dialect_insert is not None:
+            claimed = connection.execute(dialect_insert(table).values(values).on_conflict_do_nothing()).rowcount
+        else:
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(table).values(values))
+                claimed = 1
+            except exc.IntegrityError:
+                claimed = 0
+        if claimed:
+            return now, None
+
+        earlier = connection.execute(select(table).where(*where)).one()
+        lapsed = now - current_app.config["IDEMPOTENCY_LEASE"]
+        if earlier.status_code is None and earlier.request_hash == fingerprint and earlier.created_at < lapsed:
+            # Compare-and-set on the claim time, so only one retry takes the key over
+            taken = connection.execute(
+                update(table)
+                .where(*where, table.c.status_code.is_(None), table.c.created_at == earlier.created_at)
+                .values(created_at=now)
+            ).rowcount
+            if taken:
+                return now, None
+        return None, earlier
+
+
+def _finish(scope, key, claimed_at, status_code=None, response=None):
+    """
+    Stores the response under a claimed key, or releases the key when status_code is None.
+
+    Only the request holding the claim writes. A failure here is logged rather than
+    raised: the view already ran, and the claim lapses after IDEMPOTENCY_LEASE.
+    """
+    table = IdempotencyKey.__table__
+    where = (table.c.scope == scope, table.c.key == key, table.c.created_at == claimed_at)
+    try:
+        with db.engine.begin() as connection:
+            if status_code is None:
+                connection.execute(delete(table).where(*where))
+            else:
+                connection.execute(update(table).where(*where).values(status_code=status_code, response=response))
+    except exc.SQLAlchemyError:
+        current_app.logger.exception("Could not finish %s %s", HEADER, key)
+
+
+def idempotent(f):
+    """
+    Replays the stored response to retries of a request carrying an Idempotency-Key header.
+
+    Responses the view returns with a status below 500 are stored for IDEMPOTENCY_KEY_TTL.
+    After a 5xx, or any exception including the HTTP errors raised with abort(), the key is
+    released so the retry runs the view again. A retry arriving while the first request is
+    still running gets 409, until IDEMPOTENCY_LEASE passes. Put it below ``jwt_required`` so
+    keys are scoped to the user; anonymous requests are scoped to the client address. The
+    view must return JSON-serializable data or datetimes. Sub-requests of an atomic batch
+    ignore the header: their writes commit or roll back with the batch, whose own key
+    covers retries.
+    :param f: view function
+    :return: wrapped view function
+    """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not current_app.config["IDEMPOTENCY_ENABLED"] or db.session.info.get("outer_transaction"):
+            return f(*args, **kwargs)
+        if not key or len(key) > KEY_MAX_LENGTH:
+            abort(400, f"{HEADER} must be 1 to {KEY_MAX_LENGTH} characters long.")
+
+        scope, fingerprint = _scope(), request_fingerprint()
+        claimed_at, earlier = reserve_key(scope, key, fingerprint)
+        if earlier is not None:
+            if earlier.request_hash != fingerprint:
+                abort(422, f"{HEADER} {key} was already used for a different request.")
+            if earlier.status_code is None:
+                abort(409, f"A request with {HEADER} {key} is still in progress.")
+            data, headers = json.loads(earlier.response)
+            return data, earlier.status_code, {**headers, "Idempotent-Replayed": "true"}
+
+        try:
+            data, code, headers = unpack(f(*args, **kwargs))
+            if code >= 500:
+                _finish(scope, key, claimed_at)
+            else:
+                _finish(scope, key, claimed_at, code, json.dumps([data, dict(headers)], default=_json_default))
+        except Exception:
+            _finish(scope, key, claimed_at)
+            raise
+        return data, code, headers
+
+    return wrapper
+
+
+@click.command("prune-idempotency-keys")
+def prune_idempotency_keys_command():
+    """Delete expired Idempotency-Key responses."""
+    with db.engine.begin() as connection:
+        deleted = connection.execute(
+            delete(IdempotencyKey.__table__).where(IdempotencyKey.expires_at < datetime.utcnow())
+        ).rowcount
+    click.echo(f"Pruned {deleted} idempotency keys")
+
+
+def init_app(app):
+    app.cli.add_command(prune_idempotency_keys_command)
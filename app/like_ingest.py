@@ -0,0 +1,266 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, insert, select, tuple_
+
+from app import db
+from app.db_engine import DIALECT_INSERTS
+from app.changes import UPDATED, record_post_changes
+from app.rollups import record_inserted_likes
+from app.models.like import Like
+
+
+def insert_likes_ignoring_duplicates(dialect_name):
+    """
+    Builds an INSERT into likes that skips rows breaking the (user_id, post_id) constraint
+    :param dialect_name: name of the database dialect
+    :return: insert statement
+    """
+    dialect_insert = DIALECT_INSERTS.get(dialect_name)
+    if dialect_insert is None:
+        return insert(Like.__table__)
+    return dialect_insert(Like.__table__).on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+
+
+# Outcomes of a flushed like
+WRITTEN = "written"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+class PendingLike:
+    def __init__(self, user_id, post_id, user_public_id=None):
+        self.user_id = user_id
+        self.post_id = post_id
+        # Identifies the user in the like event published once the like is written
+        self.user_public_id = user_public_id
+        self.created_at = datetime.utcnow()
+        # WRITTEN, DUPLICATE or FAILED once the batch holding the like is flushed
+        self.outcome = None
+        self.committed = threading.Event()
+
+
+class LikeIngestor:
+    """
+    Accepts likes into a bounded queue and writes them in batches from a background thread.
+
+    With LIKE_INGEST_DURABILITY "memory" a like is acknowledged once queued and is lost
+    if the worker dies before the next flush; "commit" holds the response until the batch
+    holding the like is committed, which still groups many requests into one transaction.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config["LIKE_INGEST_QUEUE_SIZE"])
+        self.batch_size = app.config["LIKE_INGEST_BATCH_SIZE"]
+        self.flush_interval = app.config["LIKE_INGEST_FLUSH_INTERVAL"]
+        self._lock = threading.Lock()
+        # post id -> user ids queued or being written, for read-your-writes like counts
+        self._pending = {}
+        self._thread = None
+        self._pid = None
+        self.flushed_batches = 0
+        self.flushed_likes = 0
+
+    def submit(self, user_id, post_id, user_public_id=None):
+        """
+        Queues a like
+        :return: PendingLike, or None when the queue is full
+        """
+        self._ensure_started()
+        like = PendingLike(user_id, post_id, user_public_id)
+        with self._lock:
+            try:
+                self.queue.put_nowait(like)
+            except queue.Full:
+                return None
+            self._pending.setdefault(post_id, set()).add(user_id)
+        return like
+
+    def pending_user_ids(self, post_id):
+        with self._lock:
+            return set(self._pending.get(post_id, ()))
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so every worker starts its own flusher
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="like-ingest", daemon=True)
+                self._thread.start()
+                atexit.register(self.drain)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self, batch):
+        """
+        Inserts a batch of likes in one transaction, dropping duplicates, and records the
+        outcome of every like before signalling it
+        :param batch: list of PendingLike
+        """
+        rows, public_ids = {}, {}
+        for like in batch:
+            rows[like.user_id, like.post_id] = {
+                "user_id": like.user_id,
+                "post_id": like.post_id,
+                "created_at": like.created_at,
+            }
+            public_ids[like.user_id] = like.user_public_id
+        # (user_id, post_id) pairs whose insert committed, whether it added a row or hit an existing one
+        inserted, settled = [], set()
+        try:
+            with self.app.app_context():
+                # Only rows actually inserted come back, so duplicates are not counted in the rollup
+                statement = insert_likes_ignoring_duplicates(db.engine.dialect.name).returning(
+                    Like.post_id, Like.created_at, Like.user_id
+                )
+                try:
+                    with db.engine.begin() as conn:
+                        result = conn.execute(statement, list(rows.values())).all()
+                        record_inserted_likes(conn, result)
+                        record_post_changes(conn, [post_id for post_id, *_ in result], UPDATED)
+                    inserted.extend(result)
+                    settled.update(rows)
+                except Exception:
+                    # One bad row (e.g. its post was deleted meanwhile) must not drop the rest
+                    self.app.logger.exception("Batched like insert failed, inserting one by one")
+                    for key, row in rows.items():
+                        try:
+                            with db.engine.begin() as conn:
+                                result = conn.execute(statement, row).all()
+                                record_inserted_likes(conn, result)
+                                record_post_changes(conn, [post_id for post_id, *_ in result], UPDATED)
+                            inserted.extend(result)
+                            settled.add(key)
+                        except Exception:
+                            self.app.logger.warning(
+                                "Dropped like of post %s by user %s", row["post_id"], row["user_id"]
+                            )
+
+                self.app.extensions["cache"].bump(["likes"])
+                broker = self.app.extensions.get("events")
+                if broker is not None:
+                    for post_id, _, user_id in inserted:
+                        broker.publish("like", {"post_id": str(post_id), "user_id": public_ids[user_id]})
+        finally:
+            with self._lock:
+                for user_id, post_id in rows:
+                    users = self._pending.get(post_id)
+                    if users is not None:
+                        users.discard(user_id)
+                        if not users:
+                            del self._pending[post_id]
+                self.flushed_batches += 1
+                self.flushed_likes += len(rows)
+            # The first like of a pair queued twice owns the inserted row; the other one is a duplicate
+            written = {(user_id, post_id) for post_id, _, user_id in inserted}
+            for like in batch:
+                key = like.user_id, like.post_id
+                if key in written:
+                    like.outcome = WRITTEN
+                    written.discard(key)
+                else:
+                    like.outcome = DUPLICATE if key in settled else FAILED
+                like.committed.set()
+
+    def drain(self, timeout=10):
+        """
+        Waits until every queued like has been written
+        :param timeout: seconds to wait at most
+        :return: True when the queue is empty
+        """
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if self._thread is None or time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+
+def like_count(post_id):
+    """
+    Counts the likes of a post, including the ones still queued in this worker
+    :param post_id: id of the post
+    :return: int
+    """
+    ingestor = current_app.extensions.get("like_ingest")
+    pending = ingestor.pending_user_ids(post_id) if ingestor else set()
+    committed = db.session.execute(select(func.count(Like.id)).where(Like.post_id == post_id)).scalar()
+    if pending:
+        # A like may be committed and still pending for a moment; count it once
+        stored = db.session.execute(
+            select(Like.user_id).where(Like.post_id == post_id, Like.user_id.in_(pending))
+        ).scalars()
+        pending -= set(stored)
+    return committed + len(pending)
+
+
+def like_summaries(post_ids, user_id):
+    """
+    Counts the likes of a page of posts and finds the ones the user liked, including queued likes.
+
+    Runs one grouped count over the page and one lookup of the user's likes on the
+    (user_id, post_id) unique index, whatever the page size.
+    :param post_ids: ids of the posts on the page
+    :param user_id: internal id of the user asking
+    :return: tuple of (dict of post id to like count, set of post ids liked by the user)
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}, set()
+    counts = dict(
+        db.session.execute(
+            select(Like.post_id, func.count(Like.id)).where(Like.post_id.in_(post_ids)).group_by(Like.post_id)
+        ).all()
+    )
+    liked = set(
+        db.session.execute(select(Like.post_id).where(Like.user_id == user_id, Like.post_id.in_(post_ids))).scalars()
+    )
+
+    ingestor = current_app.extensions.get("like_ingest")
+    if ingestor is None:
+        return counts, liked
+    pending = {(post_id, user) for post_id in post_ids for user in ingestor.pending_user_ids(post_id)}
+    if pending:
+        # A like may be committed and still pending for a moment; count it once
+        stored = db.session.execute(
+            select(Like.post_id, Like.user_id).where(tuple_(Like.post_id, Like.user_id).in_(pending))
+        )
+        pending -= set(stored.all())
+    for post_id, pending_user in pending:
+        counts[post_id] = counts.get(post_id, 0) + 1
+        if pending_user == user_id:
+            liked.add(post_id)
+    return counts, liked
+
+
+def init_app(app):
+    """
+    Creates the like ingestor when LIKE_INGEST_ENABLED is set
+    :param app: Flask application
+    """
+    if app.config["LIKE_INGEST_ENABLED"]:
+        app.extensions["like_ingest"] = LikeIngestor(app)
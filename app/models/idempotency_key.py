@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    Response of a POST made with an Idempotency-Key header, replayed to retries of it.
+
+    A row without status_code is a request still being processed.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # Public id of the authenticated user, "ip:<client address>" for anonymous requests
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    # sha256 of method, path and body, so a key cannot be reused for a different request
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    # When the current claim was taken; also identifies the claim when it is finished
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey: scope={self.scope}, key={self.key}, status_code={self.status_code}>"
@@ -7,14 +7,15 @@ class Like(db.Model):
     __tablename__ = "likes"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
-        db.String(50),
-        db.ForeignKey("users.public_id", ondelete="CASCADE"),
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
     )
     post_id = db.Column(
         db.Integer,
         db.ForeignKey("posts.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,49 @@
+from app import db
+
+
+class PostLikeDaily(db.Model):
+    """Likes per post and day, kept up to date with every like written or removed"""
+
+    __tablename__ = "post_like_daily"
+
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Covering indexes: a date range is answered from the index alone
+    __table_args__ = (
+        db.Index("ix_post_like_daily_day_post", "day", "post_id", "like_count"),
+        db.Index("ix_post_like_daily_day_author", "day", "author_id", "like_count"),
+    )
+
+    def __repr__(self):
+        return f"<PostLikeDaily: post_id={self.post_id}, day={self.day}, like_count={self.like_count}>"
+
+
+class PostTrending(db.Model):
+    """
+    Decayed like score of a post.
+
+    A like made at time t adds 2 ** ((t - epoch) / half_life), so scores of older likes
+    never need to be touched: dividing every score by the same factor keeps the order.
+    """
+
+    __tablename__ = "post_trending"
+
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (db.Index("ix_post_trending_score_post", "score", "post_id"),)
+
+    def __repr__(self):
+        return f"<PostTrending: post_id={self.post_id}, score={self.score}>"
+
+
+class TrendingEpoch(db.Model):
+    """The single reference time trending scores are relative to; moved forward by a rebase"""
+
+    __tablename__ = "trending_epoch"
+
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.DateTime, nullable=False)
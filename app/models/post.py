@@ -5,6 +5,7 @@ from sqlalchemy import DateTime
 from sqlalchemy.orm import validates
 
 from app import db
+from app.models.types import CompressedText
 
 
 class Post(db.Model):
@@ -12,16 +13,27 @@ class Post(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), unique=False, nullable=False, index=True)
-    content = db.Column(db.Text(), nullable=False)
+    content = db.Column(CompressedText(), nullable=False)
     slug = db.Column(db.String(140), unique=True)
     date_posted = db.Column(DateTime(), nullable=False, default=datetime.now, index=True)
+    updated_at = db.Column(DateTime(), nullable=False, default=datetime.now, onupdate=datetime.now, index=True)
+    # Fingerprints of the content: 64 bits of its SHA-256 and its SimHash, both signed
+    content_hash = db.Column(db.BigInteger)
+    simhash = db.Column(db.BigInteger)
+    # Incremented on every update; compared against If-Match to reject lost updates
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     author_id = db.Column(
-        db.String(50),
-        db.ForeignKey("users.public_id", ondelete="CASCADE"),
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     likes = db.relationship("Like", backref="post", lazy=True, cascade="all, delete-orphan")
+    simhash_bands = db.relationship("PostSimhashBand", lazy=True, cascade="all, delete-orphan")
+
+    # ORM flushes check and bump the version themselves; Core UPDATEs must do it explicitly
+    __mapper_args__ = {"version_id_col": version}
 
     @validates("title")
     def validate_title(self, key, title):
@@ -32,7 +44,15 @@ class Post(db.Model):
         # pattern = r'[^\w+]'
         if title:
             # self.slug = re.sub(pattern, '-', title).lower()
-            self.slug = slugify(title)
+            self.slug = self.make_slug(title)
+
+    @staticmethod
+    def make_slug(title):
+        return slugify(title)
+
+    @property
+    def author_public_id(self):
+        return self.author.public_id
 
     def __repr__(self):
         return f"Post(id={self.id}, title={self.title}, date_posted={self.date_posted.strftime('%d.%m.%Y-%H.%M')}, author_id={self.author_id})"
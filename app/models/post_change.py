@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from app import db
+
+
+class PostChange(db.Model):
+    """
+    One entry of the post change feed; its id is the change token clients sync from.
+
+    Rows of deleted posts stay behind as tombstones, so post_id has no foreign key.
+    """
+
+    __tablename__ = "post_changes"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<PostChange: id={self.id}, post_id={self.post_id}, operation={self.operation}>"
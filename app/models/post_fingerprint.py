@@ -0,0 +1,22 @@
+from app import db
+
+
+class PostSimhashBand(db.Model):
+    """
+    One 16-bit band of a post's SimHash.
+
+    Two signatures within 3 bits of each other agree on at least one of their four
+    bands, so near-duplicates of a post are found by exact lookups of its bands.
+    """
+
+    __tablename__ = "post_simhash_bands"
+
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    band = db.Column(db.SmallInteger, primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (db.Index("ix_post_simhash_bands_author_band", "author_id", "band", "value"),)
+
+    def __repr__(self):
+        return f"<PostSimhashBand: post_id={self.post_id}, band={self.band}, value={self.value}>"
@@ -0,0 +1,69 @@
+import zlib
+
+from flask import current_app, has_app_context
+from sqlalchemy import LargeBinary, Text
+from sqlalchemy.types import TypeDecorator
+
+# Prefix of compressed values; text stored by PostgreSQL never contains a NUL byte
+COMPRESSED_MARKER = b"\x00"
+
+
+def compress_text(value, min_size, level):
+    """
+    Encodes text for a CompressedText column
+    :param value: str
+    :param min_size: smallest UTF-8 size in bytes that is compressed
+    :param level: zlib compression level
+    :return: UTF-8 bytes, or the marker followed by zlib data
+    """
+    data = value.encode("utf-8")
+    # Text starting with the marker itself is always compressed so it reads back unchanged
+    if len(data) < min_size and not data.startswith(COMPRESSED_MARKER):
+        return data
+    compressed = COMPRESSED_MARKER + zlib.compress(data, level)
+    if len(compressed) >= len(data) and not data.startswith(COMPRESSED_MARKER):
+        return data
+    return compressed
+
+
+def decompress_text(data):
+    """
+    Decodes a value of a CompressedText column
+    :param data: bytes as stored
+    :return: str
+    """
+    if data.startswith(COMPRESSED_MARKER):
+        data = zlib.decompress(data[len(COMPRESSED_MARKER):])
+    return data.decode("utf-8")
+
+
+def compression_enabled():
+    return has_app_context() and current_app.config["POST_CONTENT_COMPRESSION"]
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text that can be stored zlib-compressed.
+
+    The column is TEXT unless POST_CONTENT_COMPRESSION is on. With it on, the column is
+    binary and holds UTF-8 bytes, or the marker followed by zlib data for values of
+    POST_CONTENT_COMPRESS_MIN_SIZE bytes and more; `flask compress-post-content` converts
+    an existing column. Reads accept text, plain bytes and compressed bytes alike.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(LargeBinary() if compression_enabled() else Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not compression_enabled():
+            return value
+        config = current_app.config
+        return compress_text(value, config["POST_CONTENT_COMPRESS_MIN_SIZE"], config["POST_CONTENT_COMPRESS_LEVEL"])
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(bytes(value))
@@ -37,7 +37,11 @@ class User(db.Model):
 
     @password.setter
     def password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = self.hash_password(password)
+
+    @staticmethod
+    def hash_password(password):
+        return bcrypt.generate_password_hash(password).decode("utf-8")
 
     def verify_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
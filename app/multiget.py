@@ -0,0 +1,38 @@
+from flask import current_app, request
+from flask_restx import abort
+from werkzeug.routing import RequestRedirect
+
+
+def requested_ids(convert=str):
+    """
+    Reads the comma-separated ``ids`` query parameter of a multi-get.
+
+    A request without ``ids`` is redirected to the list endpoint it used to resolve to.
+    :param convert: callable turning one id into the type stored in the database
+    :return: list of ids in request order, duplicates kept
+    """
+    if "ids" not in request.args:
+        query = request.query_string.decode()
+        raise RequestRedirect(f"{request.base_url}/" + (f"?{query}" if query else ""))
+
+    ids = [value.strip() for value in request.args["ids"].split(",") if value.strip()]
+    if not ids:
+        abort(400, "ids must list at least one id.")
+    limit = current_app.config["BATCH_IDS_MAX"]
+    if len(ids) > limit:
+        abort(400, f"At most {limit} ids can be requested at once.")
+    try:
+        return [convert(value) for value in ids]
+    except ValueError:
+        abort(400, f"Invalid ids: {request.args['ids']}")
+
+
+def in_request_order(ids, found, field):
+    """
+    Lines results up with the requested ids
+    :param ids: requested ids, as returned by requested_ids
+    :param found: dict of id to the serialized resource
+    :param field: name of the key carrying the resource in each entry
+    :return: list with one entry per requested id; missing ones have found False and field None
+    """
+    return [{"id": str(value), "found": value in found, field: found.get(value)} for value in ids]
@@ -1,19 +1,90 @@
 from datetime import datetime
 
-from flask import request
+from flask import current_app, request
 from flask_jwt_extended import jwt_required
 from flask_restx import Namespace, Resource, abort
-from sqlalchemy import func
+from sqlalchemy import desc, func, select
 
 from app import db
+from app.cache import cached
+from app.conditional import Validators, conditional
+from app.db_session import use_read_replica
 from app.extensions import authorizations
 from app.models.like import Like
+from app.models.like_rollup import PostLikeDaily
+from app.models.post import Post
 from app.models.user import User
-from app.schemas.analytics_schema import like_stats_response_model, user_activity_model
+from app.schemas.analytics_schema import (
+    like_stats_response_model,
+    top_authors_response_model,
+    top_posts_response_model,
+    user_activity_model,
+)
+from app.singleflight import single_flight
 
 analytics_namespace = Namespace("analytics", description="Analytics", authorizations=authorizations)
 
 
+def like_date_range():
+    """
+    Reads the analytics date range from the query string
+    :return: tuple of (date_from, date_to) datetimes
+    :raises ValueError: if a date is not in YYYY-MM-DD format
+    """
+    date_from = request.args.get("date_from")
+    date_to = request.args.get("date_to")
+
+    # Convert strings to date objects
+    date_from = datetime.strptime(date_from, "%Y-%m-%d") if date_from else datetime(1900, 1, 1)
+    date_to = datetime.strptime(date_to, "%Y-%m-%d") if date_to else datetime.now()
+    return date_from, date_to
+
+
+def top_limit():
+    """
+    Reads the number of entries to return from the query string
+    :return: int between 1 and ANALYTICS_TOP_LIMIT_MAX
+    """
+    limit = request.args.get("limit", default=10, type=int)
+    return max(1, min(limit, current_app.config["ANALYTICS_TOP_LIMIT_MAX"]))
+
+
+def ranked_likes(group_column):
+    """
+    Sums the daily like rollup over the requested range and keeps the top entries
+    :param group_column: PostLikeDaily column to rank by
+    :return: subquery of (group_column, like_count), at most top_limit() rows
+    """
+    date_from, date_to = like_date_range()
+    like_count = func.sum(PostLikeDaily.like_count).label("like_count")
+    return (
+        select(group_column.label("ranked_id"), like_count)
+        .where(PostLikeDaily.day.between(date_from.date(), date_to.date()))
+        .group_by(group_column)
+        .having(like_count > 0)
+        .order_by(desc(like_count), group_column)
+        .limit(top_limit())
+        .subquery()
+    )
+
+
+def like_stats_version():
+    """Version of the like statistics of a range: the newest like id and the like count in it"""
+    try:
+        date_from, date_to = like_date_range()
+    except ValueError:
+        return None
+
+    last_like, total = db.session.execute(
+        select(func.max(Like.id), func.count(Like.id)).filter(Like.created_at.between(date_from, date_to))
+    ).one()
+
+    # Ranges that ended before today only change when a like is removed
+    closed = "date_to" in request.args and date_to < datetime.combine(datetime.now().date(), datetime.min.time())
+    max_age = current_app.config["ANALYTICS_PAST_RANGE_MAX_AGE"] if closed else None
+    return Validators(etag=f"likes-{date_from.date()}-{date_to.date()}-{last_like}-{total}", max_age=max_age)
+
+
 @analytics_namespace.route("/")
 class LikeAnalytic(Resource):
     @analytics_namespace.marshal_with(like_stats_response_model, as_list=False, code=200, mask=None)
@@ -29,16 +100,15 @@ class LikeAnalytic(Resource):
         description="Get like statistics for a specified date range.",
     )
     @jwt_required()
+    @use_read_replica
+    @conditional(like_stats_version)
+    @cached(tags=["likes"])
+    @single_flight()
     def get(self):
         """Get like statistics"""
         try:
-            # Retrieve parameters from the request
-            date_from = request.args.get("date_from")
-            date_to = request.args.get("date_to")
-
-            # Convert strings to date objects
-            date_from = datetime.strptime(date_from, "%Y-%m-%d") if date_from else datetime(1900, 1, 1)
-            date_to = datetime.strptime(date_to, "%Y-%m-%d") if date_to else datetime.now()
+            # Retrieve the date range from the request
+            date_from, date_to = like_date_range()
 
             # Execute a database query with daily aggregation
             result = (
@@ -71,6 +141,78 @@ class LikeAnalytic(Resource):
             abort(400, massage="Internal Server Error")
 
 
+top_params = {
+    "date_from": "Start date of the range (Date format YYYY-MM-DD)",
+    "date_to": "End date of the range (Date format YYYY-MM-DD)",
+    "limit": "Number of entries to return (default 10)",
+}
+
+
+@analytics_namespace.route("/top-posts")
+class TopPosts(Resource):
+    @analytics_namespace.marshal_with(top_posts_response_model, as_list=False, code=200, mask=None)
+    @analytics_namespace.doc(
+        responses={200: "Success", 400: "Invalid date"},
+        security="jsonWebToken",
+        params=top_params,
+        description="Most liked posts in a date range, read from the daily like rollup.",
+    )
+    @jwt_required()
+    @use_read_replica
+    @cached(tags=["likes", "posts", "users"])
+    @single_flight()
+    def get(self):
+        """Get the most liked posts"""
+        try:
+            ranked = ranked_likes(PostLikeDaily.post_id)
+        except ValueError as e:
+            abort(400, f"Invalid date. {str(e)}")
+
+        rows = db.session.execute(
+            select(Post.id, Post.title, User.public_id, ranked.c.like_count)
+            .join(ranked, ranked.c.ranked_id == Post.id)
+            .join(User, User.id == Post.author_id)
+            .order_by(desc(ranked.c.like_count), Post.id)
+        )
+        data = [
+            {"id": str(post_id), "title": title, "author_id": author_id, "like_count": like_count}
+            for post_id, title, author_id, like_count in rows
+        ]
+        return {"title": "Top Posts", "data": data}, 200
+
+
+@analytics_namespace.route("/top-authors")
+class TopAuthors(Resource):
+    @analytics_namespace.marshal_with(top_authors_response_model, as_list=False, code=200, mask=None)
+    @analytics_namespace.doc(
+        responses={200: "Success", 400: "Invalid date"},
+        security="jsonWebToken",
+        params=top_params,
+        description="Authors whose posts were liked most in a date range, read from the daily like rollup.",
+    )
+    @jwt_required()
+    @use_read_replica
+    @cached(tags=["likes", "posts", "users"])
+    @single_flight()
+    def get(self):
+        """Get the most liked authors"""
+        try:
+            ranked = ranked_likes(PostLikeDaily.author_id)
+        except ValueError as e:
+            abort(400, f"Invalid date. {str(e)}")
+
+        rows = db.session.execute(
+            select(User.public_id, User.username, ranked.c.like_count)
+            .join(ranked, ranked.c.ranked_id == User.id)
+            .order_by(desc(ranked.c.like_count), User.id)
+        )
+        data = [
+            {"id": public_id, "username": username, "like_count": like_count}
+            for public_id, username, like_count in rows
+        ]
+        return {"title": "Top Authors", "data": data}, 200
+
+
 @analytics_namespace.route("/user/<user_id>")
 class UserAnalytic(Resource):
     @analytics_namespace.marshal_with(user_activity_model, as_list=False, code=200, mask=None)
@@ -80,6 +222,7 @@ class UserAnalytic(Resource):
         description="Retrieve user analytics, including the timestamp of the last login and the last API request.",
     )
     @jwt_required()
+    @use_read_replica
     def get(self, user_id):
         """Retrieve user analytics by user ID."""
         # Retrieve the user from the database based on the provided user ID
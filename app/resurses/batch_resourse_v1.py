@@ -0,0 +1,137 @@
+from flask import current_app, g, request
+from flask_jwt_extended import get_current_user, get_jwt, get_jwt_identity, jwt_required
+from flask_restx import Namespace, Resource, abort
+from werkzeug.exceptions import InternalServerError
+
+from app import db
+from app.admission import admit_request, release_request
+from app.cache import publish_invalidations
+from app.events import publish_pending
+from app.extensions import authorizations
+from app.idempotency import idempotent
+from app.schemas.batch_schema import batch_input_model, batch_response_model
+
+batch_namespace = Namespace("batch", description="Batched requests", authorizations=authorizations)
+
+# Response headers not worth repeating for every sub-request
+SKIPPED_HEADERS = {"Content-Length", "Content-Type"}
+NOT_RUN = {"status": 424, "headers": {}, "body": {"message": "Not run, an earlier request failed."}}
+
+
+def run_sub_request(item):
+    """
+    Dispatches one sub-request to its view inside this process.
+
+    The sub-request shares g, and with it the verified token and the authenticated user,
+    with the batch request. Before-request hooks are skipped, so it takes a slot of its own
+    admission class here. An error the app has no handler for becomes a 500 of this item only.
+    :param item: dict with method, path and optionally body and headers
+    :return: dict with status, headers and body of the response
+    """
+    path = item["path"]
+    rejected = {"status": 400, "headers": {}, "body": {"message": f"Path {path} cannot be batched."}}
+    headers = {**(item.get("headers") or {}), "Authorization": request.headers.get("Authorization", "")}
+    kwargs = {"json": item["body"]} if item.get("body") is not None else {}
+    batch_endpoint = request.endpoint
+    app = current_app._get_current_object()
+    with app.test_request_context(path, method=item["method"], headers=headers, base_url=request.host_url, **kwargs):
+        # Decide on the route the URL map resolved, so encoded paths cannot reach another batch
+        rule = request.url_rule
+        if rule is not None and (not rule.rule.startswith("/api/") or request.endpoint == batch_endpoint):
+            return rejected
+        try:
+            admit_request()
+            rv = app.dispatch_request()
+        except Exception as e:
+            try:
+                rv = app.handle_user_exception(e)
+            except Exception:
+                app.logger.exception("Batched request %s %s failed", item["method"], path)
+                rv = app.handle_user_exception(InternalServerError())
+        finally:
+            release_request()
+        response = app.make_response(rv)
+
+    body = response.get_json(silent=True)
+    return {
+        "status": response.status_code,
+        "headers": {name: value for name, value in response.headers.items() if name not in SKIPPED_HEADERS},
+        "body": body if body is not None else response.get_data(as_text=True),
+    }
+
+
+def run_atomic(items):
+    """
+    Runs the sub-requests in one transaction.
+
+    Views keep calling commit, which only flushes into the outer transaction; the
+    first failing sub-request rolls it back and the remaining ones are not run.
+    :param items: list of sub-request dicts
+    :return: tuple of (committed, results)
+    """
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    db.session.remove()
+    session = db.session.session_factory(bind=connection, join_transaction_mode="rollback_only")
+    session.info["outer_transaction"] = True
+    db.session.registry.set(session)
+    results = []
+    try:
+        for item in items:
+            if results and results[-1]["status"] >= 400:
+                results.append(NOT_RUN)
+                continue
+            results.append(run_sub_request(item))
+
+        committed = transaction.is_active and all(result["status"] < 400 for result in results)
+        if committed:
+            session.flush()
+            transaction.commit()
+            publish_invalidations(session)
+            publish_pending(session)
+        elif transaction.is_active:
+            transaction.rollback()
+        return committed, results
+    finally:
+        db.session.remove()
+        connection.close()
+
+
+@batch_namespace.route("")
+class Batch(Resource):
+    @batch_namespace.expect(batch_input_model, validate=True)
+    @batch_namespace.marshal_with(batch_response_model, as_list=False, code=200, mask=None)
+    @batch_namespace.doc(
+        responses={200: "Success", 400: "Too many requests in the batch"},
+        security="jsonWebToken",
+        description="Run several API requests in one call. The token is verified and the user looked up once; "
+        "with atomic true all writes are committed together or not at all. Likes queued by like ingestion "
+        "are written outside the transaction.",
+    )
+    @jwt_required()
+    @idempotent
+    def post(self):
+        """Run a batch of requests"""
+        data = batch_namespace.payload
+        items = data["requests"]
+        limit = current_app.config["BATCH_REQUESTS_MAX"]
+        if len(items) > limit:
+            abort(400, f"At most {limit} requests can be batched.")
+
+        # Sub-requests carry this request's Authorization header, see BatchJWTManager
+        g.batch_token = (request.headers["Authorization"].split()[-1], get_jwt())
+        g.batch_user = (get_jwt_identity(), get_current_user())
+        try:
+            if data.get("atomic"):
+                committed, results = run_atomic(items)
+                return {"committed": committed, "responses": results}, 200
+            results = []
+            for item in items:
+                results.append(run_sub_request(item))
+                if results[-1]["status"] >= 400:
+                    # Do not let a failed sub-request leave its transaction open for the next one
+                    db.session.rollback()
+            return {"committed": None, "responses": results}, 200
+        finally:
+            g.pop("batch_token", None)
+            g.pop("batch_user", None)
@@ -1,31 +1,44 @@
+from flask import current_app
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restx import Namespace, Resource, abort
 from werkzeug.exceptions import HTTPException
 
 from app import db
+from app.auth.helper import get_current_user_id
+from app.changes import UPDATED, record_post_changes
+from app.events import emit
+from app.idempotency import idempotent
 from app.extensions import authorizations
+from app.like_ingest import DUPLICATE, WRITTEN, like_count
 from app.models.like import Like
 from app.models.post import Post
-from app.schemas.like_schema import like_response_model
+from app.schemas.like_schema import like_count_response_model, like_response_model
 
 like_namespace = Namespace("like", description="Like operations", authorizations=authorizations)
 
 
 @like_namespace.route("/<int:post_id>/like")
 class AllPosts(Resource):
-    @like_namespace.marshal_with(like_response_model, as_list=False, code=200, mask=None)
+    @like_namespace.marshal_with(like_count_response_model, as_list=False, code=200, mask=None)
     @like_namespace.doc(
-        responses={200: "Success", 404: "Post not found"},
+        responses={
+            200: "Success",
+            202: "Like queued",
+            404: "Post not found",
+            409: "Already liked",
+            503: "Like queue full or like not saved",
+        },
         security="jsonWebToken",
-        description="Endpoint to like a post.",
+        description="Endpoint to like a post. With like ingestion enabled the like is queued and written in a batch.",
     )
     @jwt_required()
+    @idempotent
     def post(self, post_id):
         """Like post"""
 
         try:
             # Receive current user id
-            current_user_id = get_jwt_identity()
+            current_user_id = get_current_user_id()
 
             # Check if the current user is the author of the post
             post_author_id = Post.query.filter_by(id=post_id).first().author_id
@@ -38,10 +51,17 @@ class AllPosts(Resource):
                 # Handle the case where the user is trying to like their own post
                 return {"message": "You cannot like your own post."}, 400
 
+            ingestor = current_app.extensions.get("like_ingest")
+            if ingestor is not None:
+                return self.enqueue_like(ingestor, current_user_id, post_id)
+
             like = Like(user_id=current_user_id, post_id=post_id)
             db.session.add(like)
+            # The like count is part of the post, so clients syncing posts must see the change
+            record_post_changes(db.session, [post_id], UPDATED)
+            emit("like", {"post_id": str(post_id), "user_id": get_jwt_identity()})
             db.session.commit()
-            return {"message": f"Post with ID {post_id} was liked"}, 200
+            return {"message": f"Post with ID {post_id} was liked", "like_count": like_count(post_id)}, 200
 
         except HTTPException as e:
             # Handle exceptions and return a  status code on error
@@ -50,6 +70,24 @@ class AllPosts(Resource):
         except Exception as e:
             abort(400, massage="Internal Server Error")
 
+    @staticmethod
+    def enqueue_like(ingestor, user_id, post_id):
+        like = ingestor.submit(user_id, post_id, get_jwt_identity())
+        if like is None:
+            retry_after = current_app.config["ADMISSION_RETRY_AFTER"]
+            return {"message": "Too many likes, retry later."}, 503, {"Retry-After": str(retry_after)}
+
+        if current_app.config["LIKE_INGEST_DURABILITY"] == "commit" and like.committed.wait(
+            current_app.config["LIKE_INGEST_COMMIT_TIMEOUT"]
+        ):
+            if like.outcome == WRITTEN:
+                return {"message": f"Post with ID {post_id} was liked", "like_count": like_count(post_id)}, 200
+            if like.outcome == DUPLICATE:
+                return {"message": f"Post with ID {post_id} is already liked", "like_count": like_count(post_id)}, 409
+            retry_after = current_app.config["ADMISSION_RETRY_AFTER"]
+            return {"message": "Like could not be saved, retry later."}, 503, {"Retry-After": str(retry_after)}
+        return {"message": f"Like of post with ID {post_id} was accepted", "like_count": like_count(post_id)}, 202
+
     @like_namespace.marshal_with(like_response_model, as_list=False, code=200, mask=None)
     @like_namespace.doc(
         responses={200: "Success", 404: "Post not found"},
@@ -62,7 +100,7 @@ class AllPosts(Resource):
 
         try:
             # Receive current user id
-            current_user_id = get_jwt_identity()
+            current_user_id = get_current_user_id()
 
             post = Post.query.get_or_404(post_id)
             if post.author_id != current_user_id:
@@ -72,8 +110,10 @@ class AllPosts(Resource):
                 return {"message": "User has not liked this post"}, 404
 
             db.session.delete(like)
+            record_post_changes(db.session, [post_id], UPDATED)
+            emit("unlike", {"post_id": str(post_id), "user_id": get_jwt_identity()})
             db.session.commit()
-            return {"message": f"Post with ID {post_id} was unliked by user {current_user_id}"}, 200
+            return {"message": f"Post with ID {post_id} was unliked by user {get_jwt_identity()}"}, 200
 
         except HTTPException as e:
             abort(e.code, f"Internal Server Error. {str(e)}")
@@ -0,0 +1,57 @@
+from flask import current_app
+from flask_jwt_extended import jwt_required
+from flask_restx import Namespace, Resource
+
+from app import db
+from app.admission import admission_stats
+from app.db_engine import pool_stats
+from app.extensions import authorizations
+from app.schemas.metrics_schema import (
+    admission_stats_response_model,
+    cache_stats_model,
+    pool_stats_response_model,
+)
+
+metrics_namespace = Namespace("metrics", description="Runtime metrics", authorizations=authorizations)
+
+
+@metrics_namespace.route("/pool")
+class PoolMetrics(Resource):
+    @metrics_namespace.marshal_with(pool_stats_response_model, as_list=False, code=200, mask=None)
+    @metrics_namespace.doc(
+        responses={200: "Success"},
+        security="jsonWebToken",
+        description="Connection pool usage of this worker process, per database bind.",
+    )
+    @jwt_required()
+    def get(self):
+        """Get connection pool statistics"""
+        return {"data": pool_stats(db.engines)}, 200
+
+
+@metrics_namespace.route("/admission")
+class AdmissionMetrics(Resource):
+    @metrics_namespace.marshal_with(admission_stats_response_model, as_list=False, code=200, mask=None)
+    @metrics_namespace.doc(
+        responses={200: "Success"},
+        security="jsonWebToken",
+        description="Admitted and shed requests of this worker process, per endpoint class.",
+    )
+    @jwt_required()
+    def get(self):
+        """Get admission control statistics"""
+        return {"data": admission_stats(current_app)}, 200
+
+
+@metrics_namespace.route("/cache")
+class CacheMetrics(Resource):
+    @metrics_namespace.marshal_with(cache_stats_model, as_list=False, code=200, mask=None)
+    @metrics_namespace.doc(
+        responses={200: "Success"},
+        security="jsonWebToken",
+        description="Response cache hits and misses of this worker process.",
+    )
+    @jwt_required()
+    def get(self):
+        """Get response cache statistics"""
+        return current_app.extensions["cache_stats"].as_dict(), 200
@@ -1,24 +1,130 @@
-from flask import request
+import base64
+import binascii
+import json
+import re
+from datetime import datetime
+
+from flask import Response, current_app, request, stream_with_context
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restx import Namespace, Resource
 from flask_restx.errors import abort
 from marshmallow.exceptions import ValidationError
-from sqlalchemy import desc
-from werkzeug.exceptions import HTTPException
+from sqlalchemy import desc, func, insert, literal_column, select, tuple_, update
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import Conflict, HTTPException, PreconditionFailed
+from werkzeug.http import quote_etag
 
 from app import db
+from app.auth.helper import get_current_user_id
+from app.cache import cached
+from app.changes import CREATED, DELETED, UPDATED, changes_expired, read_post_changes, record_post_changes
+from app.compression import ENCODINGS
+from app.conditional import Validators, conditional
+from app.db_session import use_read_replica
+from app.events import emit
+from app.fingerprints import find_duplicate_post, post_fingerprint, record_simhash_bands
+from app.idempotency import idempotent
+from app.like_ingest import like_summaries
+from app.models.like import Like
+from app.models.like_rollup import PostTrending, TrendingEpoch
 from app.models.post import Post
+from app.models.post_change import PostChange
+from app.models.user import User
+from app.multiget import in_request_order, requested_ids
 from app.schemas.post_schema import (
     PostInputSchema,
     SimplPostSchema,
     all_posts_response_model,
+    post_batch_response_model,
+    post_changes_response_model,
     delete_confirmation_model,
     post_input_model,
     post_model,
+    trending_posts_response_model,
 )
+from app.rollups import trending_weight
+from app.singleflight import single_flight
 
 post_namespace = Namespace("post", description="Post operations")
 
+# Columns serialized by post_model, read back from INSERT/UPDATE ... RETURNING
+POST_COLUMNS = (Post.id, Post.title, Post.content, Post.slug, Post.date_posted, Post.version)
+# RETURNING renders the updated table's columns unqualified, which subqueries would
+# resolve against their own tables, so correlate through explicitly qualified columns
+UPDATED_POST_ID = literal_column(f"{Post.__tablename__}.id")
+UPDATED_POST_AUTHOR_ID = literal_column(f"{Post.__tablename__}.author_id")
+
+
+def post_list_version():
+    """
+    Version of the post list as seen by the current user. Every post added, edited or removed
+    and every like added or removed appends to the post change feed, so the newest feed id
+    changes with the list; it is read from the primary key index, whatever the table sizes
+    """
+    last_change = db.session.execute(select(func.max(PostChange.id))).scalar()
+    # liked_by_me differs per user, so an ETag is never valid for another user
+    etag = f"posts-{last_change or 0}-{get_current_user_id()}"
+    # Deletions leave no timestamp behind, so only the ETag can answer with 304
+    return Validators(etag=etag)
+
+
+def post_details(post_ids):
+    """
+    Loads posts as serialized by post_model, with their authors and like counts, in one query
+    :param post_ids: ids of the posts
+    :return: dict of post id to post; missing posts are left out
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+    rows = db.session.execute(
+        select(*POST_COLUMNS, User.public_id.label("author_public_id"), func.count(Like.id).label("likes"))
+        .join(User, User.id == Post.author_id)
+        .outerjoin(Like, Like.post_id == Post.id)
+        .where(Post.id.in_(post_ids))
+        .group_by(Post.id, User.public_id)
+    )
+    # Cached responses are stored as JSON, so the dates go in already formatted
+    return {row.id: {**row._asdict(), "date_posted": row.date_posted.isoformat()} for row in rows}
+
+
+def post_etag(post_id, version, likes):
+    return f"post-{post_id}-v{version}-{likes}"
+
+
+def if_match_version(post_id):
+    """
+    Reads the post version the client based its edit on from If-Match
+    :param post_id: id of the post being edited
+    :return: version number, or None when the header is absent or "*"
+    :raises PreconditionFailed: if no strong tag of the header belongs to this post
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    # Tags carry the like count too, which an edit does not depend on, so only the version is compared.
+    # If-Match uses the strong comparison, so weak tags never match; compressed responses carry the coding.
+    pattern = re.compile(rf"post-{post_id}-v(\d+)-\d+(?:-(?:{'|'.join(ENCODINGS)}))?")
+    for tag in if_match.as_set():
+        match = pattern.fullmatch(tag)
+        if match:
+            return int(match.group(1))
+    raise PreconditionFailed(f"If-Match does not name a version of post {post_id}.")
+
+
+def post_version(post_id):
+    """Version of a single post: its version counter plus its likes"""
+    row = db.session.execute(
+        select(Post.version, func.count(Like.id).label("likes"))
+        .outerjoin(Like, Like.post_id == Post.id)
+        .where(Post.id == post_id)
+        .group_by(Post.id)
+    ).one_or_none()
+    if row is None:
+        return None
+    # Removing a like leaves no timestamp behind, so only the ETag can answer with 304
+    return Validators(etag=post_etag(post_id, row.version, row.likes), strong=True)
+
 
 @post_namespace.route("/")
 class AllPosts(Resource):
@@ -31,6 +137,10 @@ class AllPosts(Resource):
     # Specify the response model and status code for the 'get' operation
     @post_namespace.marshal_with(all_posts_response_model, as_list=False, code=200, mask=None)
     @jwt_required()
+    @use_read_replica
+    @conditional(post_list_version)
+    @cached(tags=["posts", "users", "likes"], per_user=True)
+    @single_flight(per_user=True)
     def get(self):
         """Get all posts"""
         # Retrieve 'limit' and 'page' from query parameters
@@ -41,17 +151,27 @@ class AllPosts(Resource):
             # Paginate the posts and retrieve the current page items
             if limit is None:
                 # If the per_page parameter is not specified, return all records
-                posts = Post.query.order_by(desc(Post.date_posted)).all()
+                posts = Post.query.options(joinedload(Post.author)).order_by(desc(Post.date_posted)).all()
 
             else:
                 # Otherwise, use pagination
-                paginated_posts = Post.query.order_by(desc(Post.date_posted)).paginate(page=page, per_page=limit)
+                paginated_posts = (
+                    Post.query.options(joinedload(Post.author))
+                    .order_by(desc(Post.date_posted))
+                    .paginate(page=page, per_page=limit)
+                )
                 posts = paginated_posts.items
 
             # Serialize post data using SimplPostSchema
             posts_schema = SimplPostSchema(many=True)
             serialized_posts = posts_schema.dump(posts)
 
+            # Add like information for the whole page with a constant number of queries
+            counts, liked = like_summaries([post.id for post in posts], get_current_user_id())
+            for post, serialized in zip(posts, serialized_posts):
+                serialized["like_count"] = counts.get(post.id, 0)
+                serialized["liked_by_me"] = post.id in liked
+
             # Create a response data structure with total count and serialized post data
             total_posts = len(serialized_posts)
             response_data = {"total": total_posts, "data": serialized_posts}
@@ -68,11 +188,13 @@ class AllPosts(Resource):
     @post_namespace.expect(post_input_model, validate=True)
     @post_namespace.marshal_with(post_model, as_list=False, code=201, mask=None)
     @post_namespace.doc(
-        responses={200: "Success", 404: "Post not found"},
+        responses={200: "Success", 404: "Post not found", 409: "Same or nearly the same as an earlier post"},
         security="jsonWebToken",
-        description="Endpoint to create a new post.",
+        description="Endpoint to create a new post. Retries with the same Idempotency-Key header get the "
+        "original response. Posts repeating one of the author's earlier posts are rejected.",
     )
     @jwt_required()
+    @idempotent
     def post(self):
         """Create a new post."""
         try:
@@ -81,26 +203,46 @@ class AllPosts(Resource):
             post_data = PostInputSchema().load(data)
 
             # Receive current user id
-            current_user_id = get_jwt_identity()
-
-            # Extract post data from the validated payload and create a new post instance
-            new_post = Post(
-                title=post_data["title"],
-                content=post_data["content"],
-                author_id=current_user_id,
+            current_user_id = get_current_user_id()
+
+            # Reject reposts with one lookup of the fingerprint index, before anything is written
+            fingerprint = post_fingerprint(post_data["content"])
+            if current_app.config["POST_DUPLICATE_CHECK_ENABLED"]:
+                duplicate = find_duplicate_post(current_user_id, fingerprint)
+                if duplicate is not None:
+                    duplicate_id, exact = duplicate
+                    raise Conflict(f"{'Same' if exact else 'Nearly the same'} content as post {duplicate_id}")
+
+            # Insert the new post and read the generated values back in the same statement
+            new_post = db.session.execute(
+                insert(Post)
+                .values(
+                    title=post_data["title"],
+                    content=post_data["content"],
+                    slug=Post.make_slug(post_data["title"]),
+                    author_id=current_user_id,
+                    **fingerprint,
+                )
+                .returning(*POST_COLUMNS)
+            ).one()
+            record_simhash_bands(db.session, new_post.id, current_user_id, fingerprint["simhash"])
+            record_post_changes(db.session, [new_post.id], CREATED)
+            emit(
+                "post-created",
+                {"id": str(new_post.id), "title": new_post.title, "author_id": get_jwt_identity()},
             )
-
-            # Add the new post to the database and commit the transaction
-            db.session.add(new_post)
             db.session.commit()
 
             # Return the new post data with a 201 status code
-            return new_post, 201
+            return {**new_post._asdict(), "author_public_id": get_jwt_identity(), "likes": 0}, 201
 
         except ValidationError as e:
             # Handle payload validation errors and return a 400 status code with error messages
             abort(400, f"Error validating post data: {str(e.messages)}")
 
+        except Conflict as e:
+            abort(409, e.description)
+
         except HTTPException as e:
             # Handle other exceptions (e.g., database-related errors)
             db.session.rollback()
@@ -110,6 +252,152 @@ class AllPosts(Resource):
             abort(400, massage="Internal Server Error")
 
 
+@post_namespace.route("")
+class PostBatch(Resource):
+    @post_namespace.marshal_with(post_batch_response_model, as_list=False, code=200, mask=None)
+    @post_namespace.doc(
+        params={"ids": "Comma-separated post IDs, at most BATCH_IDS_MAX"},
+        responses={200: "Success", 400: "Invalid or too many ids"},
+        security="jsonWebToken",
+        description="Get several posts by ID in one request. Missing posts come back with found false.",
+    )
+    @jwt_required()
+    @use_read_replica
+    @cached(tags=["posts", "users", "likes"])
+    @single_flight()
+    def get(self):
+        """Get posts by ID"""
+        ids = requested_ids(int)
+        return {"data": in_request_order(ids, post_details(ids), "post")}, 200
+
+
+@post_namespace.route("/changes")
+class PostChanges(Resource):
+    @post_namespace.marshal_with(post_changes_response_model, as_list=False, code=200, mask=None)
+    @post_namespace.doc(
+        params={"since": "next_token of the previous call, 0 or absent for everything", "limit": "Changes to scan"},
+        responses={200: "Success", 400: "Invalid token", 410: "Token too old, download the full list again"},
+        security="jsonWebToken",
+        description="Posts created, updated or deleted after a change token, oldest first. Keep calling with "
+        "next_token while has_more is true.",
+    )
+    @jwt_required()
+    @use_read_replica
+    def get(self):
+        """Get post changes since a token"""
+        try:
+            since = int(request.args.get("since") or 0)
+        except ValueError:
+            abort(400, "Invalid token.")
+        limit = request.args.get("limit", default=100, type=int)
+        limit = max(1, min(limit, current_app.config["CHANGE_FEED_PAGE_SIZE_MAX"]))
+        if changes_expired(since):
+            abort(410, "Changes since this token were pruned, download the full list again.")
+
+        changes, next_token, more = read_post_changes(since, limit)
+        posts = post_details(post_id for _, post_id, operation in changes if operation != DELETED)
+        data = [
+            {"token": str(token), "post_id": str(post_id), "operation": operation, "post": posts.get(post_id)}
+            for token, post_id, operation in changes
+        ]
+        return {"data": data, "next_token": str(next_token), "has_more": more}, 200
+
+
+@post_namespace.route("/export")
+class PostExport(Resource):
+    @post_namespace.produces(["application/x-ndjson"])
+    @post_namespace.doc(
+        responses={200: "Success"},
+        security="jsonWebToken",
+        description="Stream every post as newline-delimited JSON, newest first.",
+    )
+    @jwt_required()
+    @use_read_replica
+    def get(self):
+        """Export all posts as NDJSON"""
+        chunk_size = current_app.config["POST_EXPORT_CHUNK_SIZE"]
+
+        # yield_per fetches rows through a server-side cursor, chunk_size rows at a time
+        rows = db.session.execute(
+            select(*POST_COLUMNS, User.public_id.label("author_id"))
+            .join(User, User.id == Post.author_id)
+            .order_by(desc(Post.date_posted))
+            .execution_options(yield_per=chunk_size)
+        )
+
+        def generate():
+            for chunk in rows.partitions():
+                yield "".join(
+                    json.dumps({**row._asdict(), "date_posted": row.date_posted.isoformat()}) + "\n"
+                    for row in chunk
+                )
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def encode_cursor(score, post_id):
+    # repr() round-trips the float exactly, so the next page starts right after this row
+    return base64.urlsafe_b64encode(f"{score!r}:{post_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    :param cursor: value of a previous next_cursor
+    :return: tuple of (score, post_id)
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        score, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(score), int(post_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+
+@post_namespace.route("/trending")
+class TrendingPosts(Resource):
+    @post_namespace.marshal_with(trending_posts_response_model, as_list=False, code=200, mask=None)
+    @post_namespace.doc(
+        params={"limit": "Page size (default 20)", "cursor": "next_cursor of the previous page"},
+        responses={200: "Success", 400: "Invalid cursor"},
+        security="jsonWebToken",
+        description="Posts ranked by like score decaying with TRENDING_HALF_LIFE, paged by cursor.",
+    )
+    @jwt_required()
+    @use_read_replica
+    @single_flight()
+    def get(self):
+        """Get trending posts"""
+        limit = request.args.get("limit", default=20, type=int)
+        limit = max(1, min(limit, current_app.config["TRENDING_PAGE_SIZE_MAX"]))
+        query = (
+            select(PostTrending.post_id, PostTrending.score, Post.title, User.public_id)
+            .join(Post, Post.id == PostTrending.post_id)
+            .join(User, User.id == Post.author_id)
+            .where(PostTrending.score > 0)
+            .order_by(desc(PostTrending.score), desc(PostTrending.post_id))
+            .limit(limit + 1)
+        )
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                query = query.where(tuple_(PostTrending.score, PostTrending.post_id) < tuple_(*decode_cursor(cursor)))
+            except ValueError:
+                abort(400, "Invalid cursor.")
+
+        rows = db.session.execute(query).all()
+        epoch = db.session.execute(select(TrendingEpoch.epoch).where(TrendingEpoch.id == 1)).scalar()
+        # Stored scores are relative to the epoch; scale them to a like made now
+        scale = trending_weight(epoch, datetime.utcnow()) if epoch else 1.0
+
+        page, more = rows[:limit], len(rows) > limit
+        data = [
+            {"id": str(post_id), "title": title, "author": author, "score": round(score * scale, 6)}
+            for post_id, score, title, author in page
+        ]
+        next_cursor = encode_cursor(page[-1].score, page[-1].post_id) if more else None
+        return {"data": data, "next_cursor": next_cursor}, 200
+
+
 @post_namespace.route("/<int:post_id>")
 class PostResource(Resource):
     @post_namespace.marshal_with(post_model, as_list=False, code=200, mask=None)
@@ -119,6 +407,8 @@ class PostResource(Resource):
         description="Get details of a specific post by ID.",
     )
     @jwt_required()
+    @use_read_replica
+    @conditional(post_version)
     def get(self, post_id):
         """Get a specific post by ID."""
         try:
@@ -130,39 +420,71 @@ class PostResource(Resource):
     @post_namespace.expect(post_input_model, validate=True)
     @post_namespace.marshal_with(post_model, as_list=False, code=200, mask=None)
     @post_namespace.doc(
-        responses={200: "Success", 404: "Post not found"},
+        responses={200: "Success", 404: "Post not found", 412: "Post changed since the If-Match version"},
         security="jsonWebToken",
-        description="Update a specific post by ID.",
+        description="Update a specific post by ID. Send the post's ETag in If-Match to have the update "
+        "rejected if someone else changed the post in between.",
     )
     @jwt_required()
     def put(self, post_id):
         """Update a specific post by ID."""
+        expected_version = if_match_version(post_id)
         try:
             # Validate and load post data using Marshmallow schema
             data = post_namespace.payload
             post_data = PostInputSchema().load(data)
 
-            # Retrieve the post by ID or return a 404 error if not found
-            post = Post.query.get_or_404(post_id, description=f"Post with ID {post_id} not found")
-
-            # Update post data
-            post.title = post_data.get("title", post.title)
-            post.content = post_data.get("content", post.content)
+            # Update the post and read the result back in the same statement; with If-Match
+            # the version check makes it a compare-and-set without locking the row
+            condition = [Post.id == post_id]
+            if expected_version is not None:
+                condition.append(Post.version == expected_version)
+            fingerprint = post_fingerprint(post_data["content"])
+            post = db.session.execute(
+                update(Post)
+                .where(*condition)
+                .values(
+                    title=post_data["title"],
+                    content=post_data["content"],
+                    slug=Post.make_slug(post_data["title"]),
+                    version=Post.version + 1,
+                    **fingerprint,
+                )
+                .returning(
+                    *POST_COLUMNS,
+                    Post.author_id,
+                    select(User.public_id)
+                    .where(User.id == UPDATED_POST_AUTHOR_ID)
+                    .scalar_subquery()
+                    .label("author_public_id"),
+                    select(func.count(Like.id)).where(Like.post_id == UPDATED_POST_ID).scalar_subquery().label("likes"),
+                )
+                .execution_options(synchronize_session=False)
+            ).one_or_none()
+
+            # Return a 412 error if the post was edited since the client read it, else a 404 error
+            if post is None:
+                if expected_version is not None and db.session.get(Post, post_id) is not None:
+                    abort(412, f"Post with ID {post_id} was modified, fetch it again")
+                abort(404, f"Post with ID {post_id} not found")
 
             # Commit changes to the database
+            record_simhash_bands(db.session, post_id, post.author_id, fingerprint["simhash"], replace=True)
+            record_post_changes(db.session, [post_id], UPDATED)
+            emit("post-updated", {"id": str(post_id), "title": post.title})
             db.session.commit()
 
             # Return the updated post with a 200 status code
-            return post, 200
+            etag = quote_etag(post_etag(post_id, post.version, post.likes))
+            return post._asdict(), 200, {"ETag": etag}
 
         except ValidationError as e:
             # Handle payload validation errors and return a 400 status code with error messages
             abort(400, f"Error validating post data: {str(e.messages)}")
 
-        except HTTPException as e:
-            # Handle exceptions and return a 500 status code on error
-            print(f"Error updating post: {str(e)}")
-            abort(e.code, f"Error updating Post.")
+        except HTTPException:
+            # The 404 and 412 above already carry their message
+            raise
 
         except Exception as e:
             abort(400, massage="Internal Server Error")
@@ -181,6 +503,8 @@ class PostResource(Resource):
             post = Post.query.get_or_404(post_id)
             # Delete the post from the database
             db.session.delete(post)
+            record_post_changes(db.session, [post_id], DELETED)
+            emit("post-deleted", {"id": str(post_id)})
             db.session.commit()
 
             # Return a success message with a 200 status code
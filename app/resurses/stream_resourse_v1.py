@@ -0,0 +1,52 @@
+from flask import Response, current_app, request
+from flask_jwt_extended import jwt_required
+from flask_restx import Namespace, Resource
+
+from app.events import format_event
+from app.extensions import authorizations
+
+stream_namespace = Namespace("stream", description="Live events", authorizations=authorizations)
+
+
+@stream_namespace.route("")
+class EventStream(Resource):
+    @stream_namespace.produces(["text/event-stream"])
+    @stream_namespace.doc(
+        params={"last_event_id": "Resume after this event id; the Last-Event-ID header takes precedence"},
+        responses={200: "Success", 503: "Too many streams"},
+        security="jsonWebToken",
+        description="Server-Sent Events for post-created, post-updated, post-deleted, like and unlike. "
+        "A reset event means events were missed and the client must refetch.",
+    )
+    @jwt_required()
+    def get(self):
+        """Stream post and like events"""
+        config = current_app.config
+        broker = current_app.extensions["events"]
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        subscription, lost = broker.subscribe(last_event_id)
+        if subscription is None:
+            retry_after = config["ADMISSION_RETRY_AFTER"]
+            return {"message": "Too many streams, retry later."}, 503, {"Retry-After": str(retry_after)}
+
+        heartbeat = config["EVENT_STREAM_HEARTBEAT"]
+
+        def generate():
+            try:
+                yield f"retry: {config['EVENT_STREAM_RETRY_MS']}\n\n"
+                if lost:
+                    yield "event: reset\ndata: {}\n\n"
+                # After an overflow the buffered events are sent and the stream closes, so the
+                # client reconnects and resumes from the history
+                while not (subscription.overflowed and subscription.queue.empty()):
+                    item = subscription.get(heartbeat)
+                    yield format_event(item) if item is not None else ": keep-alive\n\n"
+            finally:
+                broker.unsubscribe(subscription)
+
+        # The generator reads nothing from the request, so the request context is not kept open
+        return Response(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
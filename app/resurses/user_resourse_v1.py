@@ -4,8 +4,15 @@ from flask_restx import Namespace, Resource
 from flask_restx.errors import abort
 from werkzeug.exceptions import HTTPException
 
+from sqlalchemy import select
+
+from app import db
+from app.cache import cached
+from app.db_session import use_read_replica
 from app.models.user import User
-from app.schemas.user_schema import SimplUserSchema, all_users_response_model
+from app.multiget import in_request_order, requested_ids
+from app.schemas.user_schema import SimplUserSchema, all_users_response_model, user_batch_response_model
+from app.singleflight import single_flight
 
 # Create a namespace for user operations
 user_namespace = Namespace("user", description="User operations")
@@ -23,6 +30,9 @@ class AllUsers(Resource):
     # Specify the response model and status code for the 'get' operation
     @user_namespace.marshal_with(all_users_response_model, as_list=False, code=200, mask=None)
     @jwt_required()
+    @use_read_replica
+    @cached(tags=["users"])
+    @single_flight()
     def get(self):
         """Get all users"""
         # Retrieve 'limit' and 'page' from query parameters
@@ -55,3 +65,31 @@ class AllUsers(Resource):
 
         except Exception as e:
             abort(400, massage="Internal Server Error")
+
+
+@user_namespace.route("")
+class UserBatch(Resource):
+    @user_namespace.marshal_with(user_batch_response_model, as_list=False, code=200, mask=None)
+    @user_namespace.doc(
+        params={"ids": "Comma-separated user IDs, at most BATCH_IDS_MAX"},
+        responses={200: "Success", 400: "Invalid or too many ids"},
+        security="jsonWebToken",
+        description="Get several users with their activity by ID in one request. Missing users come back with "
+        "found false.",
+    )
+    @jwt_required()
+    @use_read_replica
+    @single_flight()
+    def get(self):
+        """Get users by ID"""
+        ids = requested_ids()
+        users = db.session.execute(select(User).where(User.public_id.in_(set(ids)))).scalars()
+        found = {
+            user.public_id: {
+                **SimplUserSchema().dump(user),
+                "last_login": user.last_login,
+                "last_api_request": user.last_api_request,
+            }
+            for user in users
+        }
+        return {"data": in_request_order(ids, found, "user")}, 200
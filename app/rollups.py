@@ -0,0 +1,270 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import Date, Integer, bindparam, delete, event, func, insert, select, text, update
+
+from app import db
+from app.db_engine import DIALECT_INSERTS
+from app.models.like import Like
+from app.models.like_rollup import PostLikeDaily, PostTrending, TrendingEpoch
+from app.models.post import Post
+
+rollup = PostLikeDaily.__table__
+
+ROLLUP_COLUMNS = ["post_id", "author_id", "day", "like_count"]
+# One rollup row for the post named by the bound parameters
+ROLLUP_SOURCE = select(
+    Post.id,
+    Post.author_id,
+    bindparam("rollup_day", type_=Date),
+    bindparam("rollup_delta", type_=Integer),
+).where(Post.id == bindparam("rollup_post_id"))
+
+
+def record_like_deltas(connection, deltas):
+    """
+    Adds like count changes to the daily rollup inside the caller's transaction
+    :param connection: connection of the transaction that wrote the likes
+    :param deltas: mapping of (post_id, day) to the change in likes
+    """
+    params = [
+        {"rollup_post_id": post_id, "rollup_day": day, "rollup_delta": delta}
+        for (post_id, day), delta in deltas.items()
+        if delta
+    ]
+    if not params:
+        return
+
+    dialect_insert = DIALECT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(rollup).from_select(ROLLUP_COLUMNS, ROLLUP_SOURCE)
+        statement = statement.on_conflict_do_update(
+            index_elements=["post_id", "day"],
+            set_={"like_count": rollup.c.like_count + statement.excluded.like_count},
+        )
+        connection.execute(statement, params)
+        return
+
+    # Without ON CONFLICT: update existing days, then insert the ones that were missing
+    for row in params:
+        updated = connection.execute(
+            update(rollup)
+            .where(rollup.c.post_id == bindparam("rollup_post_id"), rollup.c.day == bindparam("rollup_day"))
+            .values(like_count=rollup.c.like_count + bindparam("rollup_delta")),
+            row,
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(rollup).from_select(ROLLUP_COLUMNS, ROLLUP_SOURCE), row)
+
+
+def record_inserted_likes(connection, rows):
+    """
+    Counts likes written with Core statements, which bypass the mapper events below
+    :param connection: connection of the inserting transaction
+    :param rows: iterable of (post_id, created_at, ...) of the rows actually inserted
+    """
+    rows = [(post_id, created_at) for post_id, created_at, *_ in rows]
+    record_like_deltas(connection, Counter((post_id, created_at.date()) for post_id, created_at in rows))
+    record_trending(connection, [(post_id, created_at, 1) for post_id, created_at in rows])
+
+
+class TrendingState:
+    """Epoch of the trending scores as last seen by this process, and its background rebase"""
+
+    def __init__(self):
+        self.epoch = None
+        self.rebase = None
+        self.lock = threading.Lock()
+
+
+def trending_epoch(connection, for_update=False):
+    """
+    Reads the reference time of the trending scores, creating it on first use
+    :param connection: connection inside a transaction
+    :param for_update: lock the epoch exclusively, for a rebase
+    :return: datetime
+    """
+    query = select(TrendingEpoch.epoch).where(TrendingEpoch.id == 1)
+    if for_update:
+        query = query.with_for_update()
+    epoch = connection.execute(query).scalar()
+    if epoch is None:
+        values = {"id": 1, "epoch": datetime.utcnow().replace(microsecond=0)}
+        dialect_insert = DIALECT_INSERTS.get(connection.dialect.name)
+        if dialect_insert is None:
+            connection.execute(insert(TrendingEpoch.__table__).values(**values))
+        else:
+            # Another transaction may create it at the same time
+            statement = dialect_insert(TrendingEpoch.__table__).values(**values)
+            connection.execute(statement.on_conflict_do_nothing(index_elements=["id"]))
+        epoch = connection.execute(query).scalar()
+    return epoch
+
+
+def trending_weight(moment, epoch):
+    """
+    Score a like made at moment adds, relative to epoch
+    :return: float, doubling every TRENDING_HALF_LIFE
+    """
+    half_life = current_app.config["TRENDING_HALF_LIFE"].total_seconds()
+    return 2.0 ** ((moment - epoch).total_seconds() / half_life)
+
+
+def record_trending(connection, likes):
+    """
+    Adds likes to, or removes them from, the trending scores inside the caller's transaction
+    :param connection: connection of the transaction that wrote the likes
+    :param likes: iterable of (post_id, created_at, +1 or -1)
+    """
+    likes = list(likes)
+    if not likes:
+        return
+
+    state = current_app.extensions["trending"]
+    epoch = state.epoch or trending_epoch(connection)
+    applied = {}
+    while True:
+        deltas = defaultdict(float)
+        for post_id, created_at, sign in likes:
+            deltas[post_id] += sign * trending_weight(created_at, epoch)
+        _add_scores(connection, {post_id: delta - applied.get(post_id, 0.0) for post_id, delta in deltas.items()})
+        applied = deltas
+        # A rebase committed since the epoch was cached has rescaled the scores these deltas
+        # landed on; correct them to the new epoch. One still running waits for this transaction
+        current = trending_epoch(connection)
+        if current == epoch:
+            break
+        epoch = current
+    state.epoch = epoch
+
+    half_lives = (datetime.utcnow() - epoch) / current_app.config["TRENDING_HALF_LIFE"]
+    if half_lives > current_app.config["TRENDING_REBASE_AFTER"]:
+        _start_rebase(current_app._get_current_object())
+
+
+def _add_scores(connection, deltas):
+    params = [{"post_id": post_id, "score": delta} for post_id, delta in deltas.items()]
+    table = PostTrending.__table__
+    dialect_insert = DIALECT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=["post_id"], set_={"score": table.c.score + statement.excluded.score}
+            ),
+            params,
+        )
+        return
+
+    for row in params:
+        updated = connection.execute(
+            update(table).where(table.c.post_id == row["post_id"]).values(score=table.c.score + row["score"])
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(**row))
+
+
+def rebase_trending(connection, now=None, due_only=False):
+    """
+    Moves the epoch to now, rescaling every score so weights of new likes stay small,
+    and drops posts whose score has decayed away
+    :param connection: connection inside a transaction
+    :param now: new epoch, defaults to the current time
+    :param due_only: skip the rebase unless the epoch is TRENDING_REBASE_AFTER half-lives old
+    :return: number of posts left with a score, or None when skipped
+    """
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    epoch = trending_epoch(connection, for_update=True)
+    config = current_app.config
+    if due_only and (now - epoch) / config["TRENDING_HALF_LIFE"] <= config["TRENDING_REBASE_AFTER"]:
+        return None
+    table = PostTrending.__table__
+    if connection.dialect.name == "postgresql":
+        # Writers read the epoch after adding their scores; blocking them until the rebase
+        # commits makes sure they see the new one if their scores miss the rescale
+        connection.execute(text(f"LOCK TABLE {table.name} IN EXCLUSIVE MODE"))
+    connection.execute(update(table).values(score=table.c.score * trending_weight(epoch, now)))
+    connection.execute(delete(table).where(table.c.score < current_app.config["TRENDING_MIN_SCORE"]))
+    connection.execute(update(TrendingEpoch.__table__).where(TrendingEpoch.id == 1).values(epoch=now))
+    return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+def _start_rebase(app):
+    state = app.extensions["trending"]
+    with state.lock:
+        if state.rebase is not None and state.rebase.is_alive():
+            return
+        # In its own transaction, so the like that noticed the old epoch does not wait for it
+        state.rebase = threading.Thread(target=_rebase_when_due, args=(app,), name="trending-rebase", daemon=True)
+        state.rebase.start()
+
+
+def _rebase_when_due(app):
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                remaining = rebase_trending(connection, due_only=True)
+        except Exception:
+            app.logger.exception("Trending rebase failed")
+            return
+        if remaining is not None:
+            app.logger.info("Rebased trending scores, %s posts still trending", remaining)
+
+
+@event.listens_for(Like, "after_insert")
+def _count_like(mapper, connection, target):
+    record_like_deltas(connection, {(target.post_id, target.created_at.date()): 1})
+    record_trending(connection, [(target.post_id, target.created_at, 1)])
+
+
+@event.listens_for(Like, "before_delete")
+def _uncount_like(mapper, connection, target):
+    record_like_deltas(connection, {(target.post_id, target.created_at.date()): -1})
+    record_trending(connection, [(target.post_id, target.created_at, -1)])
+
+
+def rebuild_rollups(connection):
+    """
+    Recomputes the daily rollup and the trending scores from the likes table
+    :param connection: connection inside a transaction
+    """
+    day = func.date(Like.created_at)
+    connection.execute(delete(rollup))
+    connection.execute(
+        insert(rollup).from_select(
+            ROLLUP_COLUMNS,
+            select(Like.post_id, Post.author_id, day, func.count(Like.id))
+            .join(Post, Post.id == Like.post_id)
+            .group_by(Like.post_id, Post.author_id, day),
+        )
+    )
+
+    connection.execute(delete(PostTrending.__table__))
+    likes = connection.execute(select(Like.post_id, Like.created_at).execution_options(yield_per=10000))
+    for chunk in likes.partitions():
+        record_trending(connection, [(post_id, created_at, 1) for post_id, created_at in chunk])
+
+
+@click.command("rebuild-like-rollups")
+def rebuild_rollups_command():
+    """Recompute post_like_daily and post_trending from the likes table."""
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    click.echo("Rebuilt post_like_daily and post_trending")
+
+
+@click.command("rebase-trending")
+def rebase_trending_command():
+    """Move the trending epoch to now; recording likes also does it once TRENDING_REBASE_AFTER is reached."""
+    with db.engine.begin() as connection:
+        remaining = rebase_trending(connection)
+    click.echo(f"Rebased trending scores, {remaining} posts still trending")
+
+
+def init_app(app):
+    app.extensions["trending"] = TrendingState()
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebase_trending_command)
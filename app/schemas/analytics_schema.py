@@ -27,3 +27,38 @@ like_stats_response_model = api.model(
         "total_likes": fields.Integer(description="Total number of likes", example=4),
     },
 )
+
+top_post_model = api.model(
+    "Top Post",
+    {
+        "id": fields.String(description="Post ID"),
+        "title": fields.String(description="Post title"),
+        "author_id": fields.String(description="Public ID of the author"),
+        "like_count": fields.Integer(description="Likes in the date range", example=42),
+    },
+)
+
+top_posts_response_model = api.model(
+    "Top Posts Response",
+    {
+        "title": fields.String(description="Title of the statistics", example="Top Posts"),
+        "data": fields.List(fields.Nested(top_post_model)),
+    },
+)
+
+top_author_model = api.model(
+    "Top Author",
+    {
+        "id": fields.String(description="Public ID of the author"),
+        "username": fields.String(description="Username of the author"),
+        "like_count": fields.Integer(description="Likes on the author's posts in the date range", example=42),
+    },
+)
+
+top_authors_response_model = api.model(
+    "Top Authors Response",
+    {
+        "title": fields.String(description="Title of the statistics", example="Top Authors"),
+        "data": fields.List(fields.Nested(top_author_model)),
+    },
+)
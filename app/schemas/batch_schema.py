@@ -0,0 +1,43 @@
+from flask_restx import fields
+
+from app import api
+
+batch_item_model = api.model(
+    "Batch Item",
+    {
+        "method": fields.String(
+            description="HTTP method", required=True, enum=["GET", "POST", "PUT", "DELETE"], example="GET"
+        ),
+        "path": fields.String(description="API path including the query string", required=True, example="/api/post/1"),
+        "body": fields.Raw(description="JSON body of the sub-request"),
+        "headers": fields.Raw(description="Extra headers of the sub-request, e.g. If-Match", example={}),
+    },
+)
+
+batch_input_model = api.model(
+    "Batch",
+    {
+        "requests": fields.List(fields.Nested(batch_item_model), required=True, min_items=1),
+        "atomic": fields.Boolean(
+            description="Run all sub-requests in one transaction, committed only if every one succeeds",
+            default=False,
+        ),
+    },
+)
+
+batch_result_model = api.model(
+    "Batch Result",
+    {
+        "status": fields.Integer(description="HTTP status of the sub-request", example=200),
+        "headers": fields.Raw(description="Response headers of the sub-request"),
+        "body": fields.Raw(description="JSON body of the sub-request's response"),
+    },
+)
+
+batch_response_model = api.model(
+    "Batch Response",
+    {
+        "committed": fields.Boolean(description="Atomic batches: whether the transaction was committed, else null"),
+        "responses": fields.List(fields.Nested(batch_result_model), description="One result per sub-request, in order"),
+    },
+)
@@ -8,3 +8,11 @@ like_response_model = api.model(
         "message": fields.String(description="message", required=True),
     },
 )
+
+like_count_response_model = api.model(
+    "Like Response",
+    {
+        "message": fields.String(description="message", required=True),
+        "like_count": fields.Integer(description="Likes of the post, including ones still being written"),
+    },
+)
@@ -0,0 +1,57 @@
+from flask_restx import fields
+
+from app import api
+
+pool_stats_model = api.model(
+    "Pool Statistics",
+    {
+        "bind": fields.String(description="Bind key of the engine", example="default"),
+        "pool": fields.String(description="Pool implementation", example="TimedQueuePool"),
+        "size": fields.Integer(description="Configured pool size"),
+        "checked_out": fields.Integer(description="Connections currently checked out"),
+        "overflow": fields.Integer(description="Connections open above the pool size"),
+        "checkouts": fields.Integer(description="Checkouts since the pool was created"),
+        "timeouts": fields.Integer(description="Checkouts that gave up waiting for a connection"),
+        "avg_wait_ms": fields.Float(description="Average wait for a connection in milliseconds"),
+        "max_wait_ms": fields.Float(description="Longest wait for a connection in milliseconds"),
+    },
+)
+
+pool_stats_response_model = api.model(
+    "Pool Statistics Response",
+    {
+        "data": fields.List(fields.Nested(pool_stats_model)),
+    },
+)
+
+admission_stats_model = api.model(
+    "Admission Statistics",
+    {
+        "endpoint_class": fields.String(description="Endpoint class the limits apply to", example="read"),
+        "concurrency": fields.Integer(description="Requests allowed to run at once"),
+        "queue": fields.Integer(description="Requests allowed to wait for a slot"),
+        "in_flight": fields.Integer(description="Requests currently running"),
+        "waiting": fields.Integer(description="Requests currently waiting for a slot"),
+        "admitted": fields.Integer(description="Requests admitted since the worker started"),
+        "shed_queue_full": fields.Integer(description="Requests rejected because the queue was full"),
+        "shed_timeout": fields.Integer(description="Requests rejected after waiting too long for a slot"),
+        "max_wait_ms": fields.Float(description="Longest wait for a slot in milliseconds"),
+    },
+)
+
+admission_stats_response_model = api.model(
+    "Admission Statistics Response",
+    {
+        "data": fields.List(fields.Nested(admission_stats_model)),
+    },
+)
+
+cache_stats_model = api.model(
+    "Cache Statistics",
+    {
+        "backend": fields.String(description="Configured cache backend", example="sqlite"),
+        "hits": fields.Integer(description="Lookups answered from the cache by this worker"),
+        "misses": fields.Integer(description="Lookups that ran the view in this worker"),
+        "hit_ratio": fields.Float(description="Hits divided by lookups"),
+    },
+)
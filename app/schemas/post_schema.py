@@ -8,7 +8,11 @@ from app import api
 
 class ListCount(fields.Integer):
     def output(self, key, obj, *args, **kwargs):
-        return int(len(obj.likes))
+        value = fields.get_value(key if self.attribute is None else self.attribute, obj)
+        # Rows built from RETURNING carry the count itself instead of the collection
+        if isinstance(value, int):
+            return value
+        return int(len(value))
 
 
 # Post model for simplified representation
@@ -19,6 +23,8 @@ simpl_post_model = api.model(
         "title": fields.String(description="Post title", required=True),
         "author": fields.String(description="Post author", required=True),
         "date_posted": fields.DateTime(description="Date_posted", required=True),
+        "like_count": fields.Integer(description="Number of likes", default=0),
+        "liked_by_me": fields.Boolean(description="Whether the requesting user liked the post", default=False),
     },
 )
 
@@ -30,9 +36,10 @@ post_model = api.model(
         "title": fields.String(description="Post title", required=True),
         "content": fields.String(description="Post content", required=True),
         "slug": fields.String(description="Post slug", required=True),
-        "author_id": fields.String(description="Post author", required=True),
+        "author_id": fields.String(attribute="author_public_id", description="Post author", required=True),
         "date_posted": fields.DateTime(description="Date_posted", required=True),
         "likes": ListCount(description="Likes", required=True),
+        "version": fields.Integer(description="Incremented on every update", required=True),
     },
 )
 
@@ -50,6 +57,59 @@ all_posts_response_model = api.model(
     },
 )
 
+post_batch_item_model = api.model(
+    "Post Batch Item",
+    {
+        "id": fields.String(description="Requested post ID", required=True),
+        "found": fields.Boolean(description="False when no post has this ID", required=True),
+        "post": fields.Nested(post_model, allow_null=True, description="The post, null when not found"),
+    },
+)
+
+post_batch_response_model = api.model(
+    "Post Batch",
+    {
+        "data": fields.List(fields.Nested(post_batch_item_model), description="One entry per requested ID, in order"),
+    },
+)
+
+post_change_model = api.model(
+    "Post Change",
+    {
+        "token": fields.String(description="Change token of this entry", required=True),
+        "post_id": fields.String(description="Post ID", required=True),
+        "operation": fields.String(description="Latest change", enum=["created", "updated", "deleted"], required=True),
+        "post": fields.Nested(post_model, allow_null=True, description="Current post, null once deleted"),
+    },
+)
+
+post_changes_response_model = api.model(
+    "Post Changes",
+    {
+        "data": fields.List(fields.Nested(post_change_model), description="Latest change of each post, oldest first"),
+        "next_token": fields.String(description="Pass as since to get the following changes", required=True),
+        "has_more": fields.Boolean(description="More changes follow next_token", required=True),
+    },
+)
+
+trending_post_model = api.model(
+    "Trending Post",
+    {
+        "id": fields.String(description="Post ID", required=True),
+        "title": fields.String(description="Post title", required=True),
+        "author": fields.String(description="Post author", required=True),
+        "score": fields.Float(description="Decayed like score; a like made now counts 1", required=True),
+    },
+)
+
+trending_posts_response_model = api.model(
+    "Trending Posts",
+    {
+        "data": fields.List(fields.Nested(trending_post_model), required=True),
+        "next_cursor": fields.String(description="Pass as cursor to get the next page; null on the last page"),
+    },
+)
+
 post_input_model = api.model(
     "Create post",
     {
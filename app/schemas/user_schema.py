@@ -30,6 +30,32 @@ all_users_response_model = api.model(
     },
 )
 
+# User model including activity timestamps, as returned by the multi-get
+user_detail_model = api.inherit(
+    "User Detail",
+    simpl_user_model,
+    {
+        "last_login": fields.DateTime(description="Last login", dt_format="iso8601"),
+        "last_api_request": fields.DateTime(description="Last API request", dt_format="iso8601"),
+    },
+)
+
+user_batch_item_model = api.model(
+    "User Batch Item",
+    {
+        "id": fields.String(description="Requested user ID", required=True),
+        "found": fields.Boolean(description="False when no user has this ID", required=True),
+        "user": fields.Nested(user_detail_model, allow_null=True, description="The user, null when not found"),
+    },
+)
+
+user_batch_response_model = api.model(
+    "User Batch",
+    {
+        "data": fields.List(fields.Nested(user_batch_item_model), description="One entry per requested ID, in order"),
+    },
+)
+
 
 class SimplUserSchema(Schema):
     id = ma_fields.String(attribute="public_id")
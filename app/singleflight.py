@@ -0,0 +1,115 @@
+import threading
+from functools import wraps
+
+from flask import current_app, request
+
+from app.db_session import sees_uncommitted_writes
+
+
+class Flight:
+    """One in-progress computation that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FlightGroup:
+    """Shares the result of a call among the threads that ask for the same key while it runs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, timeout):
+        """
+        Runs fn, or waits for the call already running under key
+        :param key: hashable identity of the computation
+        :param fn: callable without arguments
+        :param timeout: seconds to wait for another thread before running fn anyway
+        :return: result of fn
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                return fn()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            # Later requests start a fresh computation instead of reusing a finished one
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+def request_key(per_user):
+    """
+    Identifies the current request for single-flight purposes
+    :param per_user: include the authenticated user so results never cross users
+    :return: tuple of endpoint, view arguments, normalized query string and user scope
+    """
+    from app.auth.helper import get_current_user_id
+
+    args = []
+    for name, values in request.args.lists():
+        values = sorted(value.strip() for value in values if value.strip())
+        if values:
+            args.append((name, tuple(values)))
+    view_args = tuple(sorted((request.view_args or {}).items()))
+    scope = get_current_user_id() if per_user else None
+    return request.endpoint, view_args, tuple(sorted(args)), scope
+
+
+def single_flight(per_user=False):
+    """
+    Lets concurrent identical requests share one run of the view.
+
+    Place it below ``jwt_required`` so only authenticated requests share results.
+    Views whose output depends on who asks must pass ``per_user=True``.
+    The returned data is shared between requests and must not be mutated. Requests whose
+    session sees uncommitted writes run the view on their own.
+    :param per_user: scope shared results to the authenticated user
+    :return: decorator
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not current_app.config["SINGLE_FLIGHT_ENABLED"] or sees_uncommitted_writes():
+                return f(*args, **kwargs)
+            return current_app.extensions["single_flight"].do(
+                request_key(per_user),
+                lambda: f(*args, **kwargs),
+                current_app.config["SINGLE_FLIGHT_TIMEOUT"],
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def init_app(app):
+    """
+    Creates the flight group shared by the threads of this worker process
+    :param app: Flask application
+    """
+    app.extensions["single_flight"] = FlightGroup()
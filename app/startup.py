@@ -0,0 +1,181 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app
+
+# Namespace name, module defining it, attribute and URL prefix, in registration order
+NAMESPACES = [
+    ("auth", "app.auth.auth_resourse_v1", "auth_namespace", "/api/auth"),
+    ("user", "app.resurses.user_resourse_v1", "user_namespace", "/api/user"),
+    ("post", "app.resurses.post_resourse_v1", "post_namespace", "/api/post"),
+    ("like", "app.resurses.like_resourse_v1", "like_namespace", "/api/post"),
+    ("analytics", "app.resurses.analitics_resourse_v1", "analytics_namespace", "/api/analytics"),
+    ("metrics", "app.resurses.metrics_resourse_v1", "metrics_namespace", "/api/metrics"),
+    ("batch", "app.resurses.batch_resourse_v1", "batch_namespace", "/api/batch"),
+    ("stream", "app.resurses.stream_resourse_v1", "stream_namespace", "/api/stream"),
+]
+
+
+class StartupTimer:
+    """Records how long each phase of create_app takes"""
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.phases = {}
+
+    def mark(self, phase):
+        """
+        Closes the phase that ran since the previous mark
+        :param phase: name of the phase
+        """
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.last) * 1000, 2)
+        self.last = now
+
+    @property
+    def total_ms(self):
+        return round((self.last - self.started) * 1000, 2)
+
+
+# Api internals _register_resources relies on; flask_restx is pinned in requirements.txt, and
+# tests/test_startup.py fails if an upgrade drops one of them
+RESTX_INTERNALS = ("default_endpoint", "endpoints", "ns_urls", "_register_view")
+
+
+def _register_resources(api, app, namespace):
+    """
+    Registers the resources of a namespace on an app the Api is no longer initialised with,
+    as Api._register_view does for its own app
+    :param api: flask-restx Api the namespace was added to
+    :param app: Flask application receiving the routes
+    :param namespace: flask-restx Namespace
+    """
+    missing = [name for name in RESTX_INTERNALS if not hasattr(api, name)]
+    if missing:
+        raise RuntimeError(f"flask-restx {', '.join(missing)} not found; deferred namespaces need the pinned version")
+    for resource in namespace.resources:
+        kwargs = dict(resource.kwargs)
+        kwargs["endpoint"] = str(kwargs.get("endpoint") or api.default_endpoint(resource.resource, namespace))
+        api.endpoints.add(kwargs["endpoint"])
+        api._register_view(app, resource.resource, namespace, *api.ns_urls(namespace, resource.urls), **kwargs)
+
+
+def _add_namespace(app, name):
+    from app import api
+
+    _, module, attribute, path = next(entry for entry in NAMESPACES if entry[0] == name)
+    namespace = getattr(importlib.import_module(module), attribute)
+    if api.app is app:
+        api.add_namespace(namespace, path=path)
+        return
+
+    # The global Api registers routes on the app it was last initialised with. When a later app
+    # has taken it over, the routes go to this app directly instead of pointing the Api back here
+    if namespace not in api.namespaces:
+        api.add_namespace(namespace, path=path)
+    _register_resources(api, app, namespace)
+
+
+def register_namespaces(app):
+    """
+    Registers every namespace not listed in DEFERRED_NAMESPACES
+    :param app: Flask application
+    """
+    deferred = set(app.config["DEFERRED_NAMESPACES"])
+    app.extensions["deferred_namespaces"] = {"pending": [], "lock": threading.Lock()}
+    for name, *_ in NAMESPACES:
+        if name in deferred:
+            app.extensions["deferred_namespaces"]["pending"].append(name)
+        else:
+            _add_namespace(app, name)
+
+    state = app.extensions["deferred_namespaces"]
+    if state["pending"]:
+        wsgi_app = app.wsgi_app
+
+        def register_then_dispatch(environ, start_response):
+            # Read without the lock: once the list is empty every route is in place
+            if state["pending"]:
+                register_deferred_namespaces(app)
+            return wsgi_app(environ, start_response)
+
+        app.wsgi_app = register_then_dispatch
+
+
+def register_deferred_namespaces(app):
+    """
+    Imports and registers the deferred namespaces, once.
+
+    Runs ahead of the first request because Flask refuses new routes after it, or in the
+    gunicorn master once the app is preloaded.
+    :param app: Flask application
+    """
+    state = app.extensions["deferred_namespaces"]
+    with state["lock"]:
+        if not state["pending"]:
+            return
+        while state["pending"]:
+            _add_namespace(app, state["pending"][0])
+            # Dropped only once registered, so a failed import is retried by the next request
+            state["pending"].pop(0)
+        app.logger.info("Registered deferred namespaces")
+
+
+def parse_importtime(stderr, top):
+    """
+    Sums the self time of `python -X importtime` output per top-level package
+    :param stderr: text written by the interpreter
+    :param top: how many packages to report
+    :return: list of (package, ms) sorted slowest first
+    """
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, module = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        totals[module.strip().split(".")[0]] += int(own) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+PROFILE_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+timer = app.extensions["startup"]
+print(json.dumps({"import_app": round((imported - started) * 1000, 2), **timer.phases, "total": timer.total_ms}))
+"""
+
+
+@click.command("startup-profile")
+@click.option("--top", default=15, show_default=True, help="Number of packages to list by import time.")
+def startup_profile_command(top):
+    """Profile imports and create_app phases in a fresh interpreter."""
+    env = {**os.environ, "FLASK_ENV": current_app.config["ENV"]}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(current_app.root_path),
+    )
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    click.echo("create_app phases (ms)")
+    for phase, elapsed in phases.items():
+        click.echo(f"  {phase:<20}{elapsed:>10.2f}")
+    click.echo("Slowest imports by package (ms)")
+    for package, elapsed in parse_importtime(result.stderr, top):
+        click.echo(f"  {package:<20}{elapsed:>10.2f}")
@@ -0,0 +1,113 @@
+"""
+Measures what POST_CONTENT_COMPRESSION does to database size and read throughput.
+
+Builds the same set of posts twice in temporary SQLite databases, once with compression
+off and once on, then reports the file size after VACUUM and the best of five full scans
+of the post titles and of the post contents:
+
+    python -m benchmarks.post_content_compression --posts 20000
+
+Post texts are cut from the plain-text documentation of standard library modules, so
+they compress like English prose; 60% are 30-120 words and 40% are 400-3000 words.
+"""
+import argparse
+import importlib
+import os
+import pydoc
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert, select, text
+
+from app import create_app, db
+from app.models.post import Post
+from app.models.user import User
+
+CORPUS_MODULES = ["argparse", "asyncio", "collections", "datetime", "decimal", "email", "json", "logging", "os", "re"]
+
+
+def make_contents(count, seed):
+    """
+    :param count: number of posts
+    :param seed: random seed, so both runs store the same posts
+    :return: list of post texts
+    """
+    rng = random.Random(seed)
+    words = " ".join(
+        pydoc.render_doc(importlib.import_module(name), renderer=pydoc.plaintext) for name in CORPUS_MODULES
+    ).split()
+    contents = []
+    for _ in range(count):
+        length = rng.choice([30, 60, 120]) if rng.random() < 0.6 else rng.randint(400, 3000)
+        start = rng.randrange(len(words) - length)
+        contents.append(" ".join(words[start:start + length]))
+    return contents
+
+
+def best_rate(statement, repeat=5):
+    timings, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(db.session.execute(statement).all())
+        timings.append(time.perf_counter() - started)
+    return rows / min(timings)
+
+
+def run(contents, compression, directory):
+    """
+    Stores the posts in a fresh database and measures it
+    :return: dict of file size in MB and rows/s of the two scans
+    """
+    path = os.path.join(directory, f"posts-{'compressed' if compression else 'plain'}.sqlite")
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "POST_CONTENT_COMPRESSION": compression,
+            "CACHE_BACKEND": "null",
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        author = User(username="benchmark", email="benchmark@example.com", password="benchmark")
+        db.session.add(author)
+        db.session.commit()
+        # Bulk inserts skip the per-post fingerprinting, which is the same work either way
+        db.session.execute(
+            insert(Post),
+            [
+                {"title": f"Post {n}", "slug": f"post-{n}", "content": content, "author_id": author.id}
+                for n, content in enumerate(contents)
+            ],
+        )
+        db.session.commit()
+        db.session.execute(text("VACUUM"))
+        result = {
+            "size_mb": os.path.getsize(path) / 2**20,
+            "titles_per_s": best_rate(select(Post.id, Post.title, Post.date_posted)),
+            "contents_per_s": best_rate(select(Post.id, Post.content)),
+        }
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000, help="Number of posts to store.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the post texts.")
+    args = parser.parse_args()
+
+    contents = make_contents(args.posts, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for compression in (False, True):
+            result = run(contents, compression, directory)
+            print(
+                f"compression {'on ' if compression else 'off'}  {result['size_mb']:8.1f} MB  "
+                f"titles {result['titles_per_s']:>10,.0f} rows/s  contents {result['contents_per_s']:>10,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Gunicorn settings taken from the config class selected by FLASK_ENV
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+from app.config import config as config_classes
+
+settings = config_classes[os.environ.get("FLASK_ENV", "development")]
+
+bind = settings.SERVER_BIND
+workers = settings.SERVER_WORKERS
+worker_class = settings.SERVER_WORKER_CLASS
+threads = settings.SERVER_THREADS
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+preload_app = settings.SERVER_PRELOAD_APP
+
+
+def _engines():
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def when_ready(server):
+    # A preloaded app is created before the workers fork, so deferring namespaces saves them
+    # nothing; register them here rather than on each worker's first request
+    if preload_app:
+        from app.startup import register_deferred_namespaces
+        from wsgi import app
+
+        register_deferred_namespaces(app)
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the forked workers
+    from app.db_engine import dispose_engines
+
+    dispose_engines(_engines(), close=False)
+
+
+def worker_exit(server, worker):
+    from app.db_engine import dispose_engines
+    from wsgi import app
+
+    # Write out queued likes before the connections go away
+    ingestor = app.extensions.get("like_ingest")
+    if ingestor is not None:
+        ingestor.drain(timeout=settings.SERVER_GRACEFUL_TIMEOUT)
+    dispose_engines(_engines(), close=True)
@@ -0,0 +1,25 @@
+"""Add Post version.
+
+Revision ID: 0a7c2e9d4b18
+Revises: f3b8d1e5a960
+Create Date: 2026-10-19 20:21:36.270914
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0a7c2e9d4b18"
+down_revision = "f3b8d1e5a960"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,49 @@
+"""Add post content fingerprints.
+
+Adds the exact hash and SimHash of post content and the SimHash bands that
+POST /api/post looks duplicates up by. Run `flask rebuild-post-fingerprints`
+afterwards to fingerprint existing posts.
+
+Revision ID: 2c8f5a1d9e64
+Revises: 0a7c2e9d4b18
+Create Date: 2026-10-19 21:48:05.207613
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2c8f5a1d9e64"
+down_revision = "0a7c2e9d4b18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column("simhash", sa.BigInteger(), nullable=True))
+
+    op.create_table(
+        "post_simhash_bands",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("band", sa.SmallInteger(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id", "band"),
+    )
+    with op.batch_alter_table("post_simhash_bands", schema=None) as batch_op:
+        batch_op.create_index("ix_post_simhash_bands_author_band", ["author_id", "band", "value"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("post_simhash_bands", schema=None) as batch_op:
+        batch_op.drop_index("ix_post_simhash_bands_author_band")
+
+    op.drop_table("post_simhash_bands")
+
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.drop_column("simhash")
+        batch_op.drop_column("content_hash")
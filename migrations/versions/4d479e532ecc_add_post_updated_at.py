@@ -0,0 +1,32 @@
+"""Add Post updated_at.
+
+Revision ID: 4d479e532ecc
+Revises: 677318014be9
+Create Date: 2026-10-19 13:40:08.512377
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4d479e532ecc"
+down_revision = "677318014be9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE posts SET updated_at = date_posted")
+
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index(batch_op.f("ix_posts_updated_at"), ["updated_at"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("posts", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_posts_updated_at"))
+        batch_op.drop_column("updated_at")
@@ -0,0 +1,113 @@
+"""Integer user foreign keys.
+
+Moves posts.author_id and likes.user_id from users.public_id strings to
+integer users.id references. The upgrade runs online: the new columns are
+added nullable, backfilled in batches outside the migration transaction,
+indexed concurrently, and only then swapped in under a short lock.
+
+Revision ID: 677318014be9
+Revises: fcd5c0f007f5
+Create Date: 2026-10-19 10:12:41.203518
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "677318014be9"
+down_revision = "fcd5c0f007f5"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def _backfill(table, target, source, only_missing=False):
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text(f"SELECT max(id) FROM {table}")).scalar() or 0
+    missing = f" AND {table}.{target} IS NULL" if only_missing else ""
+    for low in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+        connection.execute(
+            sa.text(
+                f"UPDATE {table} SET {target} = users.id FROM users "
+                f"WHERE users.public_id = {table}.{source} AND {table}.id BETWEEN :low AND :high{missing}"
+            ),
+            {"low": low, "high": low + BACKFILL_BATCH_SIZE - 1},
+        )
+
+
+def upgrade():
+    # Expand: nullable columns are a catalog-only change
+    op.add_column("posts", sa.Column("author_ref", sa.Integer(), nullable=True))
+    op.add_column("likes", sa.Column("user_ref", sa.Integer(), nullable=True))
+
+    # Backfill and build indexes without holding locks for the whole run
+    with op.get_context().autocommit_block():
+        _backfill("posts", "author_ref", "author_id")
+        _backfill("likes", "user_ref", "user_id")
+        op.create_index("ix_posts_author_ref", "posts", ["author_ref"], postgresql_concurrently=True)
+        op.create_index(
+            "uq_likes_user_ref_post_id",
+            "likes",
+            ["user_ref", "post_id"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+    # Catch up rows written while the backfill was running, then swap the columns
+    _backfill("posts", "author_ref", "author_id", only_missing=True)
+    _backfill("likes", "user_ref", "user_id", only_missing=True)
+
+    op.create_foreign_key(
+        "posts_author_ref_fkey",
+        "posts",
+        "users",
+        ["author_ref"],
+        ["id"],
+        ondelete="CASCADE",
+        postgresql_not_valid=True,
+    )
+    op.create_foreign_key(
+        "likes_user_ref_fkey",
+        "likes",
+        "users",
+        ["user_ref"],
+        ["id"],
+        ondelete="CASCADE",
+        postgresql_not_valid=True,
+    )
+    op.execute("ALTER TABLE posts VALIDATE CONSTRAINT posts_author_ref_fkey")
+    op.execute("ALTER TABLE likes VALIDATE CONSTRAINT likes_user_ref_fkey")
+    op.alter_column("posts", "author_ref", existing_type=sa.Integer(), nullable=False)
+    op.alter_column("likes", "user_ref", existing_type=sa.Integer(), nullable=False)
+
+    # Contract: dropping the string columns also drops their constraints
+    op.drop_column("posts", "author_id")
+    op.drop_column("likes", "user_id")
+    op.alter_column("posts", "author_ref", new_column_name="author_id")
+    op.alter_column("likes", "user_ref", new_column_name="user_id")
+    op.execute("ALTER INDEX ix_posts_author_ref RENAME TO ix_posts_author_id")
+    op.execute("ALTER TABLE posts RENAME CONSTRAINT posts_author_ref_fkey TO posts_author_id_fkey")
+    op.execute("ALTER TABLE likes RENAME CONSTRAINT likes_user_ref_fkey TO likes_user_id_fkey")
+    op.execute(
+        "ALTER TABLE likes ADD CONSTRAINT likes_user_id_post_id_key UNIQUE USING INDEX uq_likes_user_ref_post_id"
+    )
+
+
+def downgrade():
+    op.add_column("posts", sa.Column("author_ref", sa.String(length=50), nullable=True))
+    op.add_column("likes", sa.Column("user_ref", sa.String(length=50), nullable=True))
+    op.execute("UPDATE posts SET author_ref = users.public_id FROM users WHERE users.id = posts.author_id")
+    op.execute("UPDATE likes SET user_ref = users.public_id FROM users WHERE users.id = likes.user_id")
+    op.alter_column("posts", "author_ref", existing_type=sa.String(length=50), nullable=False)
+    op.alter_column("likes", "user_ref", existing_type=sa.String(length=50), nullable=False)
+
+    op.drop_column("posts", "author_id")
+    op.drop_column("likes", "user_id")
+    op.alter_column("posts", "author_ref", new_column_name="author_id")
+    op.alter_column("likes", "user_ref", new_column_name="user_id")
+    op.create_foreign_key(
+        "posts_author_id_fkey", "posts", "users", ["author_id"], ["public_id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key("likes_user_id_fkey", "likes", "users", ["user_id"], ["public_id"], ondelete="CASCADE")
+    op.create_unique_constraint("likes_user_id_post_id_key", "likes", ["user_id", "post_id"])
@@ -0,0 +1,49 @@
+"""Add post_like_daily rollup.
+
+Creates the per post and day like counts behind the top-posts and top-authors
+analytics and fills them from the existing likes.
+
+Revision ID: b81c0f3e5a27
+Revises: 4d479e532ecc
+Create Date: 2026-10-19 16:20:31.804512
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b81c0f3e5a27"
+down_revision = "4d479e532ecc"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "post_like_daily",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id", "day"),
+    )
+    with op.batch_alter_table("post_like_daily", schema=None) as batch_op:
+        batch_op.create_index("ix_post_like_daily_day_post", ["day", "post_id", "like_count"], unique=False)
+        batch_op.create_index("ix_post_like_daily_day_author", ["day", "author_id", "like_count"], unique=False)
+
+    op.execute(
+        "INSERT INTO post_like_daily (post_id, author_id, day, like_count) "
+        "SELECT likes.post_id, posts.author_id, CAST(likes.created_at AS DATE), count(likes.id) "
+        "FROM likes JOIN posts ON posts.id = likes.post_id "
+        "GROUP BY likes.post_id, posts.author_id, CAST(likes.created_at AS DATE)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("post_like_daily", schema=None) as batch_op:
+        batch_op.drop_index("ix_post_like_daily_day_author")
+        batch_op.drop_index("ix_post_like_daily_day_post")
+
+    op.drop_table("post_like_daily")
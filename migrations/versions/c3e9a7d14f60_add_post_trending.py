@@ -0,0 +1,45 @@
+"""Add post_trending scores.
+
+Creates the decayed like scores behind GET /api/post/trending and the epoch
+they are relative to. Run `flask rebuild-like-rollups` afterwards to score
+existing likes.
+
+Revision ID: c3e9a7d14f60
+Revises: b81c0f3e5a27
+Create Date: 2026-10-19 17:05:12.330918
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e9a7d14f60"
+down_revision = "b81c0f3e5a27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "trending_epoch",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("epoch", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "post_trending",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id"),
+    )
+    with op.batch_alter_table("post_trending", schema=None) as batch_op:
+        batch_op.create_index("ix_post_trending_score_post", ["score", "post_id"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("post_trending", schema=None) as batch_op:
+        batch_op.drop_index("ix_post_trending_score_post")
+
+    op.drop_table("post_trending")
+    op.drop_table("trending_epoch")
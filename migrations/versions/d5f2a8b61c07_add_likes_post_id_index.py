@@ -0,0 +1,36 @@
+"""Index likes by post.
+
+The (user_id, post_id) unique index cannot serve lookups by post alone, which the
+like counts of the post list group by.
+
+Revision ID: d5f2a8b61c07
+Revises: c3e9a7d14f60
+Create Date: 2026-10-19 18:22:40.104517
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d5f2a8b61c07"
+down_revision = "c3e9a7d14f60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # CONCURRENTLY keeps likes writable while the index builds; it cannot run in a transaction
+        with op.get_context().autocommit_block():
+            op.create_index("ix_likes_post_id", "likes", ["post_id"], unique=False, postgresql_concurrently=True)
+    else:
+        with op.batch_alter_table("likes", schema=None) as batch_op:
+            batch_op.create_index(batch_op.f("ix_likes_post_id"), ["post_id"], unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_likes_post_id", table_name="likes", postgresql_concurrently=True)
+    else:
+        with op.batch_alter_table("likes", schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f("ix_likes_post_id"))
@@ -0,0 +1,43 @@
+"""Add post_changes feed.
+
+Backs GET /api/post/changes. Existing posts are entered as created, so a client
+syncing from token 0 gets every post.
+
+Revision ID: e1a4c7b93d25
+Revises: d5f2a8b61c07
+Create Date: 2026-10-19 19:10:27.845120
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e1a4c7b93d25"
+down_revision = "d5f2a8b61c07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "post_changes",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("operation", sa.String(length=10), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("post_changes", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_post_changes_changed_at"), ["changed_at"], unique=False)
+
+    op.execute(
+        "INSERT INTO post_changes (post_id, operation, changed_at) "
+        "SELECT id, 'created', updated_at FROM posts ORDER BY updated_at, id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("post_changes", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_post_changes_changed_at"))
+
+    op.drop_table("post_changes")
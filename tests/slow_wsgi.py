@@ -0,0 +1,14 @@
+"""WSGI app for the overload test of tests/test_admission.py: the real app plus a slow read route"""
+import time
+
+from app import create_app
+
+SLOW_SECONDS = 2
+
+app = create_app()
+
+
+@app.route("/api/slow")
+def slow():
+    time.sleep(SLOW_SECONDS)
+    return {"message": "done"}
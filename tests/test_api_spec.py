@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from app import api, create_app, db
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_spec_is_rendered_once(app, monkeypatch):
+    client = app.test_client()
+    first = client.get("/swagger.json")
+
+    monkeypatch.setattr(type(api), "__schema__", property(lambda self: pytest.fail("spec rendered again")))
+    second = client.get("/swagger.json")
+
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert "/api/post/" in first.json["paths"]
+
+
+def test_spec_is_served_precompressed(app):
+    response = app.test_client().get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.data == app.extensions["api_spec"]["spec"].gzipped
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_spec_not_modified(app):
+    client = app.test_client()
+    etag = client.get("/swagger.json").headers["ETag"]
+
+    response = client.get("/swagger.json", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_spec_loaded_from_exported_file(app, tmp_path):
+    path = tmp_path / "swagger.json"
+    result = app.test_cli_runner().invoke(args=["export-spec", str(path)])
+    assert result.exit_code == 0
+    assert "paths" in json.loads(path.read_bytes())
+
+    prebuilt = create_app({"SWAGGER_SPEC_PATH": str(path)})
+
+    response = prebuilt.test_client().get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.data) == path.read_bytes()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.cache import SQLiteCache
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def headers(app):
+    user = User(username="user1", email="user1@example.com")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Post(title="First post", content="Some content", author_id=user.id))
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"}
+
+
+def test_sqlite_cache_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    worker_one, worker_two = SQLiteCache(path), SQLiteCache(path)
+
+    worker_one.set("key", {"total": 1}, ttl=60)
+    assert worker_two.get("key") == {"total": 1}
+
+    assert worker_two.generations(["posts", "likes"]) == {"posts": 0, "likes": 0}
+    assert worker_one.last_bumped(["posts", "likes"]) is None
+    worker_two.bump(["posts"])
+    assert worker_one.generations(["posts", "likes"]) == {"posts": 1, "likes": 0}
+    assert time.time() - worker_one.last_bumped(["posts", "likes"]) < 5
+
+
+def test_sqlite_cache_entries_expire(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.set("key", [1], ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get("key") is None
+
+
+def test_list_is_served_from_cache_until_a_write(app, headers):
+    client = app.test_client()
+    stats = app.extensions["cache_stats"]
+
+    assert client.get("/api/post/", headers=headers).json["total"] == 1
+    assert client.get("/api/post/", headers=headers).json["total"] == 1
+    assert (stats.hits, stats.misses) == (1, 1)
+
+    client.post("/api/post/", headers=headers, json={"title": "Second post", "content": "More content"})
+
+    assert client.get("/api/post/", headers=headers).json["total"] == 2
+    assert (stats.hits, stats.misses) == (1, 2)
+
+
+def test_query_string_is_part_of_the_key(app, headers):
+    client = app.test_client()
+
+    client.get("/api/post/?limit=1&per_page=1", headers=headers)
+    client.get("/api/post/", headers=headers)
+
+    assert app.extensions["cache_stats"].misses == 2
+
+
+def test_last_api_request_updates_keep_user_list_cached(app, headers):
+    client = app.test_client()
+
+    client.get("/api/user/", headers=headers)
+    client.get("/api/user/", headers=headers)
+
+    assert app.extensions["cache_stats"].hits == 1
+
+
+def test_cache_metrics(app, headers):
+    client = app.test_client()
+    client.get("/api/user/", headers=headers)
+    client.get("/api/user/", headers=headers)
+
+    response = client.get("/api/metrics/cache", headers=headers)
+
+    assert response.json == {"backend": "simple", "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,110 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def headers(app):
+    user = User(username="user1", email="user1@example.com")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all(
+        [Post(title=f"Post number {number}", content="Some content " * 20, author_id=user.id) for number in range(50)]
+    )
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"}
+
+
+def test_large_json_is_gzipped(app, headers):
+    response = app.test_client().get("/api/post/", headers={**headers, "Accept-Encoding": "gzip, deflate"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert json.loads(gzip.decompress(response.data))["total"] == 50
+
+
+def test_deflate_when_preferred(app, headers):
+    response = app.test_client().get("/api/post/", headers={**headers, "Accept-Encoding": "gzip;q=0.5, deflate"})
+
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert json.loads(zlib.decompress(response.data))["total"] == 50
+
+
+def test_identity_without_accept_encoding(app, headers):
+    response = app.test_client().get("/api/post/", headers=headers)
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json["total"] == 50
+
+
+def test_refused_encoding_is_not_used(app, headers):
+    response = app.test_client().get("/api/post/", headers={**headers, "Accept-Encoding": "gzip;q=0"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_small_responses_are_not_compressed(app, headers):
+    response = app.test_client().get("/api/post/1", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_export_is_compressed_per_chunk(app, headers):
+    app.config["POST_EXPORT_CHUNK_SIZE"] = 10
+
+    response = app.test_client().get(
+        "/api/post/export", headers={**headers, "Accept-Encoding": "gzip"}, buffered=False
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    chunks = list(response.response)
+    # One flushed block per chunk of rows plus the gzip trailer
+    assert len(chunks) == 6
+    lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+    assert len(lines) == 50
+
+
+def test_swagger_spec_is_compressed(app):
+    response = app.test_client().get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "paths" in json.loads(gzip.decompress(response.data))
+
+
+def test_compression_level_is_configurable(app, headers):
+    client = app.test_client()
+    app.config["COMPRESS_LEVEL"] = 1
+    fast = client.get("/api/post/", headers={**headers, "Accept-Encoding": "gzip"})
+    app.config["COMPRESS_LEVEL"] = 9
+    small = client.get("/api/post/", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert gzip.decompress(fast.data) == gzip.decompress(small.data)
+    assert len(small.data) <= len(fast.data)
+
+
+if __name__ == "__main__":
+    pytest.main()
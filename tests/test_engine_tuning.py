@@ -0,0 +1,109 @@
+import os
+import runpy
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.config import ProductionConfig
+from app.db_engine import TimedQueuePool, dispose_engines
+from app.models.user import User
+
+LONG_QUERY = text(
+    "WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000) "
+    "SELECT count(*) FROM counter"
+)
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path) -> Flask:
+    """Provides an app on a file database with pooled engine options."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tuning.sqlite'}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 2, "max_overflow": 1, "pool_pre_ping": True},
+            "SQLALCHEMY_STATEMENT_TIMEOUT": 0.2,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_sqlite_pragmas_applied(app):
+    assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    # synchronous=NORMAL is reported as 1
+    assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1
+    assert db.session.execute(text("PRAGMA cache_size")).scalar() == app.config["SQLITE_PRAGMAS"]["cache_size"]
+
+
+def test_statement_timeout_interrupts_long_queries(app):
+    with pytest.raises(OperationalError, match="interrupted"):
+        db.session.execute(LONG_QUERY)
+    db.session.rollback()
+
+    # The deadline only applies to the running statement
+    assert db.session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_pool_metrics(app):
+    assert isinstance(db.engine.pool, TimedQueuePool)
+    user = User(username="user1", email="user1@example.com")
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=user.public_id)
+
+    response = app.test_client().get("/api/metrics/pool", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    stats = response.json["data"][0]
+    assert stats["bind"] == "default"
+    assert stats["pool"] == "TimedQueuePool"
+    assert stats["size"] == 2
+    assert stats["checkouts"] >= 1
+    assert stats["timeouts"] == 0
+
+
+def test_dispose_engines_replaces_pool(app):
+    db.session.execute(text("SELECT 1"))
+    db.session.remove()
+    pool = db.engine.pool
+    assert pool.checkedin() == 1
+
+    dispose_engines(db.engines.values())
+
+    assert db.engine.pool is not pool
+    assert db.engine.pool.checkedin() == 0
+    assert db.session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_gunicorn_settings_follow_config(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "production")
+    settings = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py"))
+
+    assert settings["workers"] == ProductionConfig.SERVER_WORKERS
+    assert settings["max_requests"] == ProductionConfig.SERVER_MAX_REQUESTS
+    assert settings["graceful_timeout"] == ProductionConfig.SERVER_GRACEFUL_TIMEOUT
+    assert settings["preload_app"] is True
+
+
+def test_streams_leave_worker_threads_free(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "production")
+    settings = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py"))
+
+    assert settings["worker_class"] == "gthread"
+    assert settings["threads"] > ProductionConfig.EVENT_STREAM_MAX_SUBSCRIBERS
+    admitted = sum(limits["concurrency"] + limits["queue"] for limits in ProductionConfig.ADMISSION_LIMITS.values())
+    assert settings["threads"] - ProductionConfig.EVENT_STREAM_MAX_SUBSCRIBERS > admitted
+    assert ProductionConfig.EVENT_STREAM_HEARTBEAT < settings["timeout"]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,133 @@
+import os
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.events import EventBroker
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def headers(app):
+    user = User(username="user1", email="user1@example.com")
+    db.session.add(user)
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"}
+
+
+def drain(subscription):
+    events = []
+    while (item := subscription.get(0)) is not None:
+        events.append(item)
+    return events
+
+
+def test_broker_fans_out_to_every_subscriber():
+    broker = EventBroker(history=10, buffer_size=10, max_subscribers=2)
+    first, _ = broker.subscribe()
+    second, _ = broker.subscribe()
+
+    broker.publish("like", {"post_id": "1"})
+
+    assert [item[1:] for item in drain(first)] == [("like", {"post_id": "1"})]
+    assert len(drain(second)) == 1
+    assert broker.subscribe() == (None, False)
+
+
+def test_slow_subscriber_is_dropped():
+    broker = EventBroker(history=10, buffer_size=2, max_subscribers=10)
+    slow, _ = broker.subscribe()
+
+    for number in range(3):
+        broker.publish("like", {"post_id": str(number)})
+
+    assert slow.overflowed
+    assert len(drain(slow)) == 2
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_resume_from_last_event_id():
+    broker = EventBroker(history=3, buffer_size=10, max_subscribers=10)
+    for number in range(5):
+        broker.publish("like", {"post_id": str(number)})
+
+    subscription, lost = broker.subscribe(f"{broker.boot}-4")
+    assert not lost
+    assert [item[2]["post_id"] for item in drain(subscription)] == ["4"]
+
+    # Event 2 fell out of the history, as did every event of another process
+    assert broker.subscribe(f"{broker.boot}-1")[1]
+    assert broker.subscribe("0123abcd-1")[1]
+
+
+def test_forked_worker_resets_ids_of_another_worker():
+    broker = EventBroker(history=10, buffer_size=10, max_subscribers=10)
+    broker.publish("like", {"post_id": "1"})
+    parent_id = f"{broker.boot}-1"
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Forked worker, as with SERVER_PRELOAD_APP: the parent's id must not resume here
+        os.close(read_end)
+        subscription, lost = broker.subscribe(parent_id)
+        ok = lost and not drain(subscription) and not parent_id.startswith(broker.boot)
+        os.write(write_end, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as result:
+        assert result.read() == b"1"
+    os.waitpid(pid, 0)
+
+    # The parent keeps its own ids
+    assert not broker.subscribe(parent_id)[1]
+
+
+def test_events_are_published_on_commit_only(app, headers):
+    broker = app.extensions["events"]
+    subscription, _ = broker.subscribe()
+    client = app.test_client()
+
+    client.post("/api/post/", json={"title": "First post", "content": "Some content"}, headers=headers)
+    # A duplicate slug fails the insert, and its event is discarded with the transaction
+    client.post("/api/post/", json={"title": "First post", "content": "Some content"}, headers=headers)
+    post_id = Post.query.one().id
+    client.put(f"/api/post/{post_id}", json={"title": "Edited post", "content": "Some content"}, headers=headers)
+
+    events = drain(subscription)
+    assert [event_type for _, event_type, _ in events] == ["post-created", "post-updated"]
+    assert events[1][2] == {"id": str(post_id), "title": "Edited post"}
+
+
+def test_stream_replays_missed_events(app, headers):
+    broker = app.extensions["events"]
+    broker.publish("like", {"post_id": "1"})
+    broker.publish("unlike", {"post_id": "1"})
+
+    response = app.test_client().get(
+        "/api/stream", headers={**headers, "Last-Event-ID": f"{broker.boot}-1"}, buffered=False
+    )
+    chunks = iter(response.response)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert next(chunks).startswith(b"retry:")
+    assert next(chunks) == f'id: {broker.boot}-2\nevent: unlike\ndata: {{"post_id": "1"}}\n\n'.encode()
+    response.close()
+    assert broker.stats()["subscribers"] == 0
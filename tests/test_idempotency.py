@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.idempotency import request_fingerprint, reserve_key
+from app.models.idempotency_key import IdempotencyKey
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def users(app):
+    authors = [User(username=f"author{n}", email=f"author{n}@example.com") for n in range(2)]
+    db.session.add_all(authors)
+    db.session.commit()
+    return [{"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"} for user in authors]
+
+
+def create_post(client, headers, key, title="First post"):
+    payload = {"title": title, "content": "Some content"}
+    return client.post("/api/post/", json=payload, headers={**headers, "Idempotency-Key": key})
+
+
+def test_register_retry_is_replayed(app):
+    client = app.test_client()
+    payload = {"username": "newuser", "email": "new@example.com", "password": "password123"}
+
+    first = client.post("/api/auth/register", json=payload, headers={"Idempotency-Key": "register-1"})
+    retry = client.post("/api/auth/register", json=payload, headers={"Idempotency-Key": "register-1"})
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert User.query.count() == 1
+
+
+def test_anonymous_keys_are_scoped_to_the_client(app):
+    client = app.test_client()
+
+    def register(username, address):
+        payload = {"username": username, "email": f"{username}@example.com", "password": "password123"}
+        return client.post(
+            "/api/auth/register",
+            json=payload,
+            headers={"Idempotency-Key": "register-1"},
+            environ_base={"REMOTE_ADDR": address},
+        )
+
+    assert register("first", "203.0.113.1").status_code == 201
+    # Another client picking the same key neither gets the first response nor a 422
+    response = register("second", "203.0.113.2")
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert register("third", "203.0.113.1").status_code == 422
+    assert User.query.count() == 2
+
+
+def test_post_retry_creates_one_post(app, users):
+    client = app.test_client()
+
+    first = create_post(client, users[0], "post-1")
+    retry = create_post(client, users[0], "post-1")
+    # Keys are scoped to the user sending them
+    other = create_post(client, users[1], "post-1", title="Other post")
+
+    assert first.status_code == retry.status_code == other.status_code == 201
+    assert retry.json == first.json
+    assert "Idempotent-Replayed" not in first.headers
+    assert Post.query.count() == 2
+
+
+def test_key_reused_for_another_request(app, users):
+    client = app.test_client()
+    create_post(client, users[0], "post-1")
+
+    response = create_post(client, users[0], "post-1", title="Another post")
+
+    assert response.status_code == 422
+
+
+def test_key_in_progress(app):
+    payload = {"username": "newuser", "email": "new@example.com", "password": "password123"}
+    with app.test_request_context("/api/auth/register", method="POST", json=payload):
+        # Claimed by a first request that has not finished yet
+        claimed_at, earlier = reserve_key("ip:127.0.0.1", "register-1", request_fingerprint())
+        assert claimed_at is not None and earlier is None
+
+    response = app.test_client().post("/api/auth/register", json=payload, headers={"Idempotency-Key": "register-1"})
+
+    assert response.status_code == 409
+    assert User.query.count() == 0
+
+
+def test_lapsed_claim_is_taken_over(app):
+    payload = {"username": "newuser", "email": "new@example.com", "password": "password123"}
+    with app.test_request_context("/api/auth/register", method="POST", json=payload):
+        # Claimed by a worker that died before finishing
+        reserve_key("ip:127.0.0.1", "register-1", request_fingerprint())
+    app.config["IDEMPOTENCY_LEASE"] = timedelta(0)
+
+    response = app.test_client().post("/api/auth/register", json=payload, headers={"Idempotency-Key": "register-1"})
+    retry = app.test_client().post("/api/auth/register", json=payload, headers={"Idempotency-Key": "register-1"})
+
+    assert response.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert User.query.count() == 1
+
+
+def test_atomic_batch_sub_requests_store_no_keys(app, users):
+    post = {"title": "Batched post", "content": "Some content"}
+    requests = [
+        {"method": "POST", "path": "/api/post/", "body": post, "headers": {"Idempotency-Key": "post-1"}},
+        {"method": "DELETE", "path": "/api/post/999"},
+    ]
+    client = app.test_client()
+
+    response = client.post("/api/batch", json={"requests": requests, "atomic": True}, headers=users[0])
+
+    assert response.json["committed"] is False
+    assert IdempotencyKey.query.count() == 0
+    # Retrying the post itself creates it instead of replaying a rolled back 201
+    retry = create_post(client, users[0], "post-1", title="Batched post")
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+    assert Post.query.count() == 1
+
+
+def test_failed_request_releases_key(app, users):
+    client = app.test_client()
+
+    response = client.post("/api/post/999/like", headers={**users[0], "Idempotency-Key": "like-1"})
+
+    assert response.status_code == 400
+    assert IdempotencyKey.query.count() == 0
+
+
+def test_prune_expired_keys(app, users):
+    app.config["IDEMPOTENCY_KEY_TTL"] = app.config["IDEMPOTENCY_KEY_TTL"] * -1
+    create_post(app.test_client(), users[0], "post-1")
+
+    result = app.test_cli_runner().invoke(args=["prune-idempotency-keys"])
+
+    assert "Pruned 1 idempotency keys" in result.output
+    assert IdempotencyKey.query.count() == 0
@@ -0,0 +1,164 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import postgresql
+
+from app import create_app, db
+from app import like_ingest
+from app.like_ingest import DUPLICATE, WRITTEN, PendingLike, insert_likes_ignoring_duplicates, like_summaries
+from app.models.like import Like
+from app.models.like_rollup import PostLikeDaily
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path) -> Flask:
+    """Provides an app with like ingestion on a file database the flusher thread can share."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'likes.sqlite'}",
+            "LIKE_INGEST_ENABLED": True,
+            "LIKE_INGEST_FLUSH_INTERVAL": 0.01,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        app.extensions["like_ingest"].drain()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def post(app):
+    author = User(username="author", email="author@example.com")
+    db.session.add(author)
+    db.session.commit()
+    post = Post(title="Viral post", content="Some content", author_id=author.id)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def reader_headers(number):
+    reader = User(username=f"reader{number}", email=f"reader{number}@example.com")
+    db.session.add(reader)
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=reader.public_id)}"}
+
+
+def test_like_is_accepted_and_written_in_batch(app, post):
+    client = app.test_client()
+    headers = [reader_headers(number) for number in range(3)]
+
+    responses = [client.post(f"/api/post/{post.id}/like", headers=header) for header in headers]
+
+    assert [response.status_code for response in responses] == [202, 202, 202]
+    # Each caller sees its own like counted whether or not it was written yet
+    assert [response.json["like_count"] for response in responses] == [1, 2, 3]
+    assert app.extensions["like_ingest"].drain()
+    assert Like.query.filter_by(post_id=post.id).count() == 3
+    assert PostLikeDaily.query.filter_by(post_id=post.id).one().like_count == 3
+
+
+def test_duplicate_likes_are_written_once(app, post):
+    client = app.test_client()
+    headers = reader_headers(1)
+
+    client.post(f"/api/post/{post.id}/like", headers=headers)
+    second = client.post(f"/api/post/{post.id}/like", headers=headers)
+    app.extensions["like_ingest"].drain()
+
+    assert second.json["like_count"] == 1
+    assert Like.query.filter_by(post_id=post.id).count() == 1
+    assert PostLikeDaily.query.filter_by(post_id=post.id).one().like_count == 1
+
+
+def test_flush_deduplicates_within_a_batch(app, post):
+    reader_headers(1)
+    reader = User.query.filter_by(username="reader1").one()
+
+    batch = [PendingLike(reader.id, post.id), PendingLike(reader.id, post.id)]
+    app.extensions["like_ingest"].flush(batch)
+
+    assert Like.query.filter_by(post_id=post.id).count() == 1
+    assert [like.outcome for like in batch] == [WRITTEN, DUPLICATE]
+
+
+def test_full_queue_is_shed(app, post, monkeypatch):
+    ingestor = app.extensions["like_ingest"]
+    # Without a flusher the queue stays full
+    monkeypatch.setattr(ingestor, "_ensure_started", lambda: None)
+    monkeypatch.setattr(ingestor.queue, "maxsize", 1)
+    client = app.test_client()
+
+    client.post(f"/api/post/{post.id}/like", headers=reader_headers(1))
+    response = client.post(f"/api/post/{post.id}/like", headers=reader_headers(2))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_commit_durability_waits_for_the_batch(app, post):
+    app.config["LIKE_INGEST_DURABILITY"] = "commit"
+
+    response = app.test_client().post(f"/api/post/{post.id}/like", headers=reader_headers(1))
+
+    assert response.status_code == 200
+    assert response.json["like_count"] == 1
+    assert Like.query.filter_by(post_id=post.id).count() == 1
+
+
+def test_commit_durability_reports_duplicates(app, post):
+    app.config["LIKE_INGEST_DURABILITY"] = "commit"
+    client = app.test_client()
+    headers = reader_headers(1)
+
+    assert client.post(f"/api/post/{post.id}/like", headers=headers).status_code == 200
+    response = client.post(f"/api/post/{post.id}/like", headers=headers)
+
+    assert response.status_code == 409
+    assert response.json["like_count"] == 1
+
+
+def test_commit_durability_reports_failed_writes(app, post, monkeypatch):
+    app.config["LIKE_INGEST_DURABILITY"] = "commit"
+
+    def fail(conn, rows):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(like_ingest, "record_inserted_likes", fail)
+
+    response = app.test_client().post(f"/api/post/{post.id}/like", headers=reader_headers(1))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert Like.query.filter_by(post_id=post.id).count() == 0
+
+
+def test_like_summaries_include_queued_likes(app, post, monkeypatch):
+    ingestor = app.extensions["like_ingest"]
+    monkeypatch.setattr(ingestor, "_ensure_started", lambda: None)
+    reader_headers(1)
+    reader = User.query.filter_by(username="reader1").one()
+
+    ingestor.submit(reader.id, post.id)
+    counts, liked = like_summaries([post.id], reader.id)
+
+    assert counts == {post.id: 1}
+    assert liked == {post.id}
+    ingestor.flush([ingestor.queue.get_nowait()])
+    ingestor.queue.task_done()
+
+
+def test_insert_skips_conflicts_on_postgres():
+    statement = insert_likes_ignoring_duplicates("postgresql")
+
+    assert "ON CONFLICT (user_id, post_id) DO NOTHING" in str(statement.compile(dialect=postgresql.dialect()))
+
+
+if __name__ == "__main__":
+    pytest.main()
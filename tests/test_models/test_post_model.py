@@ -4,6 +4,7 @@ import pytest
 from flask import Flask
 
 from app import create_app, db
+from app.content_storage import compress_post_content_command
 from app.models.like import Like
 from app.models.post import Post
 from app.models.user import User
@@ -99,7 +100,7 @@ def test_post_repr(app):
         db.session.commit()
 
         # Retrieve the post from the database
-        retrieved_post = Post.query.filter_by(author_id=user.public_id).first()
+        retrieved_post = Post.query.filter_by(author_id=user.id).first()
 
         # Check that the __repr__ function returns the expected string
         expected_repr = f"Post(id={retrieved_post.id}, title={retrieved_post.title}, date_posted={retrieved_post.date_posted.strftime('%d.%m.%Y-%H.%M')}, author_id={retrieved_post.author_id})"
@@ -118,7 +119,7 @@ def test_slug_change(app):
         db.session.add(post)
         db.session.commit()
 
-        retrieved_post = Post.query.filter_by(author_id=user.public_id).first()
+        retrieved_post = Post.query.filter_by(author_id=user.id).first()
         assert retrieved_post.title == "Test Post"
         assert post.slug == "test-post"
 
@@ -126,11 +127,76 @@ def test_slug_change(app):
         db.session.add(retrieved_post)
         db.session.commit()
 
-        new_retrieved_post = Post.query.filter_by(author_id=user.public_id).first()
+        new_retrieved_post = Post.query.filter_by(author_id=user.id).first()
 
         assert new_retrieved_post.title == "New test post"
         assert new_retrieved_post.slug == "new-test-post"
 
 
+def test_content_is_stored_as_text_by_default(app):
+    user = User(username="testuser", email="test@example.com", password="testpassword")
+    db.session.add(Post(title="Long", content="A long-form post paragraph. " * 200, author=user))
+    db.session.commit()
+
+    stored = db.session.execute(db.text("SELECT content, typeof(content) FROM posts")).one()
+    assert stored == ("A long-form post paragraph. " * 200, "text")
+
+
+def test_long_content_is_stored_compressed(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app({"POST_CONTENT_COMPRESSION": True})
+    with app.app_context():
+        db.create_all()
+        user = User(username="testuser", email="test@example.com", password="testpassword")
+        long_content = "A long-form post paragraph. " * 200
+        db.session.add_all(
+            [
+                Post(title="Short", content="Short post", author=user),
+                Post(title="Long", content=long_content, author=user),
+            ]
+        )
+        db.session.commit()
+
+        stored = dict(db.session.execute(db.text("SELECT title, content FROM posts")).all())
+        assert stored["Short"] == b"Short post"
+        assert stored["Long"].startswith(b"\x00")
+        assert len(stored["Long"]) < len(long_content) / 10
+
+        db.session.expire_all()
+        contents = dict(db.session.execute(db.select(Post.title, Post.content)).all())
+        assert contents == {"Short": "Short post", "Long": long_content}
+        db.session.remove()
+        db.drop_all()
+
+
+def test_compress_post_content_command(app):
+    user = User(username="testuser", email="test@example.com", password="testpassword")
+    long_content = "A long-form post paragraph. " * 200
+    db.session.add_all(
+        [
+            Post(title="Short", content="Short post", author=user),
+            Post(title="Long", content=long_content, author=user),
+        ]
+    )
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(compress_post_content_command)
+
+    assert "Compressed 1 posts" in result.output
+    stored = dict(db.session.execute(db.text("SELECT title, content FROM posts")).all())
+    assert stored["Short"] == "Short post"
+    assert stored["Long"].startswith(b"\x00")
+    # Compressed rows read back whichever way the app is configured
+    db.session.expire_all()
+    assert db.session.execute(db.select(Post.content).where(Post.title == "Long")).scalar() == long_content
+
+    result = runner.invoke(compress_post_content_command, ["--decompress"])
+
+    assert "Decompressed 1 posts" in result.output
+    stored = dict(db.session.execute(db.text("SELECT title, content FROM posts")).all())
+    assert stored == {"Short": "Short post", "Long": long_content}
+
+
 if __name__ == "__main__":
     pytest.main()
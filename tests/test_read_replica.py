@@ -0,0 +1,117 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path) -> Flask:
+    """Provides an app with a primary and a replica database in two SQLite files."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.sqlite'}",
+            "SQLALCHEMY_BINDS": {"replica_1": f"sqlite:///{tmp_path / 'replica.sqlite'}"},
+            "SQLALCHEMY_READ_REPLICAS": ["replica_1"],
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines["replica_1"])
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.metadata.drop_all(db.engines["replica_1"])
+        # The bind key is registered on the shared extension, not only on this app
+        db.metadatas.pop("replica_1", None)
+
+
+@pytest.fixture
+def token(app):
+    """Replicates one user to both databases and returns a token for it."""
+    user = {"id": 1, "public_id": "2b1f4c0e-5f0a-4d4e-9a53-1a2b3c4d5e6f", "email": "user1@example.com"}
+    for engine in (db.engines[None], db.engines["replica_1"]):
+        with engine.begin() as connection:
+            connection.execute(User.__table__.insert(), user)
+    return create_access_token(identity=user["public_id"])
+
+
+def lagging_write(title):
+    """Writes a post to the primary only, as if the replica had not caught up yet."""
+    with db.engines[None].begin() as connection:
+        connection.execute(
+            Post.__table__.insert(), {"title": title, "content": "content", "slug": title, "author_id": 1}
+        )
+
+
+def test_get_reads_from_replica(app, token):
+    lagging_write("lagging-post")
+
+    response = app.test_client().get("/api/post/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json["total"] == 0
+
+
+def test_reads_after_write_go_to_primary(app, token):
+    client = app.test_client()
+    lagging_write("lagging-post")
+
+    response = client.post(
+        "/api/post/",
+        json={"title": "Fresh post", "content": "Some content"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201
+
+    # The session has written to posts, so its reads of posts stay on the primary
+    response = client.get("/api/post/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json["total"] == 2
+
+
+def test_miss_right_after_a_write_reads_primary(app, token):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/post/", headers=headers).json["total"] == 0
+
+    # Another worker commits a post; the replica has not caught up yet
+    lagging_write("lagging-post")
+    app.extensions["cache"].bump(["posts"])
+
+    response = client.get("/api/post/", headers=headers)
+    assert response.json["total"] == 1
+    # What the primary returned is what got cached
+    assert client.get("/api/post/", headers=headers).json["total"] == 1
+
+    # Past the lag window the replica is trusted again
+    app.config["SQLALCHEMY_READ_REPLICA_MAX_LAG"] = 0
+    app.extensions["cache"].bump(["posts"])
+    assert client.get("/api/post/", headers=headers).json["total"] == 0
+
+
+def test_without_replicas_reads_use_primary(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username="user1", email="user1@example.com")
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=user.public_id)
+
+        response = app.test_client().get("/api/user/", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        assert response.json["total"] == 1
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    pytest.main()
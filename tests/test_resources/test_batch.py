@@ -0,0 +1,218 @@
+import flask_jwt_extended.jwt_manager
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func, select
+
+from app import create_app, db
+from app.admission import AdmissionLimiter
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def data(app):
+    """user1 wrote a post; requests are made by user2"""
+    user1 = User(username="user1", email="user1@example.com")
+    user2 = User(username="user2", email="user2@example.com")
+    db.session.add_all([user1, user2])
+    db.session.commit()
+    post = Post(title="Post A", content="Content", author_id=user1.id)
+    db.session.add(post)
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=user2.public_id)}"}
+    return {"post_id": post.id, "headers": headers}
+
+
+def batch(app, headers, requests, atomic=False):
+    return app.test_client().post("/api/batch", json={"requests": requests, "atomic": atomic}, headers=headers)
+
+
+def register_body(username):
+    return {"username": username, "email": f"{username}@test.com", "password": "password"}
+
+
+def count(model):
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_batch_returns_one_result_per_request(app, data):
+    post_id = data["post_id"]
+    response = batch(
+        app,
+        data["headers"],
+        [
+            {"method": "POST", "path": f"/api/post/{post_id}/like"},
+            {"method": "GET", "path": f"/api/post/{post_id}"},
+            {"method": "GET", "path": "/api/post/999"},
+            {"method": "POST", "path": "/api/post/", "body": {"title": "Post B", "content": "Content"}},
+        ],
+    )
+
+    assert response.status_code == 200
+    results = response.json["responses"]
+    assert [result["status"] for result in results] == [200, 200, 404, 201]
+    assert results[1]["body"]["likes"] == 1
+    assert "ETag" in results[1]["headers"]
+    assert results[3]["body"]["title"] == "Post B"
+    assert response.json["committed"] is None
+
+
+def test_batch_looks_up_the_user_once(app, data):
+    lookups = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM users" in statement and "public_id" in statement.split("WHERE")[-1]:
+            lookups.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = batch(app, data["headers"], [{"method": "GET", "path": "/api/post/"}] * 3)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert [result["status"] for result in response.json["responses"]] == [200] * 3
+    assert len(lookups) == 1
+
+
+def test_batch_verifies_the_token_once(app, data, monkeypatch):
+    decoded = []
+    decode = flask_jwt_extended.jwt_manager._decode_jwt
+    monkeypatch.setattr(
+        flask_jwt_extended.jwt_manager, "_decode_jwt", lambda **kwargs: decoded.append(1) or decode(**kwargs)
+    )
+
+    response = batch(app, data["headers"], [{"method": "GET", "path": "/api/post/"}] * 3)
+
+    assert [result["status"] for result in response.json["responses"]] == [200] * 3
+    assert len(decoded) == 1
+
+
+def test_unhandled_error_fails_only_its_request(app, data):
+    def broken():
+        raise RuntimeError("broken view")
+
+    app.add_url_rule("/api/broken", "broken", broken)
+
+    requests = [{"method": "GET", "path": "/api/broken"}, {"method": "GET", "path": "/api/post/"}]
+    response = batch(app, data["headers"], requests)
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["responses"]] == [500, 200]
+
+
+def test_atomic_batch_commits_together(app, data):
+    post_id = data["post_id"]
+    response = batch(
+        app,
+        data["headers"],
+        [
+            {"method": "POST", "path": f"/api/post/{post_id}/like"},
+            {"method": "POST", "path": "/api/post/", "body": {"title": "Post B", "content": "Content"}},
+        ],
+        atomic=True,
+    )
+
+    assert response.json["committed"] is True
+    assert count(Like) == 1
+    assert count(Post) == 2
+
+
+def test_atomic_batch_rolls_back_on_failure(app, data):
+    post_id = data["post_id"]
+    response = batch(
+        app,
+        data["headers"],
+        [
+            {"method": "POST", "path": "/api/post/", "body": {"title": "Post B", "content": "Content"}},
+            {"method": "DELETE", "path": "/api/post/999"},
+            {"method": "POST", "path": f"/api/post/{post_id}/like"},
+        ],
+        atomic=True,
+    )
+
+    assert response.json["committed"] is False
+    assert [result["status"] for result in response.json["responses"]] == [201, 404, 424]
+    assert count(Post) == 1
+    assert count(Like) == 0
+
+
+def test_rolled_back_batch_leaves_no_cache_entries(app, data):
+    client = app.test_client()
+    response = batch(
+        app,
+        data["headers"],
+        [
+            {"method": "POST", "path": "/api/auth/register", "body": register_body("ghost")},
+            {"method": "GET", "path": "/api/user/?limit=50"},
+            {"method": "DELETE", "path": "/api/post/999"},
+        ],
+        atomic=True,
+    )
+    assert response.json["committed"] is False
+    assert response.json["responses"][1]["body"]["total"] == 3
+
+    # The list read inside the rolled back transaction must not be served from the cache
+    assert client.get("/api/user/?limit=50", headers=data["headers"]).json["total"] == 2
+
+
+def test_batch_reads_its_own_writes_past_the_cache(app, data):
+    client = app.test_client()
+    assert client.get("/api/user/?limit=50", headers=data["headers"]).json["total"] == 2
+
+    response = batch(
+        app,
+        data["headers"],
+        [
+            {"method": "POST", "path": "/api/auth/register", "body": register_body("newcomer")},
+            {"method": "GET", "path": "/api/user/?limit=50"},
+        ],
+        atomic=True,
+    )
+
+    assert response.json["committed"] is True
+    assert response.json["responses"][1]["body"]["total"] == 3
+    assert client.get("/api/user/?limit=50", headers=data["headers"]).json["total"] == 3
+
+
+def test_batch_rejects_nested_batches_and_large_batches(app, data):
+    for method, path in (("POST", "/api/batch"), ("POST", "/api/%62atch"), ("GET", "/swagger.json")):
+        response = batch(app, data["headers"], [{"method": method, "path": path}])
+        assert response.json["responses"][0]["status"] == 400
+
+    app.config["BATCH_REQUESTS_MAX"] = 2
+    response = batch(app, data["headers"], [{"method": "GET", "path": "/api/post/"}] * 3)
+    assert response.status_code == 400
+
+
+def test_sub_requests_pass_admission(app, data):
+    app.extensions["admission"]["read"] = read = AdmissionLimiter("read", concurrency=1, queue=0, timeout=0.1)
+    assert read.acquire()
+    try:
+        response = batch(app, data["headers"], [{"method": "GET", "path": "/api/post/"}])
+    finally:
+        read.release()
+
+    result = response.json["responses"][0]
+    assert result["status"] == 503
+    assert "Retry-After" in result["headers"]
+    assert read.shed_queue_full == 1
+
+    response = batch(app, data["headers"], [{"method": "GET", "path": "/api/post/"}] * 2)
+    assert [result["status"] for result in response.json["responses"]] == [200, 200]
+    assert read.admitted == 3
+    assert read.in_flight == 0
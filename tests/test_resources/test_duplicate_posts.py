@@ -0,0 +1,147 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.fingerprints import rebuild_fingerprints_command
+from app.models.post import Post
+from app.models.post_fingerprint import PostSimhashBand
+from app.models.user import User
+
+ARTICLE = (
+    "Check out my new article about distributed systems and how consensus works in practice, "
+    "with examples from real clusters and a few war stories from on-call"
+)
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def users(app):
+    spammer = User(username="spammer", email="spammer@example.com")
+    other = User(username="other", email="other@example.com")
+    db.session.add_all([spammer, other])
+    db.session.commit()
+    return [{"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"} for user in (spammer, other)]
+
+
+@pytest.fixture()
+def band_statements(app):
+    """Collects the statements on post_simhash_bands with the number of rows each one binds."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "post_simhash_bands" in statement:
+            executed.append((statement.split()[0], len(parameters) if executemany else 1))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def create_post(client, headers, title, content):
+    return client.post("/api/post/", json={"title": title, "content": content}, headers=headers)
+
+
+def test_exact_duplicate_is_rejected(app, users):
+    client = app.test_client()
+    first = create_post(client, users[0], "First copy", ARTICLE)
+
+    # Case and whitespace do not make a copy new
+    response = create_post(client, users[0], "Second copy", "  " + ARTICLE.upper().replace(" ", "\n"))
+
+    assert response.status_code == 409
+    assert response.json["message"] == f"Same content as post {first.json['id']}"
+    assert Post.query.count() == 1
+
+
+def test_near_duplicate_within_max_distance(app, users):
+    client = app.test_client()
+    first = create_post(client, users[0], "Original", ARTICLE)
+
+    response = create_post(client, users[0], "Repost", ARTICLE + " #ad")
+
+    assert response.status_code == 409
+    assert response.json["message"] == f"Nearly the same content as post {first.json['id']}"
+
+    app.config["POST_DUPLICATE_MAX_DISTANCE"] = 0
+    assert create_post(client, users[0], "Repost", ARTICLE + " #ad").status_code == 201
+
+
+def test_duplicates_are_per_author(app, users):
+    client = app.test_client()
+    assert create_post(client, users[0], "Mine", ARTICLE).status_code == 201
+    assert create_post(client, users[1], "Theirs", ARTICLE).status_code == 201
+    assert create_post(client, users[0], "Unrelated", "Completely different words here").status_code == 201
+
+
+def test_update_replaces_fingerprint(app, users):
+    client = app.test_client()
+    post_id = create_post(client, users[0], "Original", ARTICLE).json["id"]
+
+    client.put(f"/api/post/{post_id}", json={"title": "Edited", "content": "Rewritten entirely"}, headers=users[0])
+
+    assert PostSimhashBand.query.filter_by(post_id=int(post_id)).count() == 4
+    assert create_post(client, users[0], "Again", ARTICLE).status_code == 201
+    assert create_post(client, users[0], "Copy of edit", "rewritten  ENTIRELY").status_code == 409
+
+
+def test_fingerprint_statements_per_write(app, users, band_statements):
+    client = app.test_client()
+
+    # Creating a post looks up its bands, then inserts the four bands in one executemany
+    post_id = create_post(client, users[0], "Original", ARTICLE).json["id"]
+    assert band_statements == [("SELECT", 1), ("INSERT", 4)]
+
+    # Updating it replaces them, with no duplicate lookup
+    band_statements.clear()
+    client.put(f"/api/post/{post_id}", json={"title": "Edited", "content": "Rewritten entirely"}, headers=users[0])
+    assert band_statements == [("DELETE", 1), ("INSERT", 4)]
+
+    # A rejected repost writes nothing
+    band_statements.clear()
+    assert create_post(client, users[0], "Copy", "Rewritten entirely").status_code == 409
+    assert band_statements == [("SELECT", 1)]
+
+    # Without the check the bands are still written, so it can be turned back on
+    app.config["POST_DUPLICATE_CHECK_ENABLED"] = False
+    band_statements.clear()
+    assert create_post(client, users[0], "Copy", "Rewritten entirely").status_code == 201
+    assert band_statements == [("INSERT", 4)]
+
+
+def test_rebuild_fingerprints(app, users):
+    author = User.query.filter_by(username="spammer").one()
+    db.session.execute(
+        Post.__table__.insert(), {"title": "Legacy", "content": ARTICLE, "slug": "legacy", "author_id": author.id}
+    )
+    db.session.commit()
+    client = app.test_client()
+    assert create_post(client, users[0], "Copy", ARTICLE).status_code == 201
+    Post.query.filter_by(title="Copy").delete()
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(rebuild_fingerprints_command)
+
+    assert "Fingerprinted 1 posts" in result.output
+    assert create_post(client, users[0], "Copy", ARTICLE).status_code == 409
+
+
+def test_duplicate_check_can_be_disabled(app, users):
+    app.config["POST_DUPLICATE_CHECK_ENABLED"] = False
+    client = app.test_client()
+
+    assert create_post(client, users[0], "First copy", ARTICLE).status_code == 201
+    assert create_post(client, users[0], "Second copy", ARTICLE).status_code == 201
@@ -0,0 +1,88 @@
+import pytest
+from flask import Flask, current_app
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        assert current_app.config["TESTING"] is True
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def author_and_reader(app):
+    author = User(username="author", email="author@example.com")
+    reader = User(username="reader", email="reader@example.com")
+    db.session.add_all([author, reader])
+    db.session.commit()
+
+    return {
+        "author": {"user": author, "token": create_access_token(identity=author.public_id)},
+        "reader": {"user": reader, "token": create_access_token(identity=reader.public_id)},
+    }
+
+
+def test_create_post_stores_integer_author_id(client, author_and_reader):
+    author = author_and_reader["author"]
+
+    response = client.post(
+        "/api/post/",
+        json={"title": "First post", "content": "Some content"},
+        headers={"Authorization": f"Bearer {author['token']}"},
+    )
+
+    assert response.status_code == 201
+    # The API keeps exposing the public UUID of the author
+    assert response.json["author_id"] == author["user"].public_id
+
+    post = Post.query.get(int(response.json["id"]))
+    assert post.author_id == author["user"].id
+    assert isinstance(post.author_id, int)
+
+
+def test_like_post_stores_integer_user_id(client, author_and_reader):
+    author = author_and_reader["author"]
+    reader = author_and_reader["reader"]
+    post = Post(title="Liked post", content="Some content", author_id=author["user"].id)
+    db.session.add(post)
+    db.session.commit()
+
+    response = client.post(f"/api/post/{post.id}/like", headers={"Authorization": f"Bearer {reader['token']}"})
+
+    assert response.status_code == 200
+    like = Like.query.filter_by(post_id=post.id).one()
+    assert like.user_id == reader["user"].id
+
+
+def test_cannot_like_own_post(client, author_and_reader):
+    author = author_and_reader["author"]
+    post = Post(title="Own post", content="Some content", author_id=author["user"].id)
+    db.session.add(post)
+    db.session.commit()
+
+    response = client.post(f"/api/post/{post.id}/like", headers={"Authorization": f"Bearer {author['token']}"})
+
+    assert response.status_code == 400
+    assert Like.query.count() == 0
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,106 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def data(app):
+    """Two users; user1 wrote posts A and B, post B is liked by user2"""
+    user1 = User(username="user1", email="user1@example.com")
+    user2 = User(username="user2", email="user2@example.com")
+    db.session.add_all([user1, user2])
+    db.session.commit()
+    posts = [Post(title=f"Post {name}", content="Content", author_id=user1.id) for name in "AB"]
+    db.session.add_all(posts)
+    db.session.commit()
+    db.session.add(Like(user_id=user2.id, post_id=posts[1].id))
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=user1.public_id)}"}
+    return {"users": [user1, user2], "posts": posts, "headers": headers}
+
+
+def test_posts_by_id_in_request_order(app, data):
+    post_a, post_b = data["posts"]
+    response = app.test_client().get(f"/api/post?ids={post_b.id},999,{post_a.id}", headers=data["headers"])
+
+    assert response.status_code == 200
+    entries = response.json["data"]
+    assert [entry["id"] for entry in entries] == [str(post_b.id), "999", str(post_a.id)]
+    assert [entry["found"] for entry in entries] == [True, False, True]
+    assert entries[1]["post"] is None
+    assert entries[0]["post"]["title"] == "Post B"
+    assert entries[0]["post"]["likes"] == 1
+    assert entries[0]["post"]["author_id"] == data["users"][0].public_id
+    assert entries[2]["post"]["likes"] == 0
+
+
+def test_posts_by_id_use_one_query(app, data):
+    ids = ",".join(str(post.id) for post in data["posts"])
+    statements = []
+    engine = db.engine
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "posts" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = app.test_client().get(f"/api/post?ids={ids}", headers=data["headers"])
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+
+def test_users_by_id(app, data):
+    user1, user2 = data["users"]
+    ids = f"missing,{user2.public_id},{user1.public_id}"
+    response = app.test_client().get(f"/api/user?ids={ids}", headers=data["headers"])
+
+    assert response.status_code == 200
+    entries = response.json["data"]
+    assert [entry["found"] for entry in entries] == [False, True, True]
+    assert entries[1]["user"]["username"] == "user2"
+    assert entries[1]["user"]["id"] == user2.public_id
+    # The request itself was made by user1, so its last API request is set
+    assert entries[2]["user"]["last_api_request"] is not None
+
+
+def test_batch_size_is_capped(app, data):
+    app.config["BATCH_IDS_MAX"] = 2
+    response = app.test_client().get("/api/post?ids=1,2,3", headers=data["headers"])
+
+    assert response.status_code == 400
+
+
+def test_invalid_post_id(app, data):
+    response = app.test_client().get("/api/post?ids=1,abc", headers=data["headers"])
+
+    assert response.status_code == 400
+
+
+def test_without_ids_redirects_to_list(app, data):
+    response = app.test_client().get("/api/post?limit=5", headers=data["headers"])
+
+    assert response.status_code == 308
+    assert response.headers["Location"].endswith("/api/post/?limit=5")
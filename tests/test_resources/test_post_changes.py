@@ -0,0 +1,132 @@
+import types
+import uuid
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import postgresql
+
+from app import create_app, db
+from app.changes import UPDATED, prune_post_changes_command, record_post_changes
+from app.models.post_change import PostChange
+from app.models.user import User
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def users(app):
+    author = User(username="author", email="author@example.com")
+    reader = User(username="reader", email="reader@example.com")
+    db.session.add_all([author, reader])
+    db.session.commit()
+    return [{"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"} for user in (author, reader)]
+
+
+def create_post(client, headers, title):
+    return client.post("/api/post/", json={"title": title, "content": uuid.uuid4().hex}, headers=headers).json["id"]
+
+
+def changes(client, headers, since=None, **params):
+    query = "&".join(f"{name}={value}" for name, value in {"since": since, **params}.items() if value is not None)
+    return client.get(f"/api/post/changes?{query}", headers=headers)
+
+
+def test_changes_since_token(app, users):
+    author, reader = users
+    client = app.test_client()
+    first = create_post(client, author, "First post")
+    token = changes(client, author).json["next_token"]
+
+    second = create_post(client, author, "Second post")
+    client.post(f"/api/post/{first}/like", headers=reader)
+    client.delete(f"/api/post/{second}", headers=author)
+    response = changes(client, author, token)
+
+    assert response.status_code == 200
+    data = response.json["data"]
+    # Each post appears once, with its latest change
+    assert [(entry["post_id"], entry["operation"]) for entry in data] == [(first, "updated"), (second, "deleted")]
+    assert data[0]["post"]["likes"] == 1
+    assert data[1]["post"] is None
+    assert response.json["has_more"] is False
+
+    assert changes(client, author, response.json["next_token"]).json["data"] == []
+
+
+def test_changes_are_paged(app, users):
+    client = app.test_client()
+    for number in range(3):
+        create_post(client, users[0], f"Post number {number}")
+
+    page = changes(client, users[0], limit=2).json
+    assert len(page["data"]) == 2
+    assert page["has_more"] is True
+
+    page = changes(client, users[0], page["next_token"], limit=2).json
+    assert len(page["data"]) == 1
+    assert page["has_more"] is False
+
+
+def postgres_connection(results):
+    """Records the statements a PostgreSQL connection would run, answering with results in turn."""
+    executed = []
+
+    def execute(statement, *params):
+        executed.append(str(statement.compile(dialect=postgresql.dialect())))
+        return types.SimpleNamespace(scalar=lambda: results.pop(0) if results else None)
+
+    connection = types.SimpleNamespace(
+        get_bind=lambda: types.SimpleNamespace(dialect=postgresql.dialect()), execute=execute
+    )
+    return connection, executed
+
+
+def test_postgres_writers_take_the_feed_lock():
+    connection, executed = postgres_connection([True])
+
+    record_post_changes(connection, [1, 2, 1], UPDATED)
+
+    assert len(executed) == 2
+    assert "pg_try_advisory_xact_lock" in executed[0]
+    assert executed[1].startswith("INSERT INTO post_changes")
+
+
+def test_postgres_writers_wait_for_the_feed_lock_with_a_timeout(app):
+    app.config["CHANGE_FEED_LOCK_TIMEOUT"] = 1.5
+    connection, executed = postgres_connection([False, "0"])
+
+    record_post_changes(connection, [1], UPDATED)
+
+    assert len(executed) == 6
+    assert "pg_try_advisory_xact_lock" in executed[0]
+    assert "set_config" in executed[2] and "pg_advisory_xact_lock" in executed[3]
+    # The previous lock_timeout applies again to the rest of the transaction
+    assert "set_config" in executed[4]
+    assert executed[5].startswith("INSERT INTO post_changes")
+
+
+def test_pruned_token_is_gone(app, users):
+    client = app.test_client()
+    for number in range(3):
+        create_post(client, users[0], f"Post number {number}")
+    app.config["CHANGE_FEED_RETENTION"] = timedelta(0)
+
+    result = app.test_cli_runner().invoke(prune_post_changes_command)
+
+    assert "Pruned 2 post changes" in result.output
+    assert PostChange.query.count() == 1
+    assert changes(client, users[0], 1).status_code == 410
+    assert changes(client, users[0], "abc").status_code == 400
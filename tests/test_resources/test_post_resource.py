@@ -0,0 +1,367 @@
+import json
+import re
+
+import pytest
+from flask import Flask, current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        assert current_app.config["TESTING"] is True
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def author(app):
+    user = User(username="author", email="author@example.com")
+    db.session.add(user)
+    db.session.commit()
+    return {"user": user, "headers": {"Authorization": f"Bearer {create_access_token(identity=user.public_id)}"}}
+
+
+@pytest.fixture
+def statements(app):
+    """Collects the SQL statements sent to the database."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+TABLE = re.compile(r"(?:INTO|FROM|UPDATE) (\w+)")
+
+
+def statement_summary(executed):
+    """Reduces each statement to its verb and the first table it names, e.g. "INSERT posts"."""
+    return [f"{statement.split()[0]} {TABLE.search(statement).group(1)}" for statement in executed]
+
+
+def test_create_post_statements(client, author, statements):
+    payload = {"title": "First post", "content": "Some content"}
+
+    response = client.post("/api/post/", json=payload, headers=author["headers"])
+    executed = statement_summary(statements)
+
+    assert response.status_code == 201
+    assert response.json["title"] == "First post"
+    assert response.json["slug"] == "first-post"
+    assert response.json["author_id"] == author["user"].public_id
+    assert response.json["likes"] == 0
+    assert response.json["date_posted"] is not None
+
+    # The author lookup, one duplicate lookup on the fingerprint index, the INSERT that reads
+    # the post back, then its fingerprint bands and its change feed entry
+    assert executed == [
+        "SELECT users",
+        "UPDATE users",
+        "SELECT posts",
+        "INSERT posts",
+        "INSERT post_simhash_bands",
+        "INSERT post_changes",
+    ]
+    assert "post_simhash_bands" in statements[2]
+    assert "RETURNING" in statements[3]
+
+
+def test_register_user_single_round_trip(client, statements):
+    payload = {"username": "user", "email": "user@test.com", "password": "password"}
+
+    response = client.post("/api/auth/register", json=payload)
+
+    assert response.status_code == 201
+    assert response.json["username"] == "user"
+    assert response.json["member_since"] is not None
+    # The generated id and member_since come back from the INSERT itself
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT INTO users")
+    assert "RETURNING" in statements[0]
+
+
+def test_update_post_statements(client, author, statements):
+    readers = [User(username=f"reader{number}", email=f"reader{number}@example.com") for number in range(3)]
+    other_post = Post(title="Other post", content="Other content", author_id=author["user"].id)
+    post = Post(title="Old title", content="Old content", author_id=author["user"].id)
+    db.session.add_all([*readers, other_post, post])
+    db.session.commit()
+    db.session.add_all([Like(user_id=reader.id, post_id=post.id) for reader in readers[:2]])
+    db.session.add(Like(user_id=readers[2].id, post_id=other_post.id))
+    db.session.commit()
+    post_id = post.id
+    statements.clear()
+
+    response = client.put(
+        f"/api/post/{post_id}", json={"title": "New title", "content": "New content"}, headers=author["headers"]
+    )
+    executed = statement_summary(statements)
+
+    assert response.status_code == 200
+    assert response.json["title"] == "New title"
+    assert response.json["slug"] == "new-title"
+    assert response.json["author_id"] == author["user"].public_id
+    assert response.json["likes"] == 2
+
+    # The UPDATE reads the post and its like count back; the fingerprint bands are replaced
+    assert executed == [
+        "SELECT users",
+        "UPDATE users",
+        "UPDATE posts",
+        "DELETE post_simhash_bands",
+        "INSERT post_simhash_bands",
+        "INSERT post_changes",
+    ]
+    assert "RETURNING" in statements[2]
+
+
+def test_update_with_if_match(client, author, statements):
+    post = Post(title="Old title", content="Old content", author_id=author["user"].id)
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+    etag = client.get(f"/api/post/{post_id}", headers=author["headers"]).headers["ETag"]
+    statements.clear()
+
+    response = client.put(
+        f"/api/post/{post_id}",
+        json={"title": "First edit", "content": "New content"},
+        headers={**author["headers"], "If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json["version"] == 2
+    assert response.headers["ETag"] != etag
+    assert statement_summary(statements) == [
+        "SELECT users",
+        "UPDATE users",
+        "UPDATE posts",
+        "DELETE post_simhash_bands",
+        "INSERT post_simhash_bands",
+        "INSERT post_changes",
+    ]
+    assert "posts.version = ?" in statements[2]
+
+    # A second editor still holding the first version loses
+    response = client.put(
+        f"/api/post/{post_id}",
+        json={"title": "Second edit", "content": "Other content"},
+        headers={**author["headers"], "If-Match": etag},
+    )
+    assert response.status_code == 412
+    assert response.json["message"] == f"Post with ID {post_id} was modified, fetch it again"
+    assert db.session.get(Post, post_id).title == "First edit"
+
+    response = client.put(
+        f"/api/post/{post_id}",
+        json={"title": "Second edit", "content": "Other content"},
+        headers={**author["headers"], "If-Match": 'W/"post-999-v1-0"'},
+    )
+    assert response.status_code == 412
+
+
+def test_if_match_compares_strongly(client, author):
+    post = Post(title="Long post", content="Some content " * 200, author_id=author["user"].id)
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+    gzip_headers = {**author["headers"], "Accept-Encoding": "gzip"}
+
+    # The compressed representation has a strong tag of its own, which validates too
+    response = client.get(f"/api/post/{post_id}", headers=gzip_headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag == f'"post-{post_id}-v1-0-gzip"'
+    response = client.get(f"/api/post/{post_id}", headers={**gzip_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    # A weak tag never matches If-Match, and the 412 keeps its message
+    response = client.put(
+        f"/api/post/{post_id}",
+        json={"title": "Edited", "content": "Other content"},
+        headers={**author["headers"], "If-Match": f"W/{etag}"},
+    )
+    assert response.status_code == 412
+    assert response.json["message"] == f"If-Match does not name a version of post {post_id}."
+
+    response = client.put(
+        f"/api/post/{post_id}",
+        json={"title": "Edited", "content": "Other content"},
+        headers={**author["headers"], "If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"post-{post_id}-v2-0"'
+
+
+def test_update_missing_post(client, author):
+    payload = {"title": "New title", "content": "New content"}
+
+    response = client.put("/api/post/42", json=payload, headers=author["headers"])
+
+    assert response.status_code == 404
+    assert response.json["message"].startswith("Post with ID 42 not found")
+
+
+def test_export_posts_as_ndjson(app, client, author):
+    app.config["POST_EXPORT_CHUNK_SIZE"] = 2
+    author_id = author["user"].id
+    db.session.add_all(
+        [Post(title=f"Post number {number}", content="Some content", author_id=author_id) for number in range(5)]
+    )
+    db.session.commit()
+
+    response = client.get("/api/post/export", headers=author["headers"], buffered=False)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    # Five rows read two at a time are flushed as three chunks
+    chunks = list(response.response)
+    assert len(chunks) == 3
+
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(lines) == 5
+    exported = [json.loads(line) for line in lines]
+    assert {post["title"] for post in exported} == {f"Post number {number}" for number in range(5)}
+    assert all(post["author_id"] == author["user"].public_id for post in exported)
+    dates = [post["date_posted"] for post in exported]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_export_without_posts(client, author):
+    response = client.get("/api/post/export", headers=author["headers"])
+
+    assert response.status_code == 200
+    assert response.data == b""
+
+
+def test_conditional_get_post(client, author):
+    reader = User(username="reader", email="reader@example.com")
+    post = Post(title="Cached post", content="Some content", author_id=author["user"].id)
+    db.session.add_all([reader, post])
+    db.session.commit()
+    post_id, reader_id = post.id, reader.id
+
+    response = client.get(f"/api/post/{post_id}", headers=author["headers"])
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"')
+    assert "Last-Modified" not in response.headers
+
+    response = client.get(f"/api/post/{post_id}", headers={**author["headers"], "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # A new like changes the representation, so the old tag no longer matches
+    like = Like(user_id=reader_id, post_id=post_id)
+    db.session.add(like)
+    db.session.commit()
+    response = client.get(f"/api/post/{post_id}", headers={**author["headers"], "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["likes"] == 1
+    assert response.headers["ETag"] != etag
+
+    # Nor does removing one bring a stale copy back
+    liked_etag = response.headers["ETag"]
+    db.session.delete(like)
+    db.session.commit()
+    response = client.get(f"/api/post/{post_id}", headers={**author["headers"], "If-None-Match": liked_etag})
+    assert response.status_code == 200
+    assert response.json["likes"] == 0
+
+
+def test_conditional_get_post_list(client, author):
+    response = client.get("/api/post/", headers=author["headers"])
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/post/", headers={**author["headers"], "If-None-Match": etag})
+    assert response.status_code == 304
+
+    post_id = client.post(
+        "/api/post/", json={"title": "New post", "content": "Some content"}, headers=author["headers"]
+    ).json["id"]
+    response = client.get("/api/post/", headers={**author["headers"], "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["total"] == 1
+
+    etag = response.headers["ETag"]
+    client.delete(f"/api/post/{post_id}", headers=author["headers"])
+    response = client.get("/api/post/", headers={**author["headers"], "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["total"] == 0
+
+
+def test_post_list_like_information(client, author, statements):
+    readers = [User(username=f"reader{n}", email=f"reader{n}@example.com") for n in range(2)]
+    db.session.add_all(readers)
+    db.session.commit()
+    posts = [Post(title=f"Post {n}", content="Some content", author_id=author["user"].id) for n in range(5)]
+    db.session.add_all(posts)
+    db.session.commit()
+    db.session.add_all([Like(user_id=reader.id, post_id=posts[0].id) for reader in readers])
+    db.session.add(Like(user_id=readers[0].id, post_id=posts[1].id))
+    db.session.commit()
+    liked_ids = {str(posts[0].id), str(posts[1].id)}
+    reader_headers = {"Authorization": f"Bearer {create_access_token(identity=readers[0].public_id)}"}
+    statements.clear()
+
+    response = client.get("/api/post/", headers=reader_headers)
+
+    assert response.status_code == 200
+    by_id = {post["id"]: post for post in response.json["data"]}
+    assert by_id[str(posts[0].id)]["like_count"] == 2
+    assert by_id[str(posts[1].id)]["like_count"] == 1
+    assert by_id[str(posts[2].id)]["like_count"] == 0
+    assert {post_id for post_id, post in by_id.items() if post["liked_by_me"]} == liked_ids
+    # One grouped count and one lookup of the reader's likes; the version check reads no likes
+    assert len([statement for statement in statements if "likes" in statement]) == 2
+
+
+def test_post_list_etag_changes_with_likes(client, author):
+    reader = User(username="reader", email="reader@example.com")
+    db.session.add(reader)
+    post = Post(title="Post", content="Some content", author_id=author["user"].id)
+    db.session.add(post)
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=reader.public_id)}"}
+    etag = client.get("/api/post/", headers=headers).headers["ETag"]
+
+    client.post(f"/api/post/{post.id}/like", headers=headers)
+    response = client.get("/api/post/", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json["data"][0]["liked_by_me"] is True
+    # Another user gets its own version of the list
+    assert client.get("/api/post/", headers=author["headers"]).headers["ETag"] != response.headers["ETag"]
+
+
+def test_conditional_get_missing_post(client, author):
+    response = client.get("/api/post/42", headers={**author["headers"], "If-None-Match": 'W/"anything"'})
+
+    assert response.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main()
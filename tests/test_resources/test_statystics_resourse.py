@@ -53,7 +53,7 @@ def posts(app, users):
             post_data = {
                 "title": f"Post {i + 1} by {user.username}",
                 "content": f"Content {i + 1} by {user.username}",
-                "author_id": user.public_id,
+                "author_id": user.id,
             }
             posts_data.append(post_data)
     with app.app_context():
@@ -73,9 +73,9 @@ def likes(app, users, posts):
     for user in users:
         for post in posts:
             # Each user likes 20 posts by other users (excluding their own)
-            if user.public_id != post.author_id:
+            if user.id != post.author_id:
                 created_at = current_time - timedelta(days=random.randint(1, 10))  # random likes in 10 days
-                like = Like(user_id=user.public_id, post_id=post.id, created_at=created_at)
+                like = Like(user_id=user.id, post_id=post.id, created_at=created_at)
                 db.session.add(like)
     db.session.commit()
 
@@ -136,6 +136,34 @@ def test_likes_analytics(client):
     assert response_posts_likes.json["total_likes"] == 100
 
 
+def test_likes_analytics_conditional_get(client):
+    headers = {"Authorization": f"Bearer {client.jwt_token}"}
+    response = client.get("/api/analytics/", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = client.get("/api/analytics/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Removing a like invalidates the statistics
+    db.session.delete(Like.query.first())
+    db.session.commit()
+    response = client.get("/api/analytics/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["total_likes"] == 99
+
+
+def test_likes_analytics_past_range_is_cacheable(client):
+    date_to = (datetime.utcnow() - timedelta(days=20)).strftime("%Y-%m-%d")
+    response = client.get(
+        f"/api/analytics/?date_from=2020-01-01&date_to={date_to}",
+        headers={"Authorization": f"Bearer {client.jwt_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+
 def test_user_analytics(client, users):
     # Retrieve the first user from the database
     user = User.query.get(1)
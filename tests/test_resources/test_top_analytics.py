@@ -0,0 +1,122 @@
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select
+
+from app import create_app, db
+from app.models.like import Like
+from app.models.like_rollup import PostLikeDaily
+from app.models.post import Post
+from app.models.user import User
+from app.rollups import rebuild_rollups
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def data(app):
+    """Two authors; post A gets 3 likes on Jan 10, post B 2 likes on Jan 10 and 1 on Feb 1, post C none"""
+    alice, bob, *readers = [User(username=f"user{n}", email=f"user{n}@example.com") for n in range(5)]
+    db.session.add_all([alice, bob, *readers])
+    db.session.commit()
+    post_a = Post(title="Post A", content="Content", author_id=alice.id)
+    post_b = Post(title="Post B", content="Content", author_id=bob.id)
+    post_c = Post(title="Post C", content="Content", author_id=bob.id)
+    db.session.add_all([post_a, post_b, post_c])
+    db.session.commit()
+
+    january, february = datetime(2026, 1, 10, 12), datetime(2026, 2, 1, 9)
+    db.session.add_all(
+        [Like(user_id=reader.id, post_id=post_a.id, created_at=january) for reader in readers]
+        + [Like(user_id=reader.id, post_id=post_b.id, created_at=january) for reader in readers[:2]]
+        + [Like(user_id=readers[2].id, post_id=post_b.id, created_at=february)]
+    )
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=alice.public_id)}"}
+    return {"alice": alice, "bob": bob, "posts": [post_a, post_b, post_c], "headers": headers}
+
+
+def rollup_rows():
+    return set(db.session.execute(select(PostLikeDaily.post_id, PostLikeDaily.day, PostLikeDaily.like_count)))
+
+
+def test_rollup_follows_likes(app, data):
+    post_a, post_b, _ = data["posts"]
+
+    assert rollup_rows() == {
+        (post_a.id, date(2026, 1, 10), 3),
+        (post_b.id, date(2026, 1, 10), 2),
+        (post_b.id, date(2026, 2, 1), 1),
+    }
+
+    db.session.delete(Like.query.filter_by(post_id=post_a.id).first())
+    db.session.commit()
+
+    assert (post_a.id, date(2026, 1, 10), 2) in rollup_rows()
+
+
+def test_rebuild_matches_incremental_rollup(app, data):
+    incremental = rollup_rows()
+
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    db.session.expire_all()
+
+    assert rollup_rows() == incremental
+
+
+def test_top_posts(app, data):
+    client = app.test_client()
+    post_a, post_b, _ = data["posts"]
+
+    response = client.get("/api/analytics/top-posts?date_from=2026-01-01&date_to=2026-12-31", headers=data["headers"])
+
+    assert response.status_code == 200
+    assert [(row["id"], row["like_count"]) for row in response.json["data"]] == [
+        (str(post_a.id), 3),
+        (str(post_b.id), 3),
+    ]
+    assert response.json["data"][1]["author_id"] == data["bob"].public_id
+
+
+def test_top_posts_date_range_and_limit(app, data):
+    client = app.test_client()
+    post_b = data["posts"][1]
+
+    february = client.get("/api/analytics/top-posts?date_from=2026-02-01&date_to=2026-02-28", headers=data["headers"])
+    limited = client.get("/api/analytics/top-posts?date_to=2026-01-31&limit=1", headers=data["headers"])
+
+    assert [(row["id"], row["like_count"]) for row in february.json["data"]] == [(str(post_b.id), 1)]
+    assert [row["title"] for row in limited.json["data"]] == ["Post A"]
+
+
+def test_top_authors(app, data):
+    response = app.test_client().get("/api/analytics/top-authors?date_to=2026-01-31", headers=data["headers"])
+
+    assert response.json["data"] == [
+        {"id": data["alice"].public_id, "username": "user0", "like_count": 3},
+        {"id": data["bob"].public_id, "username": "user1", "like_count": 2},
+    ]
+
+
+def test_top_posts_invalid_date(app, data):
+    response = app.test_client().get("/api/analytics/top-posts?date_from=yesterday", headers=data["headers"])
+
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models.like import Like
+from app.models.like_rollup import PostTrending, TrendingEpoch
+from app.models.post import Post
+from app.models.user import User
+from app.rollups import rebase_trending, rebuild_rollups
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def data(app):
+    """Post A has 2 fresh likes, post B 3 likes two half-lives old, post C 1 fresh like"""
+    author, *readers = [User(username=f"user{n}", email=f"user{n}@example.com") for n in range(4)]
+    db.session.add_all([author, *readers])
+    db.session.commit()
+    posts = [Post(title=f"Post {name}", content="Content", author_id=author.id) for name in "ABC"]
+    db.session.add_all(posts)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    old = now - 2 * app.config["TRENDING_HALF_LIFE"]
+    post_a, post_b, post_c = posts
+    db.session.add_all(
+        [Like(user_id=reader.id, post_id=post_a.id, created_at=now) for reader in readers[:2]]
+        + [Like(user_id=reader.id, post_id=post_b.id, created_at=old) for reader in readers]
+        + [Like(user_id=readers[0].id, post_id=post_c.id, created_at=now)]
+    )
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=author.public_id)}"}
+    return {"posts": posts, "readers": readers, "headers": headers}
+
+
+def feed(client, headers, **params):
+    query = "&".join(f"{name}={value}" for name, value in params.items())
+    return client.get(f"/api/post/trending?{query}", headers=headers)
+
+
+def test_trending_order_decays_old_likes(app, data):
+    response = feed(app.test_client(), data["headers"])
+
+    assert response.status_code == 200
+    assert [row["title"] for row in response.json["data"]] == ["Post A", "Post C", "Post B"]
+    scores = [row["score"] for row in response.json["data"]]
+    # Three likes two half-lives old are worth three quarters of a fresh like
+    assert scores == pytest.approx([2.0, 1.0, 0.75], rel=1e-3)
+    assert response.json["next_cursor"] is None
+
+
+def test_trending_cursor_pages(app, data):
+    client = app.test_client()
+
+    first = feed(client, data["headers"], limit=2)
+    second = feed(client, data["headers"], limit=2, cursor=first.json["next_cursor"])
+
+    assert [row["title"] for row in first.json["data"]] == ["Post A", "Post C"]
+    assert [row["title"] for row in second.json["data"]] == ["Post B"]
+    assert second.json["next_cursor"] is None
+
+
+def test_unlike_lowers_score(app, data):
+    post_a = data["posts"][0]
+    db.session.delete(Like.query.filter_by(post_id=post_a.id).first())
+    db.session.commit()
+
+    response = feed(app.test_client(), data["headers"])
+
+    assert response.json["data"][0]["score"] == pytest.approx(1.0, rel=1e-3)
+
+
+def test_invalid_cursor(app, data):
+    response = feed(app.test_client(), data["headers"], cursor="not-a-cursor")
+
+    assert response.status_code == 400
+
+
+def test_rebase_keeps_order_and_drops_decayed_posts(app, data):
+    before = [row["score"] for row in feed(app.test_client(), data["headers"]).json["data"]]
+    epoch = TrendingEpoch.query.one().epoch
+
+    with db.engine.begin() as connection:
+        rebase_trending(connection, now=epoch + timedelta(hours=1))
+    after = [row["score"] for row in feed(app.test_client(), data["headers"]).json["data"]]
+    assert after == pytest.approx(before, rel=1e-3)
+
+    app.config["TRENDING_MIN_SCORE"] = 1.5
+    with db.engine.begin() as connection:
+        remaining = rebase_trending(connection)
+    assert remaining == 1
+
+
+def test_rebuild_matches_incremental_scores(app, data):
+    incremental = {row.post_id: row.score for row in PostTrending.query}
+
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    db.session.expire_all()
+
+    assert {row.post_id: row.score for row in PostTrending.query} == pytest.approx(incremental)
+
+
+def test_like_after_rebase_corrects_cached_epoch(app, data):
+    post_c, reader = data["posts"][2], data["readers"][1]
+    cached = app.extensions["trending"].epoch
+    with db.engine.begin() as connection:
+        rebase_trending(connection, now=cached + timedelta(hours=6))
+    assert app.extensions["trending"].epoch == cached
+
+    db.session.add(Like(user_id=reader.id, post_id=post_c.id, created_at=datetime.utcnow()))
+    db.session.commit()
+    incremental = {row.post_id: row.score for row in PostTrending.query}
+    with db.engine.begin() as connection:
+        rebuild_rollups(connection)
+    db.session.expire_all()
+
+    assert app.extensions["trending"].epoch == cached + timedelta(hours=6)
+    assert {row.post_id: row.score for row in PostTrending.query} == pytest.approx(incremental)
+
+
+def test_like_starts_rebase_once_epoch_is_old(monkeypatch, tmp_path):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    # The rebase runs on a thread of its own, which needs a database it can connect to
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'trending.sqlite'}"})
+    with app.app_context():
+        db.create_all()
+        author, reader = User(username="author", email="a@example.com"), User(username="reader", email="r@example.com")
+        db.session.add_all([author, reader])
+        db.session.commit()
+        post = Post(title="Post", content="Content", author_id=author.id)
+        db.session.add(post)
+        db.session.commit()
+        stale = datetime.utcnow().replace(microsecond=0) - 20 * app.config["TRENDING_HALF_LIFE"]
+        db.session.add(TrendingEpoch(id=1, epoch=stale))
+        db.session.commit()
+
+        db.session.add(Like(user_id=reader.id, post_id=post.id, created_at=datetime.utcnow()))
+        db.session.commit()
+        app.extensions["trending"].rebase.join(timeout=10)
+        db.session.expire_all()
+
+        assert TrendingEpoch.query.one().epoch > stale + 19 * app.config["TRENDING_HALF_LIFE"]
+        assert PostTrending.query.one().score == pytest.approx(1.0, rel=1e-3)
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, g
+
+from app import create_app, db
+from app.singleflight import FlightGroup, request_key, single_flight
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with a specific configuration."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def run_concurrently(app, urls, view, user_ids=None):
+    """Calls view from one thread per URL, all inside their own request context"""
+    results = [None] * len(urls)
+
+    def call(index):
+        with app.test_request_context(urls[index]):
+            if user_ids:
+                g.current_user_id = user_ids[index]
+            results[index] = view()
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(urls))]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_identical_requests_share_one_run(app):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    @single_flight()
+    def view():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"total": len(calls)}
+
+    group = app.extensions["single_flight"]
+    threads, results = run_concurrently(app, ["/api/post/?limit=5&page=1"], view)
+    started.wait(5)
+    more, more_results = run_concurrently(app, ["/api/post/?page=1&limit=5", "/api/post/?page=1&limit=5&x="], view)
+    wait_until(lambda: group.followers == 2)
+    release.set()
+    for thread in threads + more:
+        thread.join()
+
+    assert calls == [1]
+    assert results + more_results == [{"total": 1}] * 3
+
+
+def test_different_users_do_not_share_results(app):
+    release = threading.Event()
+
+    @single_flight(per_user=True)
+    def view():
+        release.wait(0.2)
+        return {"user": g.current_user_id}
+
+    threads, results = run_concurrently(app, ["/api/post/"] * 2, view, user_ids=[1, 2])
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(result["user"] for result in results) == [1, 2]
+
+
+def test_request_key_normalizes_query(app):
+    with app.test_request_context("/api/analytics/?date_to=2026-01-31&date_from=2026-01-01"):
+        first = request_key(per_user=False)
+    with app.test_request_context("/api/analytics/?date_from=2026-01-01&date_to=2026-01-31&"):
+        second = request_key(per_user=False)
+    with app.test_request_context("/api/analytics/?date_from=2026-01-02&date_to=2026-01-31"):
+        other = request_key(per_user=False)
+
+    assert first == second
+    assert first != other
+
+
+def test_followers_receive_the_leaders_error():
+    group = FlightGroup()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("key", fail, timeout=5)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_until(lambda: group.followers == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert group.do("key", lambda: "fresh", timeout=5) == "fresh"
+
+
+if __name__ == "__main__":
+    pytest.main()
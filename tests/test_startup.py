@@ -0,0 +1,121 @@
+import os
+import runpy
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+from app import api, create_app, db
+from app import startup
+from app.startup import parse_importtime, register_deferred_namespaces
+
+
+@pytest.fixture
+def app(monkeypatch) -> Flask:
+    """Provides an instance of our Flask app with the analytics namespace deferred."""
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app({"DEFERRED_NAMESPACES": ["analytics"]})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def analytics_rules(app):
+    return [rule for rule in app.url_map.iter_rules() if rule.rule.startswith("/api/analytics")]
+
+
+def test_deferred_namespace_registered_on_first_request(app):
+    assert analytics_rules(app) == []
+    assert app.extensions["deferred_namespaces"]["pending"] == ["analytics"]
+
+    response = app.test_client().get("/api/analytics/")
+
+    assert response.status_code == 401
+    assert analytics_rules(app)
+    assert app.extensions["deferred_namespaces"]["pending"] == []
+
+
+def test_requests_skip_the_lock_once_registered(app):
+    client = app.test_client()
+    client.get("/api/analytics/")
+
+    class Unavailable:
+        def __enter__(self):
+            raise AssertionError("lock taken after registration")
+
+    app.extensions["deferred_namespaces"]["lock"] = Unavailable()
+
+    assert client.get("/api/analytics/").status_code == 401
+
+
+def test_restx_internals_are_available():
+    # Deferred namespaces registered on a second app depend on these; see requirements.txt
+    for name in startup.RESTX_INTERNALS:
+        assert hasattr(api, name)
+
+
+def test_spec_includes_deferred_namespace(app):
+    response = app.test_client().get("/swagger.json")
+
+    assert "/api/analytics/" in response.json["paths"]
+
+
+def test_deferred_namespace_goes_to_its_own_app(app):
+    later = create_app({"DEFERRED_NAMESPACES": ["analytics"]})
+
+    register_deferred_namespaces(app)
+
+    assert analytics_rules(app)
+    assert analytics_rules(later) == []
+    assert api.app is later
+
+
+def test_failed_registration_stays_pending(app, monkeypatch):
+    namespaces = startup.NAMESPACES
+    monkeypatch.setattr(startup, "NAMESPACES", [("analytics", "app.missing", "analytics_namespace", "/api/x")])
+    with pytest.raises(ImportError):
+        register_deferred_namespaces(app)
+    assert app.extensions["deferred_namespaces"]["pending"] == ["analytics"]
+
+    monkeypatch.setattr(startup, "NAMESPACES", namespaces)
+    register_deferred_namespaces(app)
+    assert analytics_rules(app)
+    assert app.extensions["deferred_namespaces"]["pending"] == []
+
+
+def test_preloaded_app_registers_before_fork(app, monkeypatch):
+    settings = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py"))
+    monkeypatch.setitem(sys.modules, "wsgi", types.SimpleNamespace(app=app))
+
+    settings["when_ready"](None)
+
+    assert analytics_rules(app)
+
+
+def test_create_app_phases_are_timed(app):
+    timer = app.extensions["startup"]
+
+    assert list(timer.phases) == ["config", "models", "extensions", "namespaces", "api_spec"]
+    assert timer.total_ms == pytest.approx(sum(timer.phases.values()), abs=0.1)
+
+
+def test_parse_importtime():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       300 |        300 |     sqlalchemy.util",
+            "import time:       700 |       1000 |   sqlalchemy",
+            "import time:       250 |        250 | flask",
+            "Created app",
+        ]
+    )
+
+    assert parse_importtime(stderr, top=1) == [("sqlalchemy", 1.0)]
+
+
+if __name__ == "__main__":
+    pytest.main()